@@ -16,6 +16,9 @@ def clear_all_data():
         # Database files
         "file_index.db",
         "ai_search_db",
+        "extraction_cache",
+        "walk_state.db",
+        "file_monitor_walk.db",
         
         # Embedding files
         "embeddings_openai.json",
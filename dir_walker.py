@@ -0,0 +1,200 @@
+"""
+Shared directory walker for the indexer, live search and File Monitor.
+
+DirWalker.walk() yields (dirpath, dirnames, files) like os.walk, but:
+
+- directories are listed with os.scandir, and files come back as
+  (name, size, mtime) so callers do not stat them again. On Windows the
+  DirEntry stat is free; elsewhere it is done in the scan thread.
+- subdirectories are scanned ahead by a thread pool, which hides the
+  latency of network shares. Results are still yielded in sorted
+  top-down order, and callers prune subtrees by editing dirnames.
+- with a state_path, every directory's mtime and listing is saved. A
+  prune_unchanged pass reuses the saved listing of a directory whose
+  mtime has not changed, at the cost of one stat instead of listing it
+  and statting every file in it.
+- exclusion rules (ignore_rules: global rules plus the root's
+  .searchautoignore) are applied before a folder is queued for scanning,
+  so excluded subtrees are never listed. Per-rule counts of what was
+  pruned end up in walker.rules.counts.
+
+A directory's mtime changes when entries are added, removed or renamed,
+which includes Office and most editors saving through a temporary file.
+A file rewritten in place keeps its old size/mtime in a pruned pass, so
+callers should still run a full pass now and then.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ignore_rules import IgnoreRules
+import root_paths
+
+WALK_THREADS = 8
+# Saved listings are written in batches of this many directories
+STATE_BATCH = 200
+# A directory modified this close to its last scan may change again within
+# the same mtime tick, so its saved listing is not trusted
+MTIME_SLACK = 2.0
+
+class DirWalker:
+    def __init__(self, state_path=None, namespace='default', file_filter=None, threads=WALK_THREADS,
+                 ignore_rules=True):
+        """state_path is a SQLite file for the saved listings (None keeps
+        nothing). namespace separates walkers with different file_filters
+        sharing one state file. file_filter(name) selects the files that are
+        statted and returned; by default every file is. ignore_rules=False
+        turns the exclusion rules off."""
+        self.state_path = state_path
+        self.ignore_rules = ignore_rules
+        self.rules = None
+        self.namespace = namespace
+        self.file_filter = file_filter
+        self.threads = threads
+        self.dirs_scanned = 0
+        self.dirs_reused = 0
+
+    # === Saved listings ===
+    def _open_state(self):
+        if not self.state_path:
+            return None
+        conn = sqlite3.connect(self.state_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''CREATE TABLE IF NOT EXISTS walk_dirs (
+            namespace TEXT NOT NULL,
+            path TEXT NOT NULL,
+            mtime REAL NOT NULL,
+            scanned REAL NOT NULL,
+            listing TEXT NOT NULL,
+            PRIMARY KEY (namespace, path)
+        )''')
+        conn.commit()
+        return conn
+
+    def _load_saved(self, conn, root):
+        if conn is None:
+            return {}
+        prefix = os.path.join(root, '')
+        rows = conn.execute('SELECT path, mtime, scanned, listing FROM walk_dirs WHERE namespace=? AND (path=? OR substr(path, 1, ?)=?)',
+                            (self.namespace, root, len(prefix), prefix))
+        return {path: (mtime, scanned, listing) for path, mtime, scanned, listing in rows}
+
+    def _save(self, conn, batch):
+        if conn is not None and batch:
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO walk_dirs (namespace, path, mtime, scanned, listing) VALUES (?, ?, ?, ?, ?)',
+                                 [(self.namespace,) + row for row in batch])
+        batch.clear()
+
+    def forget(self, root):
+        """Drop the saved listings under root"""
+        conn = self._open_state()
+        if conn is None:
+            return
+        prefix = os.path.join(root, '')
+        with conn:
+            conn.execute('DELETE FROM walk_dirs WHERE namespace=? AND (path=? OR substr(path, 1, ?)=?)',
+                         (self.namespace, root, len(prefix), prefix))
+        conn.close()
+
+    # === Scanning (runs in the thread pool) ===
+    def _scan(self, path, saved):
+        """Return (dirnames, files, mtime, reused) for one directory, or None if it cannot be read"""
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        if saved is not None and saved[0] == mtime and mtime < saved[1] - MTIME_SLACK:
+            listing = json.loads(saved[2])
+            return listing['dirs'], [tuple(f) for f in listing['files']], mtime, True
+        dirnames, files = [], []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            dirnames.append(entry.name)
+                        elif entry.is_file() and (self.file_filter is None or self.file_filter(entry.name)):
+                            st = entry.stat()
+                            files.append((entry.name, st.st_size, st.st_mtime))
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        dirnames.sort()
+        files.sort()
+        return dirnames, files, mtime, False
+
+    def _apply_rules(self, rules, path, dirnames, files):
+        rel_dir = rules.relative(path)
+        prefix = rel_dir + '/' if rel_dir else ''
+        kept_dirs, kept_files = [], []
+        for name in dirnames:
+            rule = rules.skip_dir(prefix + name)
+            if rule:
+                rules.count(rule, 'dirs')
+            else:
+                kept_dirs.append(name)
+        for entry in files:
+            rule = rules.skip_file(prefix + entry[0], entry[1])
+            if rule:
+                rules.count(rule, 'files')
+            else:
+                kept_files.append(entry)
+        return kept_dirs, kept_files
+
+    def walk(self, root, prune_unchanged=False, is_cancelled=None, exclude=()):
+        """Yield (dirpath, dirnames, files) for root and every directory below it.
+
+        files is a list of (name, size, mtime). Remove names from dirnames to
+        skip those subtrees. With prune_unchanged, directories whose mtime is
+        unchanged since the last walk come from the saved listing. Folders in
+        exclude (other roots nested in this one) are left out like pruned ones.
+        """
+        is_cancelled = is_cancelled or (lambda: False)
+        fold = root_paths.is_case_insensitive(root)
+        excluded = {root_paths.root_key(path, fold) for path in exclude}
+        rules = self.rules = IgnoreRules.load(root) if self.ignore_rules else None
+        conn = self._open_state()
+        saved = self._load_saved(conn, root) if prune_unchanged else {}
+        batch = []
+        pool = ThreadPoolExecutor(max_workers=self.threads)
+        try:
+            stack = [(root, pool.submit(self._scan, root, saved.get(root)))]
+            while stack:
+                if is_cancelled():
+                    return
+                path, future = stack.pop()
+                result = future.result()
+                if result is None:
+                    continue
+                dirnames, files, mtime, reused = result
+                if reused:
+                    self.dirs_reused += 1
+                else:
+                    self.dirs_scanned += 1
+                    if conn is not None:
+                        # Saved before the rules are applied, so editing the
+                        # rules takes effect without a full pass
+                        batch.append((path, mtime, time.time(), json.dumps({'dirs': dirnames, 'files': files})))
+                        if len(batch) >= STATE_BATCH:
+                            self._save(conn, batch)
+                if rules is not None:
+                    dirnames, files = self._apply_rules(rules, path, dirnames, files)
+                if excluded:
+                    dirnames = [d for d in dirnames
+                                if root_paths.root_key(os.path.join(path, d), fold) not in excluded]
+                yield path, dirnames, files
+                # Queue the remaining subdirectories; they are scanned in
+                # parallel while the first one is being consumed
+                children = [os.path.join(path, d) for d in dirnames]
+                for child in reversed(children):
+                    stack.append((child, pool.submit(self._scan, child, saved.get(child))))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            if conn is not None:
+                self._save(conn, batch)
+                conn.close()
@@ -0,0 +1,164 @@
+"""
+Streaming DOCX text reader.
+
+A .docx file is a zip of XML parts. iter_blocks() reads word/document.xml
+with an incremental pull parser and hands out each top-level paragraph or
+table as soon as it is complete, then drops it, without building the
+python-docx object model. Unlike doc.paragraphs it also covers the text
+in tables, headers, footers, footnotes and endnotes.
+
+Blocks come out as (location, text) in document order, body first:
+
+    Paragraph 12                  top-level paragraph (empty ones are counted too)
+    Table 2, Row 3, Column 1      one table cell, its paragraphs joined by newlines
+    Header / Footer               a paragraph or cell of a header or footer
+    Footnote 4 / Endnote 1        a paragraph of a note
+
+Deleted text of tracked changes and field codes are left out.
+"""
+
+import posixpath
+import zipfile
+from xml.etree.ElementTree import XMLPullParser
+
+READ_SIZE = 256 * 1024
+HEADER_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/header'
+FOOTER_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/footer'
+STRICT_HEADER_TYPE = 'http://purl.oclc.org/ooxml/officeDocument/relationships/header'
+STRICT_FOOTER_TYPE = 'http://purl.oclc.org/ooxml/officeDocument/relationships/footer'
+
+def _iter_at_depth(archive, name, depth):
+    """Yield (namespace, element) for every completed element depth levels below the root.
+
+    Each one is dropped from its parent afterwards, so only the block being
+    read is kept in memory.
+    """
+    parser = XMLPullParser(events=('start', 'end'))
+    parents = []
+    ns = ''
+    with archive.open(name) as f:
+        for chunk in iter(lambda: f.read(READ_SIZE), b''):
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    if not parents:
+                        # A part uses the namespace of its root element throughout
+                        ns = elem.tag[:elem.tag.find('}') + 1]
+                    parents.append(elem)
+                    continue
+                parents.pop()
+                if len(parents) == depth:
+                    yield ns, elem
+                    elem.clear()
+                    parents[-1].remove(elem)
+    parser.close()
+
+def paragraph_text(p, ns):
+    """Text of a <w:p>, with tabs and line breaks"""
+    t, tab, br, cr = ns + 't', ns + 'tab', ns + 'br', ns + 'cr'
+    parts = []
+    for elem in p.iter():
+        tag = elem.tag
+        if tag == t:
+            parts.append(elem.text or '')
+        elif tag == tab:
+            parts.append('\t')
+        elif tag == br or tag == cr:
+            parts.append('\n')
+    return ''.join(parts)
+
+def _cell_text(tc, ns):
+    return '\n'.join(paragraph_text(p, ns) for p in tc.iter(ns + 'p'))
+
+def _table_cells(tbl, ns):
+    """Yield (row, column, text) for the cells of a table; merged cells are listed once"""
+    span = ns + 'gridSpan'
+    for row_num, tr in enumerate(tbl.iterfind(ns + 'tr'), start=1):
+        col = 1
+        for tc in tr.iterfind(ns + 'tc'):
+            yield row_num, col, _cell_text(tc, ns)
+            width = tc.find(f'{ns}tcPr/{span}')
+            col += int(width.get(f'{ns}val', 1)) if width is not None else 1
+
+def _content(elem, ns):
+    """The block-level children of elem, looking through content controls (<w:sdt>)"""
+    for child in elem:
+        if child.tag == ns + 'sdt':
+            content = child.find(ns + 'sdtContent')
+            if content is not None:
+                yield from _content(content, ns)
+        else:
+            yield child
+
+def _iter_body(archive):
+    paragraphs = tables = 0
+    # document > body > paragraph or table
+    for ns, block in _iter_at_depth(archive, 'word/document.xml', 2):
+        for elem in _content([block], ns):
+            if elem.tag == ns + 'p':
+                paragraphs += 1
+                yield f"Paragraph {paragraphs}", paragraph_text(elem, ns)
+            elif elem.tag == ns + 'tbl':
+                tables += 1
+                for row, col, text in _table_cells(elem, ns):
+                    yield f"Table {tables}, Row {row}, Column {col}", text
+
+def _iter_story(archive, name, location):
+    """Paragraphs and table cells of a header or footer part"""
+    for ns, block in _iter_at_depth(archive, name, 1):
+        for elem in _content([block], ns):
+            if elem.tag == ns + 'p':
+                yield location, paragraph_text(elem, ns)
+            elif elem.tag == ns + 'tbl':
+                for _, _, text in _table_cells(elem, ns):
+                    yield location, text
+
+def _iter_notes(archive, name, label):
+    """Paragraphs of footnotes.xml or endnotes.xml, skipping the separator notes"""
+    for ns, note in _iter_at_depth(archive, name, 1):
+        if note.get(ns + 'type') in ('separator', 'continuationSeparator', 'continuationNotice'):
+            continue
+        location = f"{label} {note.get(ns + 'id')}"
+        for p in note.iter(ns + 'p'):
+            yield location, paragraph_text(p, ns)
+
+def _header_footer_parts(archive):
+    """Return [(part name, 'Header' or 'Footer')] from the document relationships"""
+    rels_name = 'word/_rels/document.xml.rels'
+    if rels_name not in archive.namelist():
+        return []
+    parts = []
+    for _, rel in _iter_at_depth(archive, rels_name, 1):
+        rel_type = rel.get('Type')
+        if rel_type in (HEADER_TYPE, STRICT_HEADER_TYPE):
+            kind = 'Header'
+        elif rel_type in (FOOTER_TYPE, STRICT_FOOTER_TYPE):
+            kind = 'Footer'
+        else:
+            continue
+        target = rel.get('Target', '')
+        name = target.lstrip('/') if target.startswith('/') else posixpath.normpath('word/' + target)
+        parts.append((name, kind))
+    # Headers before footers
+    return sorted(parts, key=lambda part: (part[1] != 'Header', part[0]))
+
+def iter_blocks(file_path):
+    """Yield (location, text) for every non-empty paragraph and table cell of a DOCX file"""
+    with zipfile.ZipFile(file_path) as archive:
+        names = set(archive.namelist())
+        streams = [_iter_body(archive)]
+        streams.extend(_iter_story(archive, name, kind) for name, kind in _header_footer_parts(archive) if name in names)
+        for name, label in (('word/footnotes.xml', 'Footnote'), ('word/endnotes.xml', 'Endnote')):
+            if name in names:
+                streams.append(_iter_notes(archive, name, label))
+        seen_stories = set()
+        for stream in streams:
+            for location, text in stream:
+                if not text.strip():
+                    continue
+                if location in ('Header', 'Footer'):
+                    # First-page, even and default headers often repeat the same text
+                    if (location, text) in seen_stories:
+                        continue
+                    seen_stories.add((location, text))
+                yield location, text
@@ -0,0 +1,231 @@
+"""
+Persistent extraction cache shared by SearchAuto, File Monitor and the
+translator.
+
+Extracted text is stored once per (source content hash, extractor kind)
+as a zlib-compressed blob under extraction_cache/blobs/. A small SQLite
+index maps (path, kind) to the size, mtime and content hash seen last
+time, so an unchanged file costs one os.stat() and one blob read.
+
+If the mtime changed but the bytes did not (a copy, a touch, a sync
+tool), the file is hashed and the existing blob is reused without
+parsing it again. Blobs are evicted least-recently-used once the cache
+grows past its size budget.
+
+    from extraction_cache import cached_extract
+    text = cached_extract(path, 'pdfminer-text', extract_text)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extraction_cache')
+DEFAULT_CACHE_MB = 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+HASH_DIGEST_SIZE = 20
+# Last-access times are only rewritten when older than this many seconds,
+# so repeated hits do not turn every read into a write
+TOUCH_INTERVAL = 60
+
+def hash_file(path):
+    """Return the blake2b hex digest of a file's bytes"""
+    h = hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+class ExtractionCache:
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or os.getenv('SEARCHAUTO_CACHE_DIR') or DEFAULT_CACHE_DIR
+        if max_bytes is None:
+            try:
+                max_bytes = int(os.getenv('SEARCHAUTO_CACHE_MB', DEFAULT_CACHE_MB)) * 1024 * 1024
+            except ValueError:
+                max_bytes = DEFAULT_CACHE_MB * 1024 * 1024
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(self.cache_dir, 'blobs')
+        self.db_path = os.path.join(self.cache_dir, 'cache_index.db')
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        if self.enabled:
+            os.makedirs(self.blob_dir, exist_ok=True)
+            self._init_db()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _conn(self):
+        # sqlite3 connections cannot be shared between threads, and a forked
+        # worker process must neither use nor close the one its parent opened
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.inherited = getattr(self._local, 'conn', None)
+            self._local.conn = None
+            self._local.pid = os.getpid()
+        conn = self._local.conn
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._conn()
+        conn.execute('''CREATE TABLE IF NOT EXISTS entries (
+            path TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            blob_key TEXT NOT NULL,
+            PRIMARY KEY (path, kind)
+        )''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_blob ON entries (blob_key)')
+        conn.execute('''CREATE TABLE IF NOT EXISTS blobs (
+            blob_key TEXT PRIMARY KEY,
+            stored_bytes INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        )''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_blobs_access ON blobs (last_access)')
+        conn.commit()
+
+    def _blob_path(self, blob_key):
+        return os.path.join(self.blob_dir, blob_key[:2], blob_key + '.z')
+
+    def _read_blob(self, blob_key):
+        try:
+            with open(self._blob_path(blob_key), 'rb') as f:
+                return json.loads(zlib.decompress(f.read()).decode('utf-8'))
+        except (OSError, ValueError, zlib.error):
+            return None
+
+    def _write_blob(self, blob_key, value):
+        data = zlib.compress(json.dumps(value, ensure_ascii=False).encode('utf-8'), 6)
+        path = self._blob_path(blob_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a concurrent reader never sees half a blob
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return len(data)
+
+    def _touch(self, conn, blob_key, last_access):
+        now = time.time()
+        if now - last_access > TOUCH_INTERVAL:
+            conn.execute('UPDATE blobs SET last_access=? WHERE blob_key=?', (now, blob_key))
+            conn.commit()
+
+    def lookup(self, path, kind, st=None):
+        """Return the cached value for an unchanged file, or None. Never extracts."""
+        if not self.enabled:
+            return None
+        st = st or os.stat(path)
+        conn = self._conn()
+        row = conn.execute('''SELECT e.size, e.mtime, e.blob_key, b.last_access FROM entries e
+                              JOIN blobs b ON b.blob_key = e.blob_key
+                              WHERE e.path=? AND e.kind=?''', (path, kind)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime:
+            value = self._read_blob(row[2])
+            if value is not None:
+                self._touch(conn, row[2], row[3])
+                return value
+        return None
+
+    def get(self, path, kind, extractor, content_hash=None):
+        """Return extractor(path), reusing a cached result when the file is unchanged.
+
+        kind names the extractor (e.g. 'pdfminer-text'), so different
+        extractors of the same file are cached separately. The value must be
+        JSON-serializable. Exceptions from extractor are not cached.
+        content_hash is hash_file(path) when the caller has already computed
+        it, so a miss does not read the file once more to hash it.
+        """
+        if not self.enabled:
+            return extractor(path)
+        st = os.stat(path)
+        value = self.lookup(path, kind, st)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        conn = self._conn()
+        blob_key = hashlib.blake2b(f"{content_hash or hash_file(path)}:{kind}".encode('utf-8'), digest_size=20).hexdigest()
+        row = conn.execute('SELECT last_access FROM blobs WHERE blob_key=?', (blob_key,)).fetchone()
+        value = self._read_blob(blob_key) if row else None
+        if value is None:
+            self.misses += 1
+            value = extractor(path)
+            stored_bytes = self._write_blob(blob_key, value)
+            conn.execute('INSERT OR REPLACE INTO blobs (blob_key, stored_bytes, last_access) VALUES (?, ?, ?)',
+                         (blob_key, stored_bytes, time.time()))
+        else:
+            # Same bytes under a new mtime or a new path: no parsing needed
+            self.hits += 1
+            self._touch(conn, blob_key, row[0])
+        conn.execute('INSERT OR REPLACE INTO entries (path, kind, size, mtime, blob_key) VALUES (?, ?, ?, ?, ?)',
+                     (path, kind, st.st_size, st.st_mtime, blob_key))
+        conn.commit()
+        self._evict(conn)
+        return value
+
+    def _evict(self, conn):
+        """Drop least-recently-used blobs until the cache is under 90% of its budget"""
+        total = conn.execute('SELECT COALESCE(SUM(stored_bytes), 0) FROM blobs').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for blob_key, stored_bytes in conn.execute('SELECT blob_key, stored_bytes FROM blobs ORDER BY last_access').fetchall():
+            if total <= target:
+                break
+            try:
+                os.remove(self._blob_path(blob_key))
+            except OSError:
+                pass
+            conn.execute('DELETE FROM entries WHERE blob_key=?', (blob_key,))
+            conn.execute('DELETE FROM blobs WHERE blob_key=?', (blob_key,))
+            total -= stored_bytes
+        conn.commit()
+
+    def stats(self):
+        if not self.enabled:
+            return {'entries': 0, 'blobs': 0, 'bytes': 0, 'hits': self.hits, 'misses': self.misses}
+        conn = self._conn()
+        entries = conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        blobs, stored = conn.execute('SELECT COUNT(*), COALESCE(SUM(stored_bytes), 0) FROM blobs').fetchone()
+        return {'entries': entries, 'blobs': blobs, 'bytes': stored, 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        if not self.enabled:
+            return
+        conn = self._conn()
+        for (blob_key,) in conn.execute('SELECT blob_key FROM blobs').fetchall():
+            try:
+                os.remove(self._blob_path(blob_key))
+            except OSError:
+                pass
+        conn.execute('DELETE FROM entries')
+        conn.execute('DELETE FROM blobs')
+        conn.commit()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Return the process-wide cache instance"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache()
+        return _cache
+
+def cached_extract(path, kind, extractor, content_hash=None):
+    """Shortcut for get_cache().get(path, kind, extractor, content_hash)"""
+    return get_cache().get(path, kind, extractor, content_hash)
@@ -0,0 +1,291 @@
+"""
+Supervised worker processes for text extraction.
+
+SupervisedPool is a drop-in for the ProcessPoolExecutor the indexer used:
+submit() returns a concurrent.futures.Future that works with wait().
+Each worker process runs one task at a time, and a supervisor thread
+watches them:
+
+- a task running longer than timeout seconds has its worker killed
+- a worker whose resident memory grows past max_rss_mb is killed
+- a worker that dies (a crash in a native parser) is noticed
+
+In all three cases the task's future fails with ExtractionAborted, whose
+reason says what happened, and a fresh worker takes the dead one's place.
+The wall-clock time of every finished task is kept for elapsed().
+
+Memory is read with psutil when it is installed, else from /proc on
+Linux or GetProcessMemoryInfo on Windows; where neither works, only the
+timeout applies.
+
+Workers are not forked from the caller: its other threads (the index
+writer, a live search) may hold a lock at that moment, SQLite's or the
+stdout buffer's, and the child would wait for it forever. Where it
+exists, a forkserver (a single-threaded process that imports the
+extractors once) starts them instead; elsewhere they are spawned.
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait as wait_connections
+
+# How often the supervisor wakes up to check on running tasks
+POLL_INTERVAL = 0.05
+# Memory is sampled less often than the clock
+RSS_INTERVAL = 0.5
+# Imported once by the forkserver, so new workers start with them loaded
+FORKSERVER_PRELOAD = ['file_extractors']
+
+class ExtractionAborted(Exception):
+    """A task was stopped: reason is 'timeout', 'memory', 'crashed' or 'cancelled' (pool shut down)"""
+
+    def __init__(self, reason, detail):
+        super().__init__(f"{reason}: {detail}")
+        self.reason = reason
+        self.detail = detail
+
+def process_rss(pid):
+    """Resident memory of a process in bytes, or None if it cannot be read"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    if sys.platform.startswith('linux'):
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+    if os.name == 'nt':
+        return _windows_rss(pid)
+    return None
+
+def _windows_rss(pid):
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    handle = ctypes.windll.kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        return None
+    try:
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.WorkingSetSize
+    finally:
+        ctypes.windll.kernel32.CloseHandle(handle)
+
+def _worker_main(conn):
+    """Worker process: run (fn, args) tasks until None arrives"""
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            result = ('ok', fn(*args))
+        except Exception as e:
+            result = ('error', f"{type(e).__name__}: {e}")
+        conn.send(result)
+
+def _start_context():
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(FORKSERVER_PRELOAD)
+    return context
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task = None      # (future, started) while busy
+        self.rss_checked = 0.0
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class SupervisedPool:
+    def __init__(self, max_workers, timeout=None, max_rss_mb=None):
+        self.timeout = timeout
+        self.max_rss = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self._context = _start_context()
+        self._workers = [_Worker(self._context) for _ in range(max_workers)]
+        self._queue = deque()
+        self._elapsed = {}
+        self._lock = threading.Lock()
+        # submit() and shutdown() wake the supervisor through this pipe
+        self._wake_reader, self._wake_writer = self._context.Pipe(duplex=False)
+        self._woken = False
+        self._closing = False
+        self._abandon = False
+        self.aborted = 0
+        self._thread = threading.Thread(target=self._supervise, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args):
+        future = Future()
+        with self._lock:
+            if self._closing:
+                raise RuntimeError('cannot submit after shutdown')
+            self._queue.append((future, fn, args))
+        self._wake()
+        return future
+
+    def _wake(self):
+        if not self._woken:
+            self._woken = True
+            self._wake_writer.send_bytes(b'')
+
+    def elapsed(self, future):
+        """Seconds the task of a finished future ran in its worker (forgotten once read)"""
+        with self._lock:
+            return self._elapsed.pop(future, None)
+
+    def _finish(self, worker, result=None, error=None):
+        future, started = worker.task
+        worker.task = None
+        with self._lock:
+            self._elapsed[future] = time.monotonic() - started
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _replace(self, worker):
+        worker.kill()
+        index = self._workers.index(worker)
+        self._workers[index] = _Worker(self._context)
+
+    def _abort(self, worker, reason, detail):
+        self.aborted += 1
+        self._replace(worker)
+        self._finish(worker, error=ExtractionAborted(reason, detail))
+
+    def _dispatch(self):
+        for worker in self._workers:
+            if worker.task is not None:
+                continue
+            while True:
+                with self._lock:
+                    if not self._queue:
+                        return
+                    future, fn, args = self._queue.popleft()
+                if future.set_running_or_notify_cancel():
+                    break
+            try:
+                worker.conn.send((fn, args))
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            worker.task = (future, time.monotonic())
+
+    def _collect(self):
+        busy = {worker.conn: worker for worker in self._workers if worker.task is not None}
+        sentinels = {worker.process.sentinel: worker for worker in busy.values()}
+        for ready in wait_connections([self._wake_reader] + list(busy) + list(sentinels), timeout=POLL_INTERVAL):
+            if ready is self._wake_reader:
+                self._woken = False
+                while self._wake_reader.poll():
+                    self._wake_reader.recv_bytes()
+                continue
+            worker = busy.get(ready) or sentinels.get(ready)
+            if worker.task is None:
+                continue
+            try:
+                status, value = worker.conn.recv()
+            except (EOFError, OSError):
+                worker.process.join(1)
+                self._abort(worker, 'crashed', f"worker exited with code {worker.process.exitcode}")
+                continue
+            if status == 'ok':
+                self._finish(worker, result=value)
+            else:
+                self._finish(worker, error=RuntimeError(value))
+
+    def _watch(self):
+        now = time.monotonic()
+        for worker in list(self._workers):
+            if worker.task is None:
+                continue
+            running = now - worker.task[1]
+            if self.timeout and running > self.timeout:
+                self._abort(worker, 'timeout', f"still running after {running:.0f} s")
+            elif self.max_rss and now - worker.rss_checked >= RSS_INTERVAL:
+                worker.rss_checked = now
+                rss = process_rss(worker.process.pid)
+                if rss is not None and rss > self.max_rss:
+                    self._abort(worker, 'memory', f"worker grew to {rss // (1024 * 1024)} MB")
+
+    def _supervise(self):
+        while not self._abandon:
+            self._dispatch()
+            self._collect()
+            self._watch()
+            with self._lock:
+                idle = not self._queue
+            if self._closing and idle and all(worker.task is None for worker in self._workers):
+                break
+        with self._lock:
+            while self._queue:
+                self._queue.popleft()[0].cancel()
+        for worker in self._workers:
+            if worker.task is not None:
+                worker.process.kill()
+                self._finish(worker, error=ExtractionAborted('cancelled', 'the pool was shut down'))
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.process.join(1)
+            if worker.process.is_alive():
+                worker.process.kill()
+            worker.conn.close()
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        """Stop the workers.
+
+        Queued tasks are cancelled with cancel_futures, otherwise they still
+        run. With wait, running tasks finish first; without it their
+        workers are killed.
+        """
+        with self._lock:
+            self._closing = True
+            self._abandon = not wait
+            if cancel_futures:
+                while self._queue:
+                    self._queue.popleft()[0].cancel()
+        self._wake_writer.send_bytes(b'')
+        self._thread.join()
+        self._wake_reader.close()
+        self._wake_writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
@@ -0,0 +1,254 @@
+"""
+File content extraction used by the indexer and live search.
+
+This module has no GUI code so it can be imported by the indexing
+worker processes without opening a Tk window. Parsed DOCX, PDF and XLSX
+content goes through the shared extraction cache, so a file that has not
+changed is only parsed once.
+
+extract_index_content() returns the text together with its position map
+(see position_map), which the indexer stores so index hits can report
+pages, paragraphs, lines and cells.
+"""
+
+import base64
+import hashlib
+import os
+
+from extraction_cache import HASH_DIGEST_SIZE, cached_extract, get_cache, hash_file
+import docx_reader
+import pdf_reader
+import position_map
+import xlsx_reader
+
+INDEXED_EXTENSIONS = ('.txt', '.md', '.docx', '.pdf', '.xlsx')
+# Plain text files that are indexed incrementally when they only grow
+APPEND_EXTENSIONS = ('.txt', '.md')
+# Bytes read from the start, middle and end of a file for its fingerprint
+FINGERPRINT_SAMPLE = 64 * 1024
+
+def is_indexable(file_name):
+    """Return True if a file name has a supported extension and is not an Office lock file"""
+    return file_name.endswith(INDEXED_EXTENSIONS) and not file_name.startswith('~$')
+
+def get_file_type(file_path):
+    """Return the upper-case extension stored in the index, e.g. 'PDF'"""
+    return os.path.splitext(file_path)[1][1:].upper()
+
+def _sampled_hash(f, size):
+    """Hash the first size bytes of an open binary file: all of them, or a
+    sample from the start, middle and end when they exceed three samples"""
+    h = hashlib.blake2b(digest_size=16)
+    if size <= 3 * FINGERPRINT_SAMPLE:
+        f.seek(0)
+        h.update(f.read(size))
+    else:
+        for offset in (0, size // 2 - FINGERPRINT_SAMPLE // 2, size - FINGERPRINT_SAMPLE):
+            f.seek(offset)
+            h.update(f.read(FINGERPRINT_SAMPLE))
+    return f"{size}:{h.hexdigest()}"
+
+def file_fingerprint(file_path):
+    """Return (inode, fingerprint) used to recognise a file after a move.
+
+    The fingerprint is the size plus a hash of three samples of the
+    content, so it costs at most 192 KB of reading whatever the file size.
+    inode is None where the filesystem does not provide one.
+    """
+    st = os.stat(file_path)
+    with open(file_path, 'rb') as f:
+        fingerprint = _sampled_hash(f, st.st_size)
+    return st.st_ino or None, fingerprint
+
+def supports_append(file_path):
+    return file_path.endswith(APPEND_EXTENSIONS)
+
+def read_text_from(file_path, start=0):
+    """Read a text file from byte offset start for the index.
+
+    Returns (content, indexed_bytes, prefix_hash, content_hash).
+    indexed_bytes is the offset just past the last complete line, and
+    prefix_hash the sampled hash of everything before it: if both still
+    hold later, only the bytes after indexed_bytes are new (see
+    append_start). content_hash is extraction_cache.hash_file of the whole
+    file when reading from the start, else None.
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read()
+        indexed_bytes = start + data.rfind(b'\n') + 1
+        prefix_hash = _sampled_hash(f, indexed_bytes)
+    content_hash = hashlib.blake2b(data, digest_size=HASH_DIGEST_SIZE).hexdigest() if start == 0 else None
+    # Same result as reading in text mode: universal newlines, bad bytes dropped
+    content = data.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n')
+    return content, indexed_bytes, prefix_hash, content_hash
+
+def append_start(file_path, size, old_size, indexed_bytes, prefix_hash):
+    """Return the offset to index from if an indexed text file only grew, else None.
+
+    The file must be larger than when it was indexed and the sampled hash
+    of its indexed part must be unchanged, which costs at most 192 KB of
+    reading instead of the whole file.
+    """
+    if not supports_append(file_path) or not indexed_bytes or not prefix_hash:
+        return None
+    if old_size is None or size <= old_size:
+        return None
+    try:
+        with open(file_path, 'rb') as f:
+            return indexed_bytes if _sampled_hash(f, indexed_bytes) == prefix_hash else None
+    except OSError:
+        return None
+
+def extract_docx_blocks(file_path):
+    """Return [location, text] for every paragraph and table cell of a DOCX file,
+    headers, footers and notes included"""
+    return [list(block) for block in docx_reader.iter_blocks(file_path)]
+
+def extract_xlsx_cells(file_path):
+    """Return [sheet, row number, column letter, text] for every non-empty cell"""
+    return [list(cell) for cell in xlsx_reader.iter_cells(file_path)]
+
+def extract_xlsx_text(file_path):
+    """Text of a workbook for the index, streamed without building the cell list"""
+    return xlsx_cells_to_text(xlsx_reader.iter_cells(file_path))
+
+# Cached variants. The kind names are shared with file_monitor and the
+# translator so they reuse each other's results. content_hash is passed on
+# to cached_extract when the caller has already hashed the file.
+def get_docx_blocks(file_path, content_hash=None):
+    return cached_extract(file_path, 'docx-blocks', extract_docx_blocks, content_hash)
+
+class _UncachedPages(Exception):
+    """Carries pages out of the cache's extractor without storing them"""
+
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+
+def get_pdf_pages(file_path, workers=1, page_timeout=None, content_hash=None):
+    """Text of every page, from the backend chosen by SEARCHAUTO_PDF_BACKEND (see pdf_reader).
+
+    Pages read by a fallback backend are cached under that backend's name,
+    and a '<preferred>-fallback' entry names it, so the next read of the
+    file goes straight to them instead of failing with the preferred
+    backend again. Pages left empty by page_timeout are not cached, so the
+    next read tries them again.
+    """
+    backend = pdf_reader.backend_order()[0]
+    cache = get_cache()
+    if cache.enabled:
+        st = os.stat(file_path)
+        pages = cache.lookup(file_path, f'{backend}-pages', st)
+        if pages is None:
+            fallback = cache.lookup(file_path, f'{backend}-fallback', st)
+            if fallback is not None:
+                pages = cache.lookup(file_path, f'{fallback}-pages', st)
+        if pages is not None:
+            cache.hits += 1
+            return pages
+        # Up to three entries are written below; the file is hashed once for all
+        content_hash = content_hash or hash_file(file_path)
+    report = {}
+
+    def extract(path):
+        pages = pdf_reader.extract_pages(path, backend, workers, page_timeout, report)
+        if report['timed_out'] or report['backend'] != backend:
+            raise _UncachedPages(pages)
+        return pages
+
+    try:
+        return cached_extract(file_path, f'{backend}-pages', extract, content_hash)
+    except _UncachedPages as e:
+        pages = e.pages
+    if not report['timed_out']:
+        cached_extract(file_path, f"{report['backend']}-pages", lambda path: pages, content_hash)
+        cached_extract(file_path, f'{backend}-fallback', lambda path: report['backend'], content_hash)
+    return pages
+
+def get_xlsx_cells(file_path):
+    return cached_extract(file_path, 'xlsx-stream-cells', extract_xlsx_cells)
+
+def get_xlsx_text(file_path):
+    return cached_extract(file_path, 'xlsx-stream-text', extract_xlsx_text)
+
+def get_xlsx_mapped_text(file_path, content_hash=None):
+    """(text, encoded cell map) of a workbook"""
+    def extract(path):
+        cell_map = position_map.CellMap()
+        text = xlsx_cells_to_text(xlsx_reader.iter_cells(path), cell_map)
+        encoded = position_map.encode_cells(cell_map)
+        # The cache stores JSON
+        return [text, base64.b64encode(encoded).decode('ascii') if encoded else None]
+    text, encoded = cached_extract(file_path, 'xlsx-stream-mapped', extract, content_hash)
+    return text, base64.b64decode(encoded) if encoded else None
+
+def xlsx_cells_to_text(cells, cell_map=None):
+    """Join cells (any iterable, so a stream works) into one line of text per spreadsheet row.
+
+    The offset of every cell in the text is added to cell_map (a
+    position_map.CellMap) when one is given.
+    """
+    lines = []
+    line = []
+    current = None
+    offset = -1
+    for sheet_name, row_num, col_name, value in cells:
+        if (sheet_name, row_num) != current:
+            if line:
+                lines.append(' '.join(line))
+            line = []
+            current = (sheet_name, row_num)
+        # One newline or space before every cell but the first
+        offset += 1
+        if cell_map is not None:
+            cell_map.add(offset, sheet_name, row_num, col_name)
+        offset += len(value)
+        line.append(value)
+    if line:
+        lines.append(' '.join(line))
+    return '\n'.join(lines)
+
+def extract_file_content(file_path):
+    try:
+        if file_path.endswith('.txt'):
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                return f.read()
+        elif file_path.endswith('.md'):
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                return f.read()
+        elif file_path.endswith('.docx'):
+            return '\n'.join(text for location, text in get_docx_blocks(file_path))
+        elif file_path.endswith('.pdf'):
+            return '\n'.join(get_pdf_pages(file_path))
+        elif file_path.endswith('.xlsx') and not os.path.basename(file_path).startswith('~$'):
+            return get_xlsx_text(file_path)
+    except Exception as e:
+        print(f"Error extracting {file_path}: {e}")
+    return ''
+
+def extract_index_content(file_path, content_hash=None):
+    """Return (text, encoded position map) of a file for the index.
+
+    The text is the same as extract_file_content(); the map is None when
+    the file could not be read. content_hash, the file's hash_file digest
+    if the caller has it, spares the extraction cache from hashing it.
+    """
+    try:
+        if file_path.endswith(('.txt', '.md')):
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+            return content, position_map.line_map(content)
+        mapped = position_map.MappedText()
+        if file_path.endswith('.docx'):
+            for location, text in get_docx_blocks(file_path, content_hash):
+                mapped.add(location, text)
+        elif file_path.endswith('.pdf'):
+            for page_num, text in enumerate(get_pdf_pages(file_path, content_hash=content_hash), start=1):
+                mapped.add(f"Page {page_num}", text)
+        elif file_path.endswith('.xlsx') and not os.path.basename(file_path).startswith('~$'):
+            return get_xlsx_mapped_text(file_path, content_hash)
+        return mapped.text(), position_map.encode(mapped.entries)
+    except Exception as e:
+        print(f"Error extracting {file_path}: {e}")
+    return '', None
@@ -19,7 +19,13 @@ import sys
 import re
 from docx import Document
 import PyPDF2
-from pdfminer.high_level import extract_text as pdfminer_extract_text
+from file_extractors import get_pdf_pages
+from extraction_cache import cached_extract
+from dir_walker import DirWalker
+
+MONITORED_EXTENSIONS = ('.doc', '.docx', '.pdf', '.txt')
+# Every Nth change check is a full scan instead of a pruned one
+FULL_SCAN_EVERY = 30
 
 # Standalone conversion functions (no GUI windows)
 def convert_doc_to_docx_standalone(doc_path, docx_path):
@@ -223,40 +229,47 @@ def try_copy_if_docx(doc_path, docx_path):
         print(f"Error checking file format: {e}")
         return False
 
+def docx_to_markdown_text(docx_path):
+    """Return the Markdown text for a DOCX file"""
+    doc = Document(docx_path)
+    markdown_content = []
+
+    for paragraph in doc.paragraphs:
+        text = paragraph.text.strip()
+        if not text:
+            markdown_content.append("")
+            continue
+
+        # Check for headings
+        style_name = paragraph.style.name if paragraph.style and paragraph.style.name else ""
+        if style_name.startswith('Heading'):
+            level_str = style_name[-1] if style_name[-1].isdigit() else "1"
+            level = int(level_str) if level_str.isdigit() else 1
+            markdown_content.append(f"{'#' * level} {text}")
+        else:
+            # Check for bold and italic
+            formatted_text = text
+            for run in paragraph.runs:
+                if run.bold and run.italic:
+                    formatted_text = formatted_text.replace(run.text, f"***{run.text}***")
+                elif run.bold:
+                    formatted_text = formatted_text.replace(run.text, f"**{run.text}**")
+                elif run.italic:
+                    formatted_text = formatted_text.replace(run.text, f"*{run.text}*")
+
+            markdown_content.append(formatted_text)
+
+    return '\n'.join(markdown_content)
+
 def convert_docx_to_markdown_standalone(docx_path, md_path):
     """Convert DOCX to Markdown without GUI"""
     try:
-        doc = Document(docx_path)
-        markdown_content = []
-        
-        for paragraph in doc.paragraphs:
-            text = paragraph.text.strip()
-            if not text:
-                markdown_content.append("")
-                continue
-                
-            # Check for headings
-            style_name = paragraph.style.name if paragraph.style and paragraph.style.name else ""
-            if style_name.startswith('Heading'):
-                level_str = style_name[-1] if style_name[-1].isdigit() else "1"
-                level = int(level_str) if level_str.isdigit() else 1
-                markdown_content.append(f"{'#' * level} {text}")
-            else:
-                # Check for bold and italic
-                formatted_text = text
-                for run in paragraph.runs:
-                    if run.bold and run.italic:
-                        formatted_text = formatted_text.replace(run.text, f"***{run.text}***")
-                    elif run.bold:
-                        formatted_text = formatted_text.replace(run.text, f"**{run.text}**")
-                    elif run.italic:
-                        formatted_text = formatted_text.replace(run.text, f"*{run.text}*")
-                
-                markdown_content.append(formatted_text)
-                
+        # Reuse the cached conversion when the DOCX has not changed
+        markdown_text = cached_extract(docx_path, 'docx-markdown', docx_to_markdown_text)
+
         # Write markdown file
         with open(md_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(markdown_content))
+            f.write(markdown_text)
             
         return True
         
@@ -282,6 +295,12 @@ class FileMonitor:
         self.config_file = "file_monitor_config.json"
         self.progress_file = "file_monitor_progress.json"  # Track processed files
         self.processed_files = {}  # Dictionary to track processed files and their status
+        # Shared walker; saved listings let most checks skip unchanged folders.
+        # SearchAuto's ignore rules are for its index, not for what gets converted
+        self.walker = DirWalker("file_monitor_walk.db", namespace="monitor",
+                                file_filter=lambda name: os.path.splitext(name)[1].lower() in MONITORED_EXTENSIONS,
+                                ignore_rules=False)
+        self.checks_since_full_scan = 0
         
         # Load configuration and progress
         self.load_config()
@@ -374,6 +393,10 @@ class FileMonitor:
         tk.Label(interval_frame, text="(1-60 seconds)", 
                 font=("Arial", 8), fg="#666666", bg="#f5f5f5").pack(side="left", padx=(5, 0))
         
+        tk.Label(status_inner, text=f"New files are seen at the next check; a file edited in place "
+                                    f"is seen at the full scan every {FULL_SCAN_EVERY} checks.",
+                font=("Arial", 8), fg="#666666", bg="#f5f5f5").pack(anchor="w", pady=(2, 0))
+        
         # Log frame
         log_frame = tk.LabelFrame(main_frame, text="📝 Activity Log", 
                                 font=("Arial", 11, "bold"), bg="#f5f5f5", fg="navy")
@@ -519,6 +542,8 @@ class FileMonitor:
         self.stop_button.config(state="normal")
         self.status_label.config(text="🟢 Monitoring active", fg="#4CAF50")
         self.log_message("Started real-time monitoring")
+        self.log_message(f"Unchanged folders are not listed again; files edited in place are picked up by the "
+                         f"full scan every {FULL_SCAN_EVERY} checks (about {FULL_SCAN_EVERY * self.monitor_interval.get()} seconds)")
         
         # Process existing files in background thread
         self.log_message("Processing existing files in background...")
@@ -533,19 +558,19 @@ class FileMonitor:
             skipped_files = 0
             
             for folder in self.monitor_folders:
-                for root, dirs, files in os.walk(folder):
-                    for file in files:
+                for root, dirs, files in self.walker.walk(folder):
+                    for file, size, mtime in files:
                         file_path = os.path.join(root, file)
                         file_ext = os.path.splitext(file)[1].lower()
                         
-                        if file_ext in ['.doc', '.docx', '.pdf', '.txt']:
+                        if file_ext in MONITORED_EXTENSIONS:
                             total_files += 1
                             
                             # Check if file is already processed
-                            if self.is_file_processed(file_path):
+                            if self.is_file_processed(file_path, f"{mtime}_{size}"):
                                 self.log_message(f"⏭️ Skipping already processed: {os.path.basename(file_path)}")
                                 skipped_files += 1
-                                self.file_hashes[file_path] = self.get_file_hash(file_path)
+                                self.file_hashes[file_path] = f"{mtime}_{size}"
                                 continue
                             
                             # Process the file
@@ -599,27 +624,28 @@ class FileMonitor:
                 
     def check_for_changes(self):
         """Check for new or changed files in monitored folders"""
+        # Folders whose mtime is unchanged reuse their saved listing; every
+        # FULL_SCAN_EVERY checks all files are statted again to catch files
+        # that were rewritten in place
+        self.checks_since_full_scan += 1
+        full_scan = self.checks_since_full_scan >= FULL_SCAN_EVERY
+        if full_scan:
+            self.checks_since_full_scan = 0
         for folder in self.monitor_folders:
             if not os.path.exists(folder):
                 continue
                 
-            for root, dirs, files in os.walk(folder):
-                for file in files:
+            for root, dirs, files in self.walker.walk(folder, prune_unchanged=not full_scan):
+                for file, size, mtime in files:
                     file_path = os.path.join(root, file)
-                    file_ext = os.path.splitext(file)[1].lower()
-                    
-                    # Only process supported file types
-                    if file_ext not in ['.doc', '.docx', '.pdf', '.txt']:
-                        continue
-                        
-                    file_hash = self.get_file_hash(file_path)
+                    file_hash = f"{mtime}_{size}"
                     
                     # Check if file is new or changed
                     if file_path not in self.file_hashes or self.file_hashes[file_path] != file_hash:
                         self.file_hashes[file_path] = file_hash
                         
                         # Check if file is already processed (for new files)
-                        if self.is_file_processed(file_path):
+                        if self.is_file_processed(file_path, file_hash):
                             self.log_message(f"⏭️ Skipping already processed: {os.path.basename(file_path)}")
                             continue
                             
@@ -860,8 +886,8 @@ class FileMonitor:
                 os.makedirs(output_dir, exist_ok=True)
                 self.log_message(f"Created directory: {output_dir}")
             
-            # Extract text from PDF
-            text = pdfminer_extract_text(pdf_path)
+            # Extract text from PDF (shared with the SearchAuto index cache)
+            text = '\n'.join(get_pdf_pages(pdf_path))
             if text:
                 # Write as markdown
                 with open(md_path, 'w', encoding='utf-8') as f:
@@ -948,10 +974,10 @@ class FileMonitor:
         except Exception as e:
             print(f"Error saving progress: {e}")
             
-    def is_file_processed(self, file_path):
+    def is_file_processed(self, file_path, file_hash=None):
         """Check if a file has been successfully processed"""
         if file_path in self.processed_files:
-            file_hash = self.get_file_hash(file_path)
+            file_hash = file_hash or self.get_file_hash(file_path)
             return self.processed_files[file_path].get('hash') == file_hash
         return False
         
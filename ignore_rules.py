@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Exclusion rules for the SearchAuto walkers.
+
+Rules come from two places and are compiled once per root:
+
+- global rules in searchauto_ignore.json next to this file (see
+  DEFAULT_GLOBAL_RULES for the format and defaults)
+- a .searchautoignore file in the root folder
+
+.searchautoignore uses gitignore syntax: '#' comments, '!' to re-include,
+a trailing '/' for folders only, a leading or inner '/' to anchor the
+pattern to the root, and '*', '?', '[...]' and '**' wildcards. These
+extra lines are also accepted (in the JSON file too, under "patterns"):
+
+    max-size: 50MB        skip larger files
+    max-depth: 8          do not descend more than 8 folders below the root
+    regex: \\.bak\\d*$     skip paths (relative, '/'-separated) matching a regex
+
+Folders are checked before the walker lists them, so an excluded folder
+costs nothing. Usage for checking the rules of a root:
+
+    python ignore_rules.py <root> [path ...]
+"""
+
+import json
+import os
+import re
+import sys
+
+IGNORE_FILE_NAME = '.searchautoignore'
+GLOBAL_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'searchauto_ignore.json')
+
+DEFAULT_GLOBAL_RULES = {
+    'patterns': [
+        '.git/', '.svn/', '.hg/', 'node_modules/', '__pycache__/', '.venv/',
+        '$RECYCLE.BIN/', 'System Volume Information/',
+    ],
+    'max_file_size_mb': 0,    # 0 = no limit
+    'max_depth': 0,           # 0 = no limit
+    'path_regexes': [],
+}
+
+_SIZE_UNITS = {'': 1, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+def parse_size(text):
+    """'50MB' -> bytes"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*', text.upper())
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+def glob_to_regex(pattern):
+    """Translate a gitignore glob (without '!' and trailing '/') to a regex on relative paths"""
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+            continue
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                inner = pattern[i + 1:end].replace('\\', '\\\\')
+                if inner.startswith('!'):
+                    inner = '^' + inner[1:]
+                parts.append('[' + inner + ']')
+                i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    body = ''.join(parts)
+    # Unanchored patterns match the name at any depth
+    return ('^' if anchored else '(?:^|/)') + body + '$'
+
+class Rule:
+    def __init__(self, kind, text, source, value=None, negate=False, dir_only=False):
+        self.kind = kind            # 'glob', 'regex', 'max-size' or 'max-depth'
+        self.text = text
+        self.source = source
+        self.value = value          # compiled regex, or the size/depth limit
+        self.negate = negate
+        self.dir_only = dir_only
+
+    def __str__(self):
+        return f"{self.text}  ({self.source})"
+
+class IgnoreRules:
+    def __init__(self, root, rules=()):
+        self.root = root
+        self.rules = list(rules)
+        self.globs = [r for r in self.rules if r.kind == 'glob']
+        self.regexes = [r for r in self.rules if r.kind == 'regex']
+        self.max_size = min((r for r in self.rules if r.kind == 'max-size'), key=lambda r: r.value, default=None)
+        self.max_depth = min((r for r in self.rules if r.kind == 'max-depth'), key=lambda r: r.value, default=None)
+        # rule -> {'dirs': n, 'files': n} pruned while walking
+        self.counts = {}
+
+    @classmethod
+    def load(cls, root, global_rules=None):
+        """Compile the global rules and root/.searchautoignore"""
+        if global_rules is None:
+            global_rules = load_global_rules()
+        rules = parse_global_rules(global_rules)
+        ignore_path = os.path.join(root, IGNORE_FILE_NAME)
+        if os.path.isfile(ignore_path):
+            with open(ignore_path, 'r', encoding='utf-8', errors='ignore') as f:
+                rules.extend(parse_rule_lines(f.read().splitlines(), ignore_path))
+        return cls(root, rules)
+
+    def _match_globs(self, rel_path, is_dir):
+        matched = None
+        for rule in self.globs:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.value.search(rel_path):
+                matched = None if rule.negate else rule
+        return matched
+
+    def _match_path(self, rel_path, is_dir):
+        rule = self._match_globs(rel_path, is_dir)
+        if rule:
+            return rule
+        for rule in self.regexes:
+            if rule.value.search(rel_path):
+                return rule
+        return None
+
+    def skip_dir(self, rel_path):
+        """Return the rule excluding a folder (relative, '/'-separated), or None"""
+        if self.max_depth and rel_path.count('/') + 1 > self.max_depth.value:
+            return self.max_depth
+        return self._match_path(rel_path, True)
+
+    def skip_file(self, rel_path, size=None):
+        """Return the rule excluding a file, or None"""
+        if self.max_size and size is not None and size > self.max_size.value:
+            return self.max_size
+        return self._match_path(rel_path, False)
+
+    def count(self, rule, what, n=1):
+        entry = self.counts.setdefault(rule, {'dirs': 0, 'files': 0})
+        entry[what] += n
+
+    def relative(self, path):
+        rel = os.path.relpath(path, self.root)
+        return '' if rel == os.curdir else rel.replace(os.sep, '/')
+
+    def explain(self, path):
+        """Return (rule, excluded_path) if path or one of its folders is excluded, else None"""
+        rel = self.relative(path)
+        if not rel or rel.startswith('../'):
+            return None
+        parts = rel.split('/')
+        for depth in range(1, len(parts)):
+            rule = self.skip_dir('/'.join(parts[:depth]))
+            if rule:
+                return rule, os.path.join(self.root, *parts[:depth])
+        if os.path.isdir(path):
+            rule = self.skip_dir(rel)
+        else:
+            rule = self.skip_file(rel, os.path.getsize(path) if os.path.exists(path) else None)
+        return (rule, path) if rule else None
+
+def parse_rule_lines(lines, source):
+    """Compile .searchautoignore lines into Rule objects"""
+    case_flag = re.IGNORECASE if os.name == 'nt' else 0
+    rules = []
+    for number, line in enumerate(lines, start=1):
+        text = line.strip()
+        if not text or text.startswith('#'):
+            continue
+        where = f"{source}:{number}"
+        directive, _, value = text.partition(':')
+        directive = directive.strip().lower()
+        try:
+            if directive == 'max-size':
+                rules.append(Rule('max-size', text, where, parse_size(value)))
+            elif directive == 'max-depth':
+                rules.append(Rule('max-depth', text, where, int(value)))
+            elif directive == 'regex':
+                rules.append(Rule('regex', text, where, re.compile(value.strip(), case_flag)))
+            else:
+                negate = text.startswith('!')
+                pattern = text[1:] if negate else text
+                dir_only = pattern.endswith('/')
+                pattern = pattern.rstrip('/')
+                if pattern:
+                    rules.append(Rule('glob', text, where, re.compile(glob_to_regex(pattern), case_flag), negate, dir_only))
+        except (ValueError, re.error) as e:
+            print(f"Ignoring invalid rule {where}: {text} ({e})")
+    return rules
+
+def parse_global_rules(global_rules):
+    lines = list(global_rules.get('patterns', []))
+    if global_rules.get('max_file_size_mb'):
+        lines.append(f"max-size: {global_rules['max_file_size_mb']}MB")
+    if global_rules.get('max_depth'):
+        lines.append(f"max-depth: {global_rules['max_depth']}")
+    lines.extend(f"regex: {regex}" for regex in global_rules.get('path_regexes', []))
+    return parse_rule_lines(lines, 'global rules')
+
+def load_global_rules(path=GLOBAL_RULES_FILE):
+    """Read the global rules, falling back to DEFAULT_GLOBAL_RULES"""
+    rules = dict(DEFAULT_GLOBAL_RULES)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            rules.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Error reading {path}: {e}")
+    return rules
+
+def report(root, global_rules=None):
+    """Walk root and return {rule: {'dirs': n, 'files': n}} for everything the rules prune.
+
+    Unlike the indexer, this also counts the files inside excluded folders.
+    """
+    rules = IgnoreRules.load(root, global_rules)
+    for current, dirs, files in os.walk(root):
+        rel_dir = rules.relative(current)
+        kept = []
+        for name in dirs:
+            rel = f"{rel_dir}/{name}" if rel_dir else name
+            rule = rules.skip_dir(rel)
+            if rule:
+                rules.count(rule, 'dirs')
+                rules.count(rule, 'files', sum(len(f) for _, _, f in os.walk(os.path.join(current, name))))
+            else:
+                kept.append(name)
+        dirs[:] = kept
+        for name in files:
+            rel = f"{rel_dir}/{name}" if rel_dir else name
+            try:
+                size = os.path.getsize(os.path.join(current, name))
+            except OSError:
+                size = None
+            rule = rules.skip_file(rel, size)
+            if rule:
+                rules.count(rule, 'files')
+    return rules.counts
+
+def format_report(root, paths=()):
+    """Text listing the rules of root, why each of paths is skipped, and what each rule prunes"""
+    rules = IgnoreRules.load(root)
+    lines = [f"Rules for {root}:"]
+    lines.extend(f"  {rule}" for rule in rules.rules)
+    for path in paths:
+        result = rules.explain(os.path.abspath(path))
+        if result:
+            rule, excluded = result
+            via = f" via {excluded}" if excluded != os.path.abspath(path) else ""
+            lines.append(f"{path}: skipped by '{rule.text}' ({rule.source}){via}")
+        else:
+            lines.append(f"{path}: not excluded")
+    lines.append("Pruned per rule:")
+    counts = report(root)
+    for rule, entry in sorted(counts.items(), key=lambda item: -item[1]['files']):
+        lines.append(f"  {entry['files']:8d} files  {entry['dirs']:6d} folders  {rule.text}")
+    if not counts:
+        lines.append("  nothing")
+    return '\n'.join(lines)
+
+def main():
+    """Explain the rules of a root, and why each given path is skipped"""
+    if len(sys.argv) < 2:
+        print("Usage: python ignore_rules.py <root> [path ...]")
+        sys.exit(1)
+    print(format_report(os.path.abspath(sys.argv[1]), sys.argv[2:]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,783 @@
+"""
+SQLite helpers for the SearchAuto file index.
+
+The index runs in WAL mode so searches can keep reading while a rebuild
+is writing. All writes during indexing go through IndexWriter, which
+groups rows into size-bounded transactions.
+
+Schema:
+    roots          - the configured root folders
+    indexed_files  - one row per file (path, root, type, mtime, size, plus
+                     inode and a sampled-content fingerprint used to detect
+                     moves), with B-tree indexes for root/mtime/size/type.
+                     content_id points at the file's content
+    file_contents  - one row per unique content, keyed by the hash of the
+                     source file's bytes. Copies of a document share one
+                     row, and it is dropped with the last file using it
+    file_segments  - the content rows of each content: segment 0 holds the
+                     content at extraction time, and text files that only
+                     grew get one more segment per append, starting at the
+                     byte offset where the indexed part ended. Each
+                     segment has the position map of its text (pages,
+                     paragraphs, cells or lines, see position_map)
+    file_index     - FTS5 table holding only the content; its rowid is
+                     file_segments.id. It uses either the default unicode61
+                     tokenizer or the trigram tokenizer (CJK mode)
+    index_jobs     - one row per root of an unfinished rebuild, with the
+                     walk cursor checkpointed by IndexWriter
+    quarantine     - files whose extraction timed out, ran out of memory or
+                     crashed (see extraction_watchdog)
+
+A rebuild fills the *_shadow generation of these four tables while searches
+keep using the live tables, then swap_shadow() renames them into place.
+"""
+
+import itertools
+import sqlite3
+import time
+import unicodedata
+
+import position_map
+
+# Pragmas applied to every index connection
+CONNECTION_PRAGMAS = {
+    'synchronous': 'NORMAL',     # safe with WAL, far fewer fsyncs than FULL
+    'cache_size': -64000,        # 64 MB page cache (negative = KiB)
+    'mmap_size': 268435456,      # map up to 256 MB of the database file
+    'temp_store': 'MEMORY',
+}
+
+# Limits for one write transaction
+WRITE_BATCH_ROWS = 500
+WRITE_BATCH_BYTES = 16 * 1024 * 1024
+
+SCHEMA_VERSION = 7
+
+# FTS5 tokenizers for file_index. unicode61 splits on spaces and
+# punctuation, which leaves a run of Chinese text as one huge token.
+# trigram indexes every 3-character sequence instead, so CJK substrings
+# can be matched through the inverted index.
+TOKENIZERS = {
+    'unicode61': 'unicode61',
+    'trigram': 'trigram case_sensitive 0',
+}
+DEFAULT_TOKENIZER = 'unicode61'
+TRIGRAM_MIN_CHARS = 3
+# A keyword part found in more distinct index terms than this does not
+# narrow down the candidates of find_candidates()
+MAX_CANDIDATE_TERMS = 200
+# The non-ASCII characters whose lower case holds an ASCII letter, which
+# SQLite's ASCII-only lower() leaves alone
+ASCII_LOWERING = (('k', '\u212a'), ('i', '\u0130'))
+
+# Rebuilds write into shadow tables (indexed_files_shadow, file_contents_shadow,
+# file_segments_shadow, file_index_shadow) and swap them in when done; the
+# replaced generation gets the old suffix
+SHADOW_SUFFIX = '_shadow'
+OLD_SUFFIX = '_old'
+GENERATION_TABLES = ('indexed_files', 'file_contents', 'file_segments', 'file_index')
+
+# A file with this many append segments is extracted again as a whole
+MAX_SEGMENTS = 32
+
+# Joins a file_index hit to its segment s and to every file f with that content
+HIT_JOIN = 'JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id'
+FTS_OPERATORS = ('AND', 'OR', 'NOT')
+
+# bm25 weight for each file_index column, in column order
+BM25_WEIGHTS = {
+    'content': 1.0,
+}
+
+def connect_index(db_path, timeout=30):
+    """Open an index connection in WAL mode with the tuned pragmas"""
+    conn = sqlite3.connect(db_path, timeout=timeout)
+    conn.execute('PRAGMA journal_mode=WAL')
+    for name, value in CONNECTION_PRAGMAS.items():
+        conn.execute(f'PRAGMA {name}={value}')
+    return conn
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+def _table_exists(c, name):
+    return c.execute("SELECT 1 FROM sqlite_master WHERE name=?", (name,)).fetchone() is not None
+
+def _index_prefix(c, kinds=('root', 'content', 'contents', 'segments')):
+    """Pick a free name prefix for the B-tree indexes of one generation.
+
+    A shadow table lives next to the live one until it is swapped in, so
+    the two generations need different index names.
+    """
+    names = {row[0] for row in c.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    prefix, generation = 'idx_indexed_files', 1
+    while any(f'{prefix}_{kind}' in names for kind in kinds):
+        prefix = f'idx_indexed_files_g{generation}'
+        generation += 1
+    return prefix
+
+def _create_contents_table(c, suffix, prefix):
+    # content_hash is NULL for content that cannot be shared: migrated rows,
+    # and text that was extended by appends
+    c.execute(f'''CREATE TABLE file_contents{suffix} (
+        id INTEGER PRIMARY KEY,
+        content_hash TEXT
+    )''')
+    c.execute(f'CREATE UNIQUE INDEX {prefix}_contents ON file_contents{suffix} (content_hash)')
+
+def _create_segments_table(c, suffix, prefix):
+    c.execute(f'''CREATE TABLE file_segments{suffix} (
+        id INTEGER PRIMARY KEY,
+        content_id INTEGER NOT NULL,
+        start INTEGER NOT NULL DEFAULT 0,
+        positions BLOB
+    )''')
+    c.execute(f'CREATE UNIQUE INDEX {prefix}_segments ON file_segments{suffix} (content_id, start)')
+
+def _drop_triggers(c, suffix):
+    c.execute(f'DROP TRIGGER IF EXISTS indexed_files{suffix}_ad')
+    c.execute(f'DROP TRIGGER IF EXISTS indexed_files{suffix}_au')
+
+def _create_file_tables(c, suffix='', tokenizer=DEFAULT_TOKENIZER):
+    """Create the indexed_files, file_contents, file_segments and file_index tables of a generation"""
+    files, contents, segments, fts = (table + suffix for table in GENERATION_TABLES)
+    prefix = None
+    if not _table_exists(c, files):
+        c.execute(f'''CREATE TABLE {files} (
+            id INTEGER PRIMARY KEY,
+            file_path TEXT NOT NULL,
+            root_path TEXT NOT NULL,
+            file_type TEXT,
+            mtime REAL,
+            size INTEGER,
+            inode INTEGER,
+            fingerprint TEXT,
+            indexed_bytes INTEGER,
+            prefix_hash TEXT,
+            content_id INTEGER,
+            UNIQUE (file_path, root_path)
+        )''')
+        prefix = _index_prefix(c)
+        for name, column in (('root', 'root_path'), ('mtime', 'mtime'), ('size', 'size'), ('type', 'file_type'),
+                             ('content', 'content_id')):
+            c.execute(f'CREATE INDEX {prefix}_{name} ON {files} ({column})')
+    if not _table_exists(c, contents):
+        _create_contents_table(c, suffix, prefix or _index_prefix(c, ('contents',)))
+    if not _table_exists(c, segments):
+        _create_segments_table(c, suffix, prefix or _index_prefix(c, ('segments',)))
+    c.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(content, tokenize='{TOKENIZERS[tokenizer]}')")
+    # Content is dropped with the last file pointing at it, so deleting a
+    # root is a single indexed DELETE on indexed_files
+    release = f'''
+        DELETE FROM {fts} WHERE rowid IN (SELECT id FROM {segments} WHERE content_id = old.content_id);
+        DELETE FROM {segments} WHERE content_id = old.content_id;
+        DELETE FROM {contents} WHERE id = old.content_id;'''
+    unused = f'NOT EXISTS (SELECT 1 FROM {files} WHERE content_id = old.content_id)'
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS {files}_ad AFTER DELETE ON {files}
+        WHEN {unused} BEGIN{release}
+    END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS {files}_au AFTER UPDATE OF content_id ON {files}
+        WHEN old.content_id IS NOT new.content_id AND {unused} BEGIN{release}
+    END''')
+
+# Columns added to indexed_files after version 2, added in place on upgrade
+ADDED_FILE_COLUMNS = (
+    ('inode', 'INTEGER'),
+    ('fingerprint', 'TEXT'),
+    ('indexed_bytes', 'INTEGER'),
+    ('prefix_hash', 'TEXT'),
+    ('content_id', 'INTEGER'),
+)
+
+def _upgrade_generation(c, suffix=''):
+    """Bring a generation created by an older version up to the current layout"""
+    files, contents, segments, fts = (table + suffix for table in GENERATION_TABLES)
+    columns = _table_columns(c, files)
+    for column, decl in ADDED_FILE_COLUMNS:
+        if column not in columns:
+            c.execute(f'ALTER TABLE {files} ADD COLUMN {column} {decl}')
+    if 'content_id' not in columns:
+        c.execute(f'CREATE INDEX {_index_prefix(c, ("content",))}_content ON {files} (content_id)')
+    if not _table_exists(c, contents):
+        # Before version 5 every file owned its content: the content id is
+        # the file id, and none of it is shared
+        _create_contents_table(c, suffix, _index_prefix(c, ('contents',)))
+        c.execute(f'INSERT INTO {contents} (id) SELECT id FROM {files}')
+        c.execute(f'UPDATE {files} SET content_id = id')
+    if not _table_exists(c, segments):
+        # Before version 4 the content rowid was the file id: every existing
+        # content row becomes segment 0 of its file, under the same rowid
+        _create_segments_table(c, suffix, _index_prefix(c, ('segments',)))
+        c.execute(f'INSERT INTO {segments} (id, content_id, start) SELECT rowid, rowid, 0 FROM {fts}')
+    elif 'file_id' in _table_columns(c, segments):
+        c.execute(f'ALTER TABLE {segments} RENAME COLUMN file_id TO content_id')
+    if 'positions' not in _table_columns(c, segments):
+        # Segments indexed before version 7 have no position map
+        c.execute(f'ALTER TABLE {segments} ADD COLUMN positions BLOB')
+    _drop_triggers(c, suffix)
+    _create_file_tables(c, suffix)
+
+def _create_tables(c, tokenizer=DEFAULT_TOKENIZER):
+    c.execute('''CREATE TABLE IF NOT EXISTS roots (root_path TEXT PRIMARY KEY)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS index_jobs (
+        root_path TEXT PRIMARY KEY,
+        cursor TEXT,
+        started REAL,
+        updated REAL
+    )''')
+    # Files whose extraction hung, ran out of memory or crashed; skipped
+    # until their size or mtime changes
+    c.execute('''CREATE TABLE IF NOT EXISTS quarantine (
+        file_path TEXT PRIMARY KEY,
+        size INTEGER,
+        mtime REAL,
+        reason TEXT,
+        seconds REAL,
+        added REAL
+    )''')
+    _create_file_tables(c, '', tokenizer)
+
+def _migrate_flat_fts(c):
+    """Move the old single-table layout into indexed_files + file_index.
+
+    The old file_index stored file_path, file_type, mtime, content and
+    root_path all as FTS5 columns. Rows keep their old rowid as the new
+    file id; duplicate (file_path, root_path) rows are dropped.
+    """
+    print("Migrating file index to the normalized schema...")
+    c.execute('ALTER TABLE file_index RENAME TO file_index_legacy')
+    _create_tables(c)
+    c.execute('''INSERT OR IGNORE INTO indexed_files (id, file_path, root_path, file_type, mtime)
+                 SELECT rowid, file_path, root_path, file_type, CAST(mtime AS REAL)
+                 FROM file_index_legacy ORDER BY rowid''')
+    c.execute('UPDATE indexed_files SET content_id = id')
+    c.execute('INSERT INTO file_contents (id) SELECT id FROM indexed_files')
+    c.execute('INSERT INTO file_segments (id, content_id, start) SELECT id, id, 0 FROM indexed_files')
+    c.execute('''INSERT INTO file_index (rowid, content)
+                 SELECT l.rowid, l.content FROM file_index_legacy l
+                 JOIN indexed_files f ON f.id = l.rowid''')
+    c.execute('DROP TABLE file_index_legacy')
+
+def ensure_schema(conn):
+    """Create the index tables, migrating older layouts in place"""
+    c = conn.cursor()
+    if c.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION:
+        return
+    columns = _table_columns(conn, 'file_index')
+    c.execute('BEGIN')
+    try:
+        if columns and 'file_path' in columns and 'root_path' not in columns:
+            # Layout from before multiple roots were supported: rebuild from scratch
+            c.execute('DROP TABLE file_index')
+            columns = []
+        if 'file_path' in columns:
+            _migrate_flat_fts(c)
+        for suffix in ('', SHADOW_SUFFIX):
+            if _table_exists(c, 'indexed_files' + suffix):
+                _upgrade_generation(c, suffix)
+        _create_tables(c)
+        c.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def get_index_jobs(conn):
+    """Return {root_path: cursor} for every root of an unfinished rebuild.
+
+    cursor is the last directory (relative to the root, '/'-separated) whose
+    files are all committed, or None if no directory has finished yet.
+    """
+    return dict(conn.execute('SELECT root_path, cursor FROM index_jobs').fetchall())
+
+def start_index_jobs(conn, roots):
+    """Record a new rebuild of roots, replacing any unfinished one"""
+    now = time.time()
+    with conn:
+        conn.execute('DELETE FROM index_jobs')
+        conn.executemany('INSERT INTO index_jobs (root_path, cursor, started, updated) VALUES (?, NULL, ?, ?)',
+                         [(root_path, now, now) for root_path in roots])
+
+def finish_index_jobs(conn, roots=None):
+    """Forget the rebuild of roots (all roots when omitted) once it completed"""
+    with conn:
+        if roots is None:
+            conn.execute('DELETE FROM index_jobs')
+        else:
+            conn.executemany('DELETE FROM index_jobs WHERE root_path=?', [(r,) for r in roots])
+
+def get_tokenizer(conn):
+    """Return the tokenizer mode of file_index: 'unicode61' or 'trigram'"""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name='file_index'").fetchone()
+    if row and 'trigram' in row[0]:
+        return 'trigram'
+    return 'unicode61'
+
+def _retokenize(c, suffix, tokenizer):
+    fts = 'file_index' + suffix
+    _drop_triggers(c, suffix)
+    c.execute(f'ALTER TABLE {fts} RENAME TO {fts}_retokenize')
+    _create_file_tables(c, suffix, tokenizer)
+    c.execute(f'INSERT INTO {fts} (rowid, content) SELECT rowid, content FROM {fts}_retokenize')
+    c.execute(f'DROP TABLE {fts}_retokenize')
+
+def set_tokenizer(conn, tokenizer):
+    """Rebuild file_index with another tokenizer.
+
+    The stored content is copied into the new table, so no file has to be
+    extracted again. An unfinished shadow rebuild is converted as well.
+    Returns False if the index already uses tokenizer.
+    """
+    if tokenizer not in TOKENIZERS:
+        raise ValueError(f"Unknown tokenizer: {tokenizer}")
+    if get_tokenizer(conn) == tokenizer:
+        return False
+    print(f"Rebuilding file index with the {tokenizer} tokenizer...")
+    c = conn.cursor()
+    c.execute('BEGIN')
+    try:
+        _retokenize(c, '', tokenizer)
+        if _table_exists(c, 'file_index' + SHADOW_SUFFIX):
+            _retokenize(c, SHADOW_SUFFIX, tokenizer)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
+
+def has_shadow(conn):
+    """True if an unfinished rebuild left shadow tables behind"""
+    return _table_exists(conn, 'indexed_files' + SHADOW_SUFFIX)
+
+def create_shadow(conn):
+    """Start a rebuild generation: empty shadow tables using the live tokenizer"""
+    tokenizer = get_tokenizer(conn)
+    c = conn.cursor()
+    c.execute('BEGIN')
+    try:
+        _drop_generation(c, SHADOW_SUFFIX)
+        _create_file_tables(c, SHADOW_SUFFIX, tokenizer)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def swap_shadow(conn):
+    """Make the finished shadow tables the live index in one transaction.
+
+    The previous generation is renamed to *_old and the rebuild job is
+    cleared in the same transaction. Searches that started before the swap
+    keep reading the old tables from their WAL snapshot.
+    """
+    c = conn.cursor()
+    c.execute('BEGIN IMMEDIATE')
+    try:
+        _drop_generation(c, OLD_SUFFIX)
+        _drop_triggers(c, '')
+        _drop_triggers(c, SHADOW_SUFFIX)
+        for table in GENERATION_TABLES:
+            c.execute(f'ALTER TABLE {table} RENAME TO {table}{OLD_SUFFIX}')
+            c.execute(f'ALTER TABLE {table}{SHADOW_SUFFIX} RENAME TO {table}')
+        _create_file_tables(c)
+        c.execute('DELETE FROM index_jobs')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def _drop_generation(c, suffix):
+    for table in GENERATION_TABLES:
+        c.execute(f'DROP TABLE IF EXISTS {table}{suffix}')
+
+def drop_old_generations(conn):
+    """Delete index tables left behind by earlier swaps"""
+    if any(_table_exists(conn, table + OLD_SUFFIX) for table in GENERATION_TABLES):
+        with conn:
+            _drop_generation(conn.cursor(), OLD_SUFFIX)
+
+def bm25_rank_function(weights=None):
+    """Return the FTS5 rank function string, e.g. 'bm25(1.0)', for a rank MATCH constraint"""
+    weights = weights or BM25_WEIGHTS
+    return 'bm25(' + ', '.join(str(float(weights[name])) for name in weights) + ')'
+
+def build_match_query(keyword, tokenizer):
+    """Turn a search keyword into an FTS5 MATCH expression.
+
+    Returns None when the index cannot answer the query and the caller has
+    to fall back to a LIKE scan: non-Latin text on a unicode61 index, or a
+    term shorter than three characters on a trigram index.
+    """
+    has_non_latin = any(ord(char) > 127 for char in keyword)
+    if tokenizer != 'trigram':
+        return None if has_non_latin else keyword
+    terms = [t for t in keyword.split() if t not in FTS_OPERATORS]
+    if not terms or any(len(t) < TRIGRAM_MIN_CHARS for t in terms):
+        return None
+    if not has_non_latin:
+        return keyword
+    # Quote each term so CJK punctuation is not parsed as FTS5 syntax
+    return ' '.join('"' + t.replace('"', '""') + '"' for t in keyword.split())
+
+def _token_parts(keyword):
+    """Split keyword into the runs of characters unicode61 keeps in tokens (letters, numbers, Co)"""
+    parts = []
+    current = ''
+    for char in keyword:
+        category = unicodedata.category(char)
+        if category[0] in 'LN' or category == 'Co':
+            current += char
+        elif current:
+            parts.append(current)
+            current = ''
+    if current:
+        parts.append(current)
+    return parts
+
+def _fold(text):
+    """Lower-case text and drop its diacritics, as unicode61 folds tokens"""
+    return ''.join(c for c in unicodedata.normalize('NFD', text.lower()) if not unicodedata.combining(c))
+
+def _term_filter(conn, part):
+    """MATCH expression for the index terms containing part, '' if there are none, None if too many"""
+    variants = sorted({_fold(part), part.lower()})
+    where = ' OR '.join('instr(term, ?) > 0' for _ in variants)
+    terms = [row[0] for row in conn.execute(f'SELECT term FROM temp.file_index_terms WHERE {where} LIMIT ?',
+                                            (*variants, MAX_CANDIDATE_TERMS + 1))]
+    if len(terms) > MAX_CANDIDATE_TERMS:
+        return None
+    return ' OR '.join('"' + t.replace('"', '""') + '"' for t in terms)
+
+def find_candidates(conn, keyword, tokenizer=None):
+    """Return the paths of indexed files whose text may contain keyword.
+
+    Every file whose stored text contains keyword as a case-insensitive
+    substring is included, so scanning just these files finds what a scan
+    of all of them would. On a trigram index a quoted MATCH finds the
+    substring directly. On a unicode61 index each run of token characters
+    of keyword must lie inside an index term: the matching terms are looked
+    up in the vocabulary and the files containing them are fetched through
+    FTS5. Keywords neither can narrow down (too short, or made of very
+    common fragments) fall back to a scan of the stored text, done by
+    SQLite for ASCII keywords and by a Python function otherwise. The scan
+    is logged with its time, since it reads every stored text.
+    """
+    tokenizer = tokenizer or get_tokenizer(conn)
+    select = f'SELECT DISTINCT f.file_path FROM file_index {HIT_JOIN}'
+    if tokenizer == 'trigram':
+        if len(keyword) >= TRIGRAM_MIN_CHARS:
+            query = '"' + keyword.replace('"', '""') + '"'
+            return {row[0] for row in conn.execute(f'{select} WHERE file_index MATCH ?', (query,))}
+    else:
+        conn.execute('CREATE VIRTUAL TABLE IF NOT EXISTS temp.file_index_terms USING fts5vocab(main, file_index, row)')
+        groups = []
+        for part in _token_parts(keyword):
+            terms = _term_filter(conn, part)
+            if terms == '':
+                return set()
+            if terms is not None:
+                groups.append(f'({terms})')
+        if groups:
+            return {row[0] for row in conn.execute(f'{select} WHERE file_index MATCH ?', (' AND '.join(groups),))}
+    folded = keyword.lower()
+    started = time.perf_counter()
+    if folded.isascii():
+        conditions = ['instr(lower(file_index.content), ?) > 0']
+        params = [folded]
+        for letter, char in ASCII_LOWERING:
+            if letter in folded:
+                conditions.append('instr(file_index.content, ?) > 0')
+                params.append(char)
+        rows = conn.execute(f'{select} WHERE {" OR ".join(conditions)}', params)
+    else:
+        conn.create_function('contains_keyword', 1, lambda content: folded in (content or '').lower(), deterministic=True)
+        rows = conn.execute(f'{select} WHERE contains_keyword(file_index.content)')
+    candidates = {row[0] for row in rows}
+    print(f"Index candidates for {keyword!r} found by scanning the stored text: "
+          f"{len(candidates)} files in {time.perf_counter() - started:.2f} s")
+    return candidates
+
+def get_indexed_files(conn):
+    """Return {file_path: (mtime, size)} for every indexed file"""
+    return {row[0]: (row[1], row[2]) for row in conn.execute('SELECT file_path, mtime, size FROM indexed_files')}
+
+def hit_term(keyword):
+    """The first plain term of a keyword, used to find where an FTS5 hit is in its text"""
+    for term in keyword.split():
+        term = term.strip('"()*^')
+        if term and term not in FTS_OPERATORS and not term.startswith('NEAR'):
+            return term
+    return keyword
+
+def get_quarantine(conn):
+    """Return {file_path: (size, mtime, reason, seconds)} for every quarantined file"""
+    return {row[0]: row[1:] for row in conn.execute('SELECT file_path, size, mtime, reason, seconds FROM quarantine')}
+
+def get_content_hashes(conn, shadow=False):
+    """Return the set of content hashes stored in the live (or shadow) tables"""
+    suffix = SHADOW_SUFFIX if shadow else ''
+    return {row[0] for row in conn.execute(f'SELECT content_hash FROM file_contents{suffix} WHERE content_hash IS NOT NULL')}
+
+def iter_file_contents(conn, file_path=None):
+    """Yield (file_path, file_type, content) per indexed file, its segments joined in order.
+
+    A line that was still being written when a segment was indexed is
+    repeated at the start of the next segment.
+    """
+    where, params = ('WHERE f.file_path=?', (file_path,)) if file_path is not None else ('', ())
+    rows = conn.execute(f'''SELECT f.id, f.file_path, f.file_type, file_index.content
+                            FROM indexed_files f JOIN file_segments s ON s.content_id = f.content_id
+                            JOIN file_index ON file_index.rowid = s.id {where}
+                            ORDER BY f.id, s.start''', params)
+    for (_, path, file_type), group in itertools.groupby(rows, key=lambda row: row[:3]):
+        yield path, file_type, ''.join(row[3] for row in group)
+
+def locate_hits(conn, hits):
+    """Return the location label of each (segment id, offset) hit, or None.
+
+    offset is the 1-based character position of the hit in the segment
+    text, as instr() returns it; 0 means unknown. Each segment's map is
+    decoded once, and line numbers are counted in SQL.
+    """
+    segment_ids = {segment_id for segment_id, offset in hits if offset}
+    maps = {}
+    for chunk in _chunks(sorted(segment_ids), 500):
+        placeholders = ','.join('?' for _ in chunk)
+        for segment_id, data in conn.execute(f'SELECT id, positions FROM file_segments WHERE id IN ({placeholders})', chunk):
+            maps[segment_id] = position_map.decode(data)
+    locations = []
+    for segment_id, offset in hits:
+        positions = maps.get(segment_id)
+        if not offset or not positions:
+            locations.append(None)
+            continue
+        lines_before = 0
+        if positions.is_line_map:
+            lines_before = conn.execute(
+                "SELECT length(t) - length(replace(t, char(10), '')) FROM (SELECT substr(content, 1, ?) AS t FROM file_index WHERE rowid=?)",
+                (offset - 1, segment_id)).fetchone()[0]
+        locations.append(positions.locate(offset - 1, lines_before))
+    return locations
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+class IndexWriter:
+    """Buffered writer for the file, content, segment and FTS rows of the index.
+
+    Rows are collected in memory and written in one transaction per batch.
+    A batch is flushed when it reaches max_rows rows or max_bytes of
+    content, whichever comes first.
+
+    Content is stored once per content_hash: a file whose hash is already
+    stored is pointed at the existing content and its own text is dropped.
+    insert() and update() accept content=None for such a file, so copies
+    need not be extracted at all; should the hash be gone by the time the
+    row is written, extract(file_path) supplies the (text, position map)
+    instead. An appended segment gets a line map that continues the line
+    count of the segment before it.
+
+    checkpoint() stores a rebuild cursor in index_jobs as part of the next
+    batch, so a cursor is never committed ahead of the rows it covers.
+    quarantine() and release() add and remove quarantine entries the same way.
+
+    A batch that fails to write is rolled back and its sqlite3.Error kept
+    in error. Nothing is written after that, so no later checkpoint is
+    committed past the lost rows.
+    """
+
+    # {files} / {contents} / {segments} / {fts} are the live tables, or the
+    # shadow generation during a rebuild
+    DELETE_SQL = 'DELETE FROM {files} WHERE file_path=? AND root_path=?'
+    INSERT_FILE_SQL = ('INSERT INTO {files} (file_type, mtime, size, inode, fingerprint, indexed_bytes, prefix_hash, content_id, '
+                       'file_path, root_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)')
+    UPDATE_FILE_SQL = ('UPDATE {files} SET file_type=COALESCE(?, file_type), mtime=?, size=?, inode=?, fingerprint=?, '
+                       'indexed_bytes=?, prefix_hash=?, content_id=? WHERE file_path=? AND root_path=?')
+    MOVE_SQL = 'UPDATE {files} SET file_path=?, root_path=?, mtime=?, size=?, inode=?, fingerprint=? WHERE file_path=? AND root_path=?'
+    FILE_CONTENT_SQL = 'SELECT content_id FROM {files} WHERE file_path=? AND root_path=?'
+    FIND_CONTENT_SQL = 'SELECT id FROM {contents} WHERE content_hash=?'
+    INSERT_CONTENT_SQL = 'INSERT INTO {contents} (content_hash) VALUES (?)'
+    # Appending makes the content differ from the file it was hashed from
+    UNSHARE_CONTENT_SQL = 'UPDATE {contents} SET content_hash=NULL WHERE id=?'
+    INSERT_SEGMENT_SQL = 'INSERT INTO {segments} (content_id, start, positions) VALUES (?, ?, ?)'
+    PREVIOUS_SEGMENT_SQL = 'SELECT positions FROM {segments} WHERE content_id=? AND start<? ORDER BY start DESC LIMIT 1'
+    INSERT_TEXT_SQL = 'INSERT INTO {fts} (rowid, content) VALUES (?, ?)'
+    # Drop the segments of a content from a byte offset on
+    TRIM_TEXT_SQL = 'DELETE FROM {fts} WHERE rowid IN (SELECT id FROM {segments} WHERE content_id=? AND start>=?)'
+    TRIM_SEGMENTS_SQL = 'DELETE FROM {segments} WHERE content_id=? AND start>=?'
+    CHECKPOINT_SQL = 'UPDATE index_jobs SET cursor=?, updated=? WHERE root_path=?'
+    QUARANTINE_SQL = 'INSERT OR REPLACE INTO quarantine (file_path, size, mtime, reason, seconds, added) VALUES (?, ?, ?, ?, ?, ?)'
+    RELEASE_SQL = 'DELETE FROM quarantine WHERE file_path=?'
+
+    def __init__(self, db_path, max_rows=WRITE_BATCH_ROWS, max_bytes=WRITE_BATCH_BYTES, shadow=False, extract=None):
+        self.conn = connect_index(db_path)
+        suffix = SHADOW_SUFFIX if shadow else ''
+        tables = dict(zip(('files', 'contents', 'segments', 'fts'), (table + suffix for table in GENERATION_TABLES)))
+        for name in dir(self):
+            if name.endswith('_SQL'):
+                setattr(self, name, getattr(self, name).format(**tables))
+        self.extract = extract
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self._files = []
+        self._appends = []
+        self._deletes = []
+        self._moves = []
+        self._checkpoints = {}
+        self._quarantine = {}
+        self._pending_bytes = 0
+        self.rows_written = 0
+        self.contents_reused = 0
+        self.transactions = 0
+        self.write_seconds = 0.0
+        self.started = time.time()
+        self.error = None
+
+    def _pending_rows(self):
+        return len(self._files) + len(self._appends) + len(self._deletes) + len(self._moves)
+
+    def _add(self, target, row, content=''):
+        target.append(row)
+        self._pending_bytes += len(content or '')
+        if self._pending_rows() >= self.max_rows or self._pending_bytes >= self.max_bytes:
+            self.flush()
+
+    def insert(self, file_path, file_type, mtime, content, root_path, size=None, inode=None, fingerprint=None,
+               indexed_bytes=None, prefix_hash=None, content_hash=None, positions=None):
+        """Add a file, or replace an indexed file at the same path"""
+        self._add(self._files, (True, file_path, root_path, file_type, mtime, size, inode, fingerprint,
+                                indexed_bytes, prefix_hash, content_hash, content, positions), content)
+
+    def update(self, file_path, mtime, content, root_path, size=None, inode=None, fingerprint=None,
+               indexed_bytes=None, prefix_hash=None, content_hash=None, positions=None):
+        """Replace the content of an indexed file"""
+        self._add(self._files, (False, file_path, root_path, None, mtime, size, inode, fingerprint,
+                                indexed_bytes, prefix_hash, content_hash, content, positions), content)
+
+    def append(self, file_path, root_path, start, content, mtime, size=None, inode=None, fingerprint=None,
+               indexed_bytes=None, prefix_hash=None):
+        """Add content read from byte offset start as a new segment of an indexed file.
+
+        Segments already starting at or after start are replaced. The file
+        must not share its content with another file.
+        """
+        self._add(self._appends, (file_path, root_path, start, content, mtime, size, inode, fingerprint,
+                                  indexed_bytes, prefix_hash), content)
+
+    def move(self, old_path, old_root, file_path, root_path, mtime, size=None, inode=None, fingerprint=None):
+        """Point an indexed file at its new path; its content rows are kept"""
+        self._add(self._moves, (file_path, root_path, mtime, size, inode, fingerprint, old_path, old_root))
+
+    def delete(self, file_path, root_path):
+        self._add(self._deletes, (file_path, root_path))
+
+    def checkpoint(self, root_path, cursor):
+        self._checkpoints[root_path] = cursor
+
+    def quarantine(self, file_path, size, mtime, reason, seconds=None):
+        self._quarantine[file_path] = (size, mtime, reason, seconds)
+
+    def release(self, file_path):
+        """Take a file out of quarantine"""
+        self._quarantine[file_path] = None
+
+    def _content_id(self, file_path, content_hash, content, positions):
+        """Return the id of the stored content with content_hash, storing content if there is none"""
+        if content_hash is not None:
+            row = self.conn.execute(self.FIND_CONTENT_SQL, (content_hash,)).fetchone()
+            if row:
+                self.contents_reused += 1
+                return row[0]
+        if content is None:
+            content, positions = self.extract(file_path) if self.extract else ('', None)
+        content_id = self.conn.execute(self.INSERT_CONTENT_SQL, (content_hash,)).lastrowid
+        segment_id = self.conn.execute(self.INSERT_SEGMENT_SQL, (content_id, 0, positions)).lastrowid
+        self.conn.execute(self.INSERT_TEXT_SQL, (segment_id, content))
+        return content_id
+
+    def _write_file(self, row):
+        (is_insert, file_path, root_path, file_type, mtime, size, inode, fingerprint, indexed_bytes, prefix_hash, content_hash,
+         content, positions) = row
+        if not is_insert and not self.conn.execute(self.FILE_CONTENT_SQL, (file_path, root_path)).fetchone():
+            return  # the file is no longer indexed
+        content_id = self._content_id(file_path, content_hash, content, positions)
+        # The update trigger drops the previous content once nothing uses it
+        values = (file_type, mtime, size, inode, fingerprint, indexed_bytes, prefix_hash, content_id, file_path, root_path)
+        if not self.conn.execute(self.UPDATE_FILE_SQL, values).rowcount:
+            self.conn.execute(self.INSERT_FILE_SQL, values)
+
+    def _write_append(self, row):
+        file_path, root_path, start, content, mtime, size, inode, fingerprint, indexed_bytes, prefix_hash = row
+        found = self.conn.execute(self.FILE_CONTENT_SQL, (file_path, root_path)).fetchone()
+        if not found:
+            return
+        content_id = found[0]
+        self.conn.execute(self.TRIM_TEXT_SQL, (content_id, start))
+        self.conn.execute(self.TRIM_SEGMENTS_SQL, (content_id, start))
+        previous = self.conn.execute(self.PREVIOUS_SEGMENT_SQL, (content_id, start)).fetchone()
+        first_line = position_map.next_line(previous[0]) if previous else None
+        positions = position_map.line_map(content, first_line) if first_line else None
+        segment_id = self.conn.execute(self.INSERT_SEGMENT_SQL, (content_id, start, positions)).lastrowid
+        self.conn.execute(self.INSERT_TEXT_SQL, (segment_id, content))
+        self.conn.execute(self.UNSHARE_CONTENT_SQL, (content_id,))
+        self.conn.execute(self.UPDATE_FILE_SQL, (None, mtime, size, inode, fingerprint, indexed_bytes, prefix_hash,
+                                                 content_id, file_path, root_path))
+
+    def flush(self):
+        """Write all pending rows in a single transaction"""
+        if not self._pending_rows() and not self._checkpoints and not self._quarantine:
+            return
+        t0 = time.time()
+        count = self._pending_rows()
+        try:
+            if self.error is not None:
+                return  # an earlier batch was lost
+            with self.conn:
+                if self._deletes:
+                    self.conn.executemany(self.DELETE_SQL, self._deletes)
+                if self._moves:
+                    self.conn.executemany(self.MOVE_SQL, self._moves)
+                for row in self._files:
+                    self._write_file(row)
+                for row in self._appends:
+                    self._write_append(row)
+                if self._checkpoints:
+                    self.conn.executemany(self.CHECKPOINT_SQL, [(cursor, t0, root_path) for root_path, cursor in self._checkpoints.items()])
+                for file_path, entry in self._quarantine.items():
+                    if entry is None:
+                        self.conn.execute(self.RELEASE_SQL, (file_path,))
+                    else:
+                        self.conn.execute(self.QUARANTINE_SQL, (file_path,) + entry + (t0,))
+            self.rows_written += count
+            self.transactions += 1
+        except sqlite3.Error as e:
+            print(f"Error writing index batch, nothing more is written: {e}")
+            self.error = e
+        finally:
+            self._files, self._appends, self._deletes, self._moves = [], [], [], []
+            self._checkpoints = {}
+            self._quarantine = {}
+            self._pending_bytes = 0
+            self.write_seconds += time.time() - t0
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def stats(self):
+        """Throughput figures for the rows written so far"""
+        elapsed = max(time.time() - self.started, 1e-6)
+        return {
+            'rows': self.rows_written,
+            'contents_reused': self.contents_reused,
+            'transactions': self.transactions,
+            'elapsed': elapsed,
+            'rows_per_second': self.rows_written / elapsed,
+            'write_seconds': self.write_seconds,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
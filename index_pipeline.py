@@ -0,0 +1,485 @@
+"""
+Staged indexing pipeline for SearchAuto.
+
+    walker thread  ->  bounded queue  ->  process pool (extraction)  ->  writer thread
+
+The walker lists the roots with dir_walker.DirWalker and queues files to
+extract. A pool of worker processes runs extract_index_content, so one
+large PDF only holds up one core. A single writer thread owns the SQLite
+connection and inserts the rows in batches through index_db.IndexWriter.
+
+Directories are walked in sorted order. After the last file of a
+directory has been written, the writer checkpoints that directory as the
+root's cursor. A rebuild that is resumed from a cursor skips every
+directory up to and including it without listing it again.
+
+With walk_state and prune_unchanged=True (incremental updates), directories
+whose mtime has not changed are not listed either; their saved listing is
+used instead.
+
+With shadow=True rows go to the shadow tables of a rebuild instead of the
+live index (see index_db.swap_shadow).
+
+Text files that only grew are queued as 'append' jobs: the worker reads
+the file from the end of its indexed part, and the writer adds that tail
+as a new segment instead of replacing the whole content.
+
+DOCX, PDF and XLSX files are hashed by a worker before they are
+extracted. A file whose hash is already stored, or is being extracted
+for an earlier copy, is written as a link to that content without being
+extracted (see index_db.IndexWriter). Text files are cheap to read, so
+they are extracted directly and only deduplicated when stored.
+
+The workers are supervised (see extraction_watchdog): a file whose
+extraction runs past the timeout, grows its worker past the memory cap
+or crashes it is quarantined with the reason, together with any copies
+waiting on it. Later runs skip a quarantined file until its size or
+mtime changes. The slowest extractions are kept in IndexPipeline.slowest.
+
+If the writer fails to write a batch (see index_db.IndexWriter), the run
+stops as if cancelled and IndexPipeline.error holds the sqlite3.Error.
+Callers must not treat such a run as complete.
+"""
+
+import heapq
+import os
+import queue
+import threading
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from extraction_cache import hash_file
+from extraction_watchdog import ExtractionAborted, SupervisedPool
+from file_extractors import (extract_index_content, file_fingerprint, get_file_type, is_indexable,
+                             read_text_from, supports_append)
+from index_db import IndexWriter, connect_index, get_content_hashes, get_quarantine
+from dir_walker import DirWalker
+import position_map
+import root_paths
+
+WALK_QUEUE_SIZE = 1000
+# Seconds one file may take to extract, and the memory one worker may use
+EXTRACT_TIMEOUT = 300
+EXTRACT_MAX_RSS_MB = 2048
+# Number of slowest extractions kept for the report
+SLOWEST_COUNT = 10
+
+_DONE = object()
+CHECKPOINT = 'checkpoint'
+QUARANTINE = 'quarantine'
+RELEASE = 'release'
+
+def get_worker_count(workers=None):
+    """Resolve the number of extraction processes.
+
+    An explicit value wins, then the SEARCHAUTO_INDEX_WORKERS environment
+    variable, then one process per CPU core.
+    """
+    if not workers:
+        try:
+            workers = int(os.getenv("SEARCHAUTO_INDEX_WORKERS", "0"))
+        except ValueError:
+            workers = 0
+    if not workers or workers < 1:
+        workers = os.cpu_count() or 1
+    return workers
+
+def get_extract_limits(timeout=None, max_rss_mb=None):
+    """Resolve (timeout, max_rss_mb) for the extraction workers.
+
+    Explicit values win, then SEARCHAUTO_EXTRACT_TIMEOUT and
+    SEARCHAUTO_EXTRACT_MAX_MB, then the defaults. 0 disables a limit.
+    """
+    limits = []
+    for value, name, default in ((timeout, 'SEARCHAUTO_EXTRACT_TIMEOUT', EXTRACT_TIMEOUT),
+                                 (max_rss_mb, 'SEARCHAUTO_EXTRACT_MAX_MB', EXTRACT_MAX_RSS_MB)):
+        if value is None:
+            try:
+                value = float(os.getenv(name, default))
+            except ValueError:
+                value = default
+        limits.append(value or None)
+    return tuple(limits)
+
+def cursor_key(cursor):
+    """Turn a stored cursor into a tuple that sorts in walk order"""
+    return tuple(cursor.split('/')) if cursor else ()
+
+def _hash_job(job):
+    """Worker process entry point: return (inode, fingerprint, content_hash) of one file"""
+    file_path = job[1]
+    try:
+        inode, fingerprint = file_fingerprint(file_path)
+        return inode, fingerprint, hash_file(file_path)
+    except OSError:
+        return None, None, None
+
+def _extract_job(job, inode=None, fingerprint=None, content_hash=None):
+    """Worker process entry point: extract one file and return its index row"""
+    op, file_path, root_path, mtime, size, extra = job
+    if fingerprint is None:
+        try:
+            inode, fingerprint = file_fingerprint(file_path)
+        except OSError:
+            inode, fingerprint = None, None
+    indexed_bytes = prefix_hash = positions = None
+    if supports_append(file_path):
+        start = extra[0] if op == 'append' else 0
+        try:
+            content, indexed_bytes, prefix_hash, content_hash = read_text_from(file_path, start)
+            # An appended segment continues the line count of the one
+            # before it, which only the writer knows
+            if op != 'append':
+                positions = position_map.line_map(content)
+        except OSError as e:
+            print(f"Error extracting {file_path}: {e}")
+            op, content = 'update' if op == 'append' else op, ''
+    else:
+        # Hashed for deduplication already; the extraction cache reuses it
+        content, positions = extract_index_content(file_path, content_hash)
+    return (op, file_path, root_path, mtime, size, content, positions, inode, fingerprint, extra, indexed_bytes, prefix_hash,
+            content_hash)
+
+class MoveDetector:
+    """Recognise new paths as indexed files that were moved or renamed.
+
+    A new file matches an indexed file of the same size and fingerprint
+    whose old path no longer exists. Among several identical candidates the
+    one with the same inode wins, so a reorganised set of copies keeps its
+    original pairing. Each indexed file can be claimed once.
+    """
+
+    def __init__(self, rows):
+        """rows are (file_path, root_path, size, inode, fingerprint) of indexed files"""
+        self.sizes = set()
+        self.by_fingerprint = {}
+        for file_path, root_path, size, inode, fingerprint in rows:
+            if fingerprint and size is not None:
+                self.sizes.add(size)
+                self.by_fingerprint.setdefault(fingerprint, []).append((file_path, root_path, inode))
+        self.claimed = set()
+
+    def find(self, file_path, size):
+        """Return ('move', old_path, old_root, inode, fingerprint) or None"""
+        # Only files with the size of some indexed file are read at all
+        if size not in self.sizes:
+            return None
+        try:
+            inode, fingerprint = file_fingerprint(file_path)
+        except OSError:
+            return None
+        candidates = [c for c in self.by_fingerprint.get(fingerprint, ()) if c[:2] not in self.claimed]
+        candidates.sort(key=lambda c: not (inode and c[2] == inode))
+        for old_path, old_root, old_inode in candidates:
+            if not os.path.exists(old_path):
+                self.claimed.add((old_path, old_root))
+                return 'move', old_path, old_root, inode, fingerprint
+        return None
+
+class IndexPipeline:
+    def __init__(self, db_path, workers=None, is_cancelled=None, queue_size=WALK_QUEUE_SIZE, shadow=False,
+                 walk_state=None, prune_unchanged=False, timeout=None, max_rss_mb=None):
+        self.db_path = db_path
+        self.shadow = shadow
+        self.walker = DirWalker(walk_state, namespace='index', file_filter=is_indexable)
+        self.prune_unchanged = prune_unchanged
+        self.workers = get_worker_count(workers)
+        self.timeout, self.max_rss_mb = get_extract_limits(timeout, max_rss_mb)
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.queue_size = queue_size
+        self.cancelled = False
+        self.files_seen = 0
+        self.files_ignored = 0
+        self.files_moved = 0
+        self.files_appended = 0
+        self.files_deduplicated = 0
+        self.files_extracted = 0
+        self.files_quarantined = 0
+        self.files_skipped_quarantined = 0
+        # {file_path: (size, mtime, reason, seconds)} from earlier runs
+        self.quarantined = {}
+        self._slowest = []
+        # Content hashes already stored in the target tables
+        self.known_hashes = set()
+        self.rows_written = 0
+        self.stats = {}
+        self.error = None
+
+    @property
+    def slowest(self):
+        """[(seconds, file_path)] of the slowest extractions, slowest first"""
+        return sorted(self._slowest, reverse=True)
+
+    def _check_cancelled(self):
+        if not self.cancelled and (self.error is not None or self.is_cancelled()):
+            self.cancelled = True
+        return self.cancelled
+
+    def _put(self, q, item):
+        """Blocking put that gives up when the run is cancelled"""
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if self._check_cancelled():
+                    return False
+
+    # === Stage 1: walker ===
+    def _walk(self, roots, needs_extraction, seen, walk_queue, resume, all_roots):
+        try:
+            for root_path in roots:
+                nested = root_paths.nested_roots(root_path, all_roots)
+                done_key = None
+                if root_path in resume:
+                    done_key = cursor_key(resume[root_path]) if resume[root_path] is not None else None
+                for root, dirs, files in self.walker.walk(root_path, self.prune_unchanged, self._check_cancelled, nested):
+                    rel = os.path.relpath(root, root_path)
+                    rel_key = () if rel == os.curdir else tuple(rel.split(os.sep))
+                    if done_key is not None:
+                        # Subtrees that sort entirely before the cursor are finished
+                        dirs[:] = [d for d in dirs
+                                   if rel_key + (d,) > done_key or done_key[:len(rel_key) + 1] == rel_key + (d,)]
+                        if rel_key <= done_key:
+                            continue
+                    for file, size, mtime in files:
+                        if self._check_cancelled():
+                            return
+                        file_path = os.path.join(root, file)
+                        seen.add((file_path, root_path))
+                        self.files_seen += 1
+                        if self.quarantined.get(file_path, ())[:2] == (size, mtime):
+                            self.files_skipped_quarantined += 1
+                            continue
+                        op = needs_extraction(file_path, root_path, mtime, size) if needs_extraction else 'insert'
+                        extra = None
+                        if isinstance(op, tuple):
+                            op, extra = op[0], op[1:]
+                        if op and not self._put(walk_queue, (op, file_path, root_path, mtime, size, extra)):
+                            return
+                    if not self._put(walk_queue, (CHECKPOINT, root_path, '/'.join(rel_key))):
+                        return
+                self._log_ignored(root_path)
+        finally:
+            self._put(walk_queue, _DONE)
+
+    def _log_ignored(self, root_path):
+        rules = self.walker.rules
+        if rules is not None and rules.counts:
+            dirs = sum(entry['dirs'] for entry in rules.counts.values())
+            files = sum(entry['files'] for entry in rules.counts.values())
+            self.files_ignored += files
+            print(f"Ignore rules skipped {dirs} folders and {files} files under {root_path}")
+
+    # === Stage 3: writer ===
+    def _write(self, write_queue):
+        with IndexWriter(self.db_path, shadow=self.shadow, extract=extract_index_content) as writer:
+            while True:
+                item = write_queue.get()
+                if item is _DONE:
+                    break
+                if item[0] == CHECKPOINT:
+                    writer.checkpoint(item[1], item[2])
+                    continue
+                if item[0] == QUARANTINE:
+                    writer.quarantine(*item[1:])
+                    continue
+                if item[0] == RELEASE:
+                    writer.release(item[1])
+                    continue
+                (op, file_path, root_path, mtime, size, content, positions, inode, fingerprint, extra,
+                 indexed_bytes, prefix_hash, content_hash) = item
+                if op == 'move':
+                    old_path, old_root = extra
+                    writer.move(old_path, old_root, file_path, root_path, mtime, size, inode, fingerprint)
+                elif op == 'append':
+                    writer.append(file_path, root_path, extra[0], content, mtime, size, inode, fingerprint,
+                                  indexed_bytes, prefix_hash)
+                elif op == 'update':
+                    writer.update(file_path, mtime, content, root_path, size, inode, fingerprint, indexed_bytes, prefix_hash,
+                                  content_hash, positions)
+                else:
+                    writer.insert(file_path, get_file_type(file_path), mtime, content, root_path, size, inode, fingerprint,
+                                  indexed_bytes, prefix_hash, content_hash, positions)
+                # Keep draining the queue after a failed batch, so the other stages can stop
+                self.error = writer.error
+        self.error = writer.error
+        self.stats = writer.stats()
+        self.rows_written = self.stats['rows']
+        print(f"Index writer: {self.stats['rows']} rows in {self.stats['transactions']} transactions "
+              f"({self.stats['rows_per_second']:.0f} rows/s)")
+
+    # === Stage 2: extraction pool ===
+    def _record_time(self, seconds, file_path):
+        if seconds is None:
+            return
+        if len(self._slowest) < SLOWEST_COUNT:
+            heapq.heappush(self._slowest, (seconds, file_path))
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (seconds, file_path))
+
+    def _quarantine(self, write_queue, job, error, seconds):
+        op, file_path, root_path, mtime, size, extra = job
+        print(f"Quarantined {file_path}: {error}")
+        self.files_quarantined += 1
+        write_queue.put((QUARANTINE, file_path, size, mtime, str(error), seconds))
+
+    def _link_row(self, job, inode, fingerprint, content_hash):
+        """Writer row for a copy of stored content: no text, only the hash"""
+        op, file_path, root_path, mtime, size, extra = job
+        self.files_deduplicated += 1
+        return op, file_path, root_path, mtime, size, None, None, inode, fingerprint, extra, None, None, content_hash
+
+    def _extract(self, walk_queue, write_queue):
+        max_in_flight = self.workers * 2
+        in_flight = set()
+        # Checkpoints wait here until every job queued before them is written
+        checkpoints = []
+        hashing = {}       # hash future -> job
+        extracting = {}    # content hash -> extraction future of its first copy
+        copies = {}        # extraction future -> (content hash, link rows written after it)
+        jobs = {}          # extraction future -> job
+        walking = True
+        executor = SupervisedPool(self.workers, self.timeout, self.max_rss_mb)
+
+        def hand_over(future, next_future):
+            # The job of future now waits on next_future (None: it is done)
+            for job, pending in checkpoints:
+                if future in pending:
+                    pending.discard(future)
+                    if next_future is not None:
+                        pending.add(next_future)
+
+        try:
+            while walking or in_flight or checkpoints:
+                if self._check_cancelled():
+                    return
+                while walking and len(in_flight) < max_in_flight:
+                    try:
+                        job = walk_queue.get(timeout=0.05 if not in_flight else 0)
+                    except queue.Empty:
+                        break
+                    if job is _DONE:
+                        walking = False
+                        break
+                    if job[0] == CHECKPOINT:
+                        checkpoints.append((job, set(in_flight)))
+                        continue
+                    if job[1] in self.quarantined:
+                        # It changed since; quarantined again below if it still fails
+                        write_queue.put((RELEASE, job[1]))
+                    if job[0] == 'move':
+                        # Nothing to extract: the content row is reused as is
+                        op, file_path, root_path, mtime, size, (old_path, old_root, inode, fingerprint) = job
+                        self.files_moved += 1
+                        write_queue.put((op, file_path, root_path, mtime, size, None, None, inode, fingerprint, (old_path, old_root),
+                                         None, None, None))
+                        continue
+                    if job[0] in ('insert', 'update') and not supports_append(job[1]):
+                        future = executor.submit(_hash_job, job)
+                        hashing[future] = job
+                    else:
+                        future = executor.submit(_extract_job, job)
+                        jobs[future] = job
+                    in_flight.add(future)
+                if in_flight:
+                    done, in_flight = wait(in_flight, timeout=0.1, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        seconds = executor.elapsed(future)
+                        if future in hashing:
+                            job = hashing.pop(future)
+                            try:
+                                inode, fingerprint, content_hash = future.result()
+                            except ExtractionAborted as e:
+                                self._quarantine(write_queue, job, e, seconds)
+                                hand_over(future, None)
+                                continue
+                            except Exception as e:
+                                print(f"Error in hashing worker: {e}")
+                                inode = fingerprint = content_hash = None
+                            if content_hash in self.known_hashes:
+                                write_queue.put(self._link_row(job, inode, fingerprint, content_hash))
+                                hand_over(future, None)
+                            elif content_hash in extracting:
+                                first = extracting[content_hash]
+                                copies[first][1].append(self._link_row(job, inode, fingerprint, content_hash))
+                                hand_over(future, first)
+                            else:
+                                next_future = executor.submit(_extract_job, job, inode, fingerprint, content_hash)
+                                jobs[next_future] = job
+                                if content_hash is not None:
+                                    extracting[content_hash] = next_future
+                                    copies[next_future] = (content_hash, [])
+                                in_flight.add(next_future)
+                                hand_over(future, next_future)
+                            continue
+                        content_hash, links = copies.pop(future, (None, []))
+                        extracting.pop(content_hash, None)
+                        job = jobs.pop(future)
+                        self._record_time(seconds, job[1])
+                        try:
+                            row = future.result()
+                        except ExtractionAborted as e:
+                            # The copies have the same bytes and would fail the same way
+                            self._quarantine(write_queue, job, e, seconds)
+                            for link in links:
+                                self._quarantine(write_queue, link[:5] + (None,), e, None)
+                            continue
+                        except Exception as e:
+                            print(f"Error in extraction worker: {e}")
+                            row = None
+                        if row is not None:
+                            self.files_extracted += 1
+                            if row[0] == 'append':
+                                self.files_appended += 1
+                            write_queue.put(row)
+                            if row[-1] is not None:
+                                self.known_hashes.add(row[-1])
+                        # Copies are written after the first one; if it failed,
+                        # the writer extracts them itself
+                        for link in links:
+                            write_queue.put(link)
+                while checkpoints and not (checkpoints[0][1] & in_flight):
+                    write_queue.put(checkpoints.pop(0)[0])
+        finally:
+            executor.shutdown(wait=not self.cancelled, cancel_futures=True)
+
+    def run(self, roots, needs_extraction=None, resume=None, all_roots=None):
+        """Index every supported file under roots.
+
+        needs_extraction(file_path, root_path, mtime, size) decides what
+        happens to each file: 'insert', 'update', None to leave it alone,
+        ('append', start) to index a text file from byte offset start on, or
+        ('move', old_path, old_root, inode, fingerprint) to re-point an
+        indexed file that was moved here. When it is omitted every file is
+        inserted. resume maps a root to the cursor of
+        an interrupted rebuild (see index_db.get_index_jobs); directories up
+        to that cursor are skipped. Folders that are themselves one of
+        all_roots (default: roots) belong to that root and are not walked as
+        part of an outer one. Returns the set of (file_path, root_path) pairs
+        that were found on disk.
+        """
+        resume = resume or {}
+        all_roots = roots if all_roots is None else all_roots
+        conn = connect_index(self.db_path)
+        self.known_hashes = get_content_hashes(conn, self.shadow)
+        self.quarantined = get_quarantine(conn)
+        conn.close()
+        seen = set()
+        walk_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+        walker = threading.Thread(target=self._walk, args=(roots, needs_extraction, seen, walk_queue, resume, all_roots), daemon=True)
+        writer = threading.Thread(target=self._write, args=(write_queue,), daemon=True)
+        walker.start()
+        writer.start()
+        try:
+            self._extract(walk_queue, write_queue)
+        finally:
+            write_queue.put(_DONE)
+            writer.join()
+            # Unblock the walker if it is still waiting on a full queue
+            while walker.is_alive():
+                try:
+                    walk_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        return seen
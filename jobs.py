@@ -0,0 +1,227 @@
+"""
+Job scheduler for searches and index operations.
+
+Every search and index operation runs as a Job on a thread of its own,
+with its own cancellation token: job.cancel() sets it, and the work
+polls job.is_cancelled, which is what IndexPipeline and LiveSearch take
+as is_cancelled. Cancelling one job leaves the others running.
+
+Each job has a mode and a priority:
+
+    mode      READ jobs (searches) only read the index; WRITE jobs
+              (rebuild, update, tokenizer switch) change it. CONCURRENCY
+              says which modes may run at the same time: reads run
+              alongside anything, since SQLite in WAL mode shows them the
+              last committed index, and writes run one at a time.
+    priority  INTERACTIVE, USER or BACKGROUND. Queued jobs start in
+              priority order, then in the order they were submitted, and
+              never ahead of a higher-priority job they cannot run with.
+              A job that has to wait for a BACKGROUND job cancels it, so
+              the periodic update gives way to anything the user starts.
+
+A job submitted with a key is merged into a queued job with the same key
+(a periodic update waiting behind a rebuild is not queued twice), or,
+with replace=True, cancels every job with that key first (a new search
+replaces the one filling the results table).
+
+on_change() is called whenever a job is queued, starts or ends, from the
+thread that caused it; jobs() lists them for a queue view.
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+
+READ = 'read'
+WRITE = 'write'
+# Whether a job of the first mode may start while one of the second is running
+CONCURRENCY = {
+    (READ, READ): True,
+    (READ, WRITE): True,
+    (WRITE, READ): True,
+    (WRITE, WRITE): False,
+}
+
+INTERACTIVE = 0
+USER = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', USER: 'user', BACKGROUND: 'background'}
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+# Finished jobs kept for jobs()
+HISTORY = 20
+
+class Job:
+    """A search or index operation; target(job) runs on its own thread.
+
+    result is what target returned and error the exception it raised.
+    """
+
+    def __init__(self, scheduler, job_id, name, target, mode, priority, key):
+        self.id = job_id
+        self.name = name
+        self.target = target
+        self.mode = mode
+        self.priority = priority
+        self.key = key
+        self.state = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.ended = None
+        self._scheduler = scheduler
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.name!r} {self.state}>"
+
+    def cancel(self):
+        """Ask the job to stop; a queued job is dropped without running"""
+        self._scheduler._cancel(self)
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Wait for the job to end; False if timeout ran out first"""
+        return self._done.wait(timeout)
+
+    def elapsed(self):
+        """Seconds the job has been running, or ran for"""
+        if self.started is None:
+            return 0.0
+        return (self.ended or time.time()) - self.started
+
+class JobScheduler:
+    def __init__(self, on_change=None, concurrency=None):
+        self.on_change = on_change
+        self.concurrency = concurrency or CONCURRENCY
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._queued = []
+        self._running = []
+        self._finished = deque(maxlen=HISTORY)
+
+    def submit(self, name, target, mode=READ, priority=INTERACTIVE, key=None, replace=False):
+        """Queue target(job) and start it as soon as the running jobs allow; returns the Job"""
+        with self._lock:
+            job = None
+            for other in self._queued + self._running:
+                if key is None or other.key != key:
+                    continue
+                if replace:
+                    other._cancelled.set()
+                    if other.state == QUEUED:
+                        self._end_queued(other)
+                elif other.state == QUEUED:
+                    other.priority = min(other.priority, priority)
+                    job = other
+            if job is None:
+                job = Job(self, next(self._ids), name, target, mode, priority, key)
+                self._queued.append(job)
+            self._schedule()
+        self._notify()
+        return job
+
+    def jobs(self):
+        """Running jobs, then queued ones in the order they will start, then finished ones, newest first"""
+        with self._lock:
+            return list(self._running) + list(self._queued) + list(reversed(self._finished))
+
+    def active(self, key=None):
+        """Running and queued jobs, or only those with key"""
+        with self._lock:
+            return [job for job in self._running + self._queued if key is None or job.key == key]
+
+    def cancel_latest(self, priorities=(INTERACTIVE, USER)):
+        """Cancel the most recently submitted running or queued job of one of priorities; returns it or None"""
+        jobs = [job for job in self.active() if job.priority in priorities and not job.is_cancelled()]
+        if not jobs:
+            return None
+        job = max(jobs, key=lambda job: job.id)
+        job.cancel()
+        return job
+
+    def wait_all(self, timeout=None):
+        """Wait until no job is running or queued; False if timeout ran out first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            jobs = self.active()
+            if not jobs:
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            jobs[0].wait(remaining)
+
+    def _can_run_with(self, job, others):
+        return all(self.concurrency[(job.mode, other.mode)] for other in others)
+
+    def _schedule(self):
+        """Start the queued jobs that may run now (called with the lock held)"""
+        self._queued.sort(key=lambda job: (job.priority, job.id))
+        waiting = []
+        for job in list(self._queued):
+            if self._can_run_with(job, self._running) and self._can_run_with(job, waiting):
+                self._queued.remove(job)
+                self._start(job)
+                continue
+            waiting.append(job)
+            for other in self._running:
+                if (other.priority == BACKGROUND and job.priority < BACKGROUND
+                        and not self.concurrency[(job.mode, other.mode)]):
+                    other._cancelled.set()
+
+    def _start(self, job):
+        job.state = RUNNING
+        job.started = time.time()
+        self._running.append(job)
+        threading.Thread(target=self._run, args=(job,), name=f"job-{job.id}").start()
+
+    def _run(self, job):
+        try:
+            job.result = job.target(job)
+            state = CANCELLED if job.is_cancelled() else DONE
+        except Exception as e:
+            print(f"Job {job.name!r} failed: {e}")
+            job.error = e
+            state = FAILED
+        with self._lock:
+            self._running.remove(job)
+            job.state = state
+            job.ended = time.time()
+            self._finished.append(job)
+            self._schedule()
+        job._done.set()
+        self._notify()
+
+    def _end_queued(self, job):
+        self._queued.remove(job)
+        job.state = CANCELLED
+        job.ended = time.time()
+        self._finished.append(job)
+        job._done.set()
+
+    def _cancel(self, job):
+        with self._lock:
+            job._cancelled.set()
+            if job.state == QUEUED:
+                self._end_queued(job)
+                self._schedule()
+        self._notify()
+
+    def _notify(self):
+        if self.on_change is not None:
+            self.on_change()
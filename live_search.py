@@ -0,0 +1,541 @@
+"""
+Parallel live search with streamed results.
+
+LiveSearch walks the roots and searches the files while the walk is still
+going. TXT and MD files are read by a thread pool; DOCX, PDF and XLSX
+parsing is CPU-bound, so those go to a pool of worker processes
+(extraction_watchdog.SupervisedPool, started on the first such file)
+with the indexer's timeout and memory limits, so a file that hangs a
+parser costs one worker, not the search.
+
+Matches are handed to on_results in batches, at most every
+batch_interval seconds, and on_progress(scanned, total, walking) reports
+how far the scan is; total grows while walking is True. Both callbacks
+run on the thread that called run(). is_cancelled is polled every
+POLL_INTERVAL seconds: on cancellation the queued files are dropped, the
+text threads stop at their next block and the worker processes are
+killed, so run() returns within milliseconds.
+
+The search_* functions search one file and return its result rows.
+Each takes one keyword or a list of them; a Matcher looks for all of
+them in a single scan, and search_batch() splits the rows of such a
+search into the results of each query.
+
+search_lines memory-maps a text file and looks for ASCII keywords in the
+bytes, lower-casing a chunk at a time, so only chunks with a hit are
+decoded and have their lines counted. Non-ASCII keywords are matched
+against decoded blocks of lines, and so is the rest of a file from the
+first chunk the bytes cannot answer exactly (one where lower() would
+turn a non-ASCII character into ASCII, or with a lone CR line end).
+
+search_xlsx searches a workbook as the one text the indexer stores for
+it, with all cells joined, and finds the cell of each hit from the
+offsets in its cell map, so only cells with a hit cost Python work.
+"""
+
+import bisect
+import io
+import mmap
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dir_walker import DirWalker
+from extraction_watchdog import SupervisedPool
+from file_extractors import get_docx_blocks, get_pdf_pages, get_xlsx_mapped_text, is_indexable
+from index_pipeline import get_extract_limits
+import position_map
+
+BATCH_INTERVAL = 0.25
+POLL_INTERVAL = 0.05
+# Files parsed in worker processes; everything else is read by threads
+PROCESS_EXTENSIONS = ('.docx', '.pdf', '.xlsx')
+# Bytes of a mapped text file lower-cased or scanned for newlines at a time
+SCAN_CHUNK = 8 * 1024 * 1024
+# Characters read per block when a text file is searched as decoded text
+BLOCK_HINT = 1024 * 1024
+# A mapped chunk where more than one line in DENSE_RATIO has a hit is searched line by line
+DENSE_RATIO = 4
+# Keywords a Matcher looks for one by one; more are found with one regex
+SCAN_EACH_MAX = 16
+LONE_CR = re.compile(rb'\r(?!\n)')
+# Lower-case to "k" and to "i" plus a combining dot
+KELVIN_SIGN = '\u212a'.encode('utf-8')
+DOTTED_CAPITAL_I = '\u0130'.encode('utf-8')
+
+def _trie_pattern(needles):
+    """One regex for all needles, with their common prefixes merged as in a trie.
+
+    sre tries the branches of an alternation in turn at every position; in
+    a trie the branches at each level start with different characters, so
+    a position where no needle starts fails after one test per branch.
+    """
+    trie = {}
+    for needle in needles:
+        node = trie
+        for i in range(len(needle)):
+            node = node.setdefault(needle[i:i + 1], {})
+        node[None] = True
+    empty = needles[0][:0]
+    syntax = (lambda text: text.encode('ascii')) if isinstance(empty, bytes) else (lambda text: text)
+
+    def build(node):
+        parts = []
+        # Runs without a branch are followed in a loop, so only branches recurse
+        while None not in node and len(node) == 1:
+            (unit, node), = node.items()
+            parts.append(re.escape(unit))
+        # A needle that ends here is a hit whatever longer ones would add
+        if None not in node:
+            branches = [re.escape(unit) + build(child) for unit, child in sorted(node.items())]
+            parts.append(syntax('(?:') + syntax('|').join(branches) + syntax(')'))
+        return empty.join(parts)
+
+    return re.compile(build(trie))
+
+class Matcher:
+    """Which of one or more keywords a lower-case text contains.
+
+    A text is rejected in one pass over it: up to SCAN_EACH_MAX keywords
+    are each looked for with `in`, which runs at memory speed, and more
+    with a single regex shaped like a trie of them (see _trie_pattern).
+    Each keyword is only checked on its own in the lines that have a hit.
+    With encoding, the keywords are matched against encoded bytes.
+    """
+
+    def __init__(self, keywords, encoding=None):
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        self.keywords = list(dict.fromkeys(keyword.lower() for keyword in keywords if keyword))
+        self.needles = [keyword.encode(encoding) for keyword in self.keywords] if encoding else self.keywords
+        self.pattern = _trie_pattern(self.needles) if len(self.needles) > 1 else None
+        self.scan_each = len(self.needles) <= SCAN_EACH_MAX
+
+    def encoded(self, encoding):
+        return Matcher(self.keywords, encoding)
+
+    def any_in(self, text):
+        if self.scan_each:
+            return any(needle in text for needle in self.needles)
+        return self.pattern.search(text) is not None
+
+    def search(self, text, start=0):
+        """Offset of the first hit at or after start, or -1"""
+        if self.pattern is not None:
+            match = self.pattern.search(text, start)
+            return match.start() if match else -1
+        return text.find(self.needles[0], start) if self.needles else -1
+
+    def count(self, text):
+        """Number of hits in text (overlapping hits of different keywords may count twice)"""
+        if self.scan_each:
+            return sum(text.count(needle) for needle in self.needles)
+        return len(self.pattern.findall(text))
+
+    def find(self, text):
+        """The keywords text contains, in the order they were given"""
+        if not self.scan_each and self.pattern.search(text) is None:
+            return []
+        return [keyword for keyword, needle in zip(self.keywords, self.needles) if needle in text]
+
+def _count_newlines(mm, start, end):
+    count = 0
+    while start < end:
+        stop = min(end, start + SCAN_CHUNK)
+        count += mm[start:stop].count(b'\n')
+        start = stop
+    return count
+
+def _can_search_bytes(keywords):
+    """True when the keywords can be looked for in raw bytes (see _needs_decoding for the file side)"""
+    return all(keyword.isascii() and '\n' not in keyword and '\r' not in keyword for keyword in keywords)
+
+def _needs_decoding(chunk, keywords):
+    """True when searching chunk's bytes could miss a line lower() would find, or number lines differently"""
+    # The two non-ASCII characters whose lower case holds an ASCII letter
+    if KELVIN_SIGN in chunk and any('k' in keyword for keyword in keywords):
+        return True
+    if DOTTED_CAPITAL_I in chunk and any(keyword.endswith('i') for keyword in keywords):
+        return True
+    # Text mode also ends a line at a lone CR
+    return b'\r' in chunk and LONE_CR.search(chunk) is not None
+
+def _sparse_hits(chunk, haystack, needles, line_num):
+    """(line number, line, keywords) of each hit, found by offset; line_num is the chunk's first line"""
+    counted = 0
+    pos = needles.search(haystack)
+    while pos != -1:
+        line_start = max(counted, haystack.rfind(b'\n', counted, pos) + 1)
+        line_num += haystack.count(b'\n', counted, line_start)
+        line_end = haystack.find(b'\n', pos)
+        if line_end == -1:
+            line_end = len(haystack)
+        found = needles.find(haystack[line_start:line_end])
+        yield line_num, chunk[line_start:line_end].decode('utf-8', errors='ignore'), found
+        counted = line_end + 1
+        line_num += 1
+        pos = needles.search(haystack, counted)
+
+def _dense_hits(chunk, matcher, line_num):
+    """(line number, line, keywords) of each hit, found line by line in the decoded chunk"""
+    for i, line in enumerate(chunk.decode('utf-8', errors='ignore').split('\n'), start=line_num):
+        found = matcher.find(line.lower())
+        if found:
+            yield i, line, found
+
+def _search_mapped(mm, file_path, matcher, file_type, is_cancelled):
+    needles = matcher.encoded('ascii')
+    fold = any(needle.upper() != needle for needle in needles.needles)
+    results = []
+    size = len(mm)
+    line_num = 1  # number of the line that starts at uncounted
+    uncounted = 0
+    start = 0
+    while start < size and not is_cancelled():
+        # Chunks end after a newline, so a line never spans two of them
+        end = mm.find(b'\n', min(size, start + SCAN_CHUNK) - 1) + 1 or size
+        chunk = mm[start:end]
+        # Checked here, on the chunk in hand, rather than in passes over the whole file
+        if _needs_decoding(chunk, matcher.keywords):
+            line_num += _count_newlines(mm, uncounted, start)
+            results.extend(_search_decoded(file_path, matcher, file_type, is_cancelled, start, line_num - 1))
+            break
+        # bytes.lower() only touches A-Z, so multi-byte UTF-8 characters are left alone
+        haystack = chunk.lower() if fold else chunk
+        if needles.any_in(haystack):
+            # Newlines are only counted in front of a chunk with a hit
+            line_num += _count_newlines(mm, uncounted, start)
+            newlines = haystack.count(b'\n')
+            # Finding each hit by offset costs more per hit than a pass over
+            # the lines, which wins once most lines match
+            if needles.count(haystack) * DENSE_RATIO < newlines:
+                hits = _sparse_hits(chunk, haystack, needles, line_num)
+            else:
+                hits = _dense_hits(chunk, matcher, line_num)
+            for hit_line, line, found in hits:
+                results.append({
+                    "File Path": file_path,
+                    "File Type": file_type,
+                    "Location": f"Line {hit_line}",
+                    "Content": line.strip(),
+                    "Keywords": found
+                })
+            line_num += newlines
+            uncounted = end
+        start = end
+    return results
+
+def _search_decoded(file_path, matcher, file_type, is_cancelled, start=0, line_num=0):
+    """Search from byte offset start, the beginning of a line; line_num lines come before it"""
+    results = []
+    with open(file_path, 'rb') as raw:
+        raw.seek(start)
+        f = io.TextIOWrapper(raw, encoding='utf-8', errors='ignore')
+        while not is_cancelled():
+            lines = f.readlines(BLOCK_HINT)
+            if not lines:
+                break
+            # Lower-case a whole block at once; only a block with a hit is checked line by line
+            if matcher.any_in(''.join(lines).lower()):
+                for i, line in enumerate(lines, start=line_num + 1):
+                    # Use case-insensitive search for both Latin and non-Latin characters
+                    found = matcher.find(line.lower())
+                    if found:
+                        results.append({
+                            "File Path": file_path,
+                            "File Type": file_type,
+                            "Location": f"Line {i}",
+                            "Content": line.strip(),
+                            "Keywords": found
+                        })
+            line_num += len(lines)
+    return results
+
+def search_lines(file_path, keyword, file_type, is_cancelled=None):
+    """Matching lines of a text file as result rows.
+
+    ASCII keywords are searched for in the memory-mapped bytes, and line
+    numbers are only counted up to the hits; other keywords are matched
+    against the decoded text a block of lines at a time.
+    """
+    is_cancelled = is_cancelled or (lambda: False)
+    matcher = Matcher(keyword)
+    if not matcher.keywords:
+        return []
+    try:
+        with open(file_path, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                mm = None  # empty file, or one that cannot be mapped
+            if mm is not None:
+                with mm:
+                    if _can_search_bytes(matcher.keywords):
+                        return _search_mapped(mm, file_path, matcher, file_type, is_cancelled)
+        return _search_decoded(file_path, matcher, file_type, is_cancelled)
+    except Exception as e:
+        print(f"Error reading {file_type} {file_path}: {e}")
+        return []
+
+def search_docx(file_path, keyword, is_cancelled=None):
+    is_cancelled = is_cancelled or (lambda: False)
+    matcher = Matcher(keyword)
+    results = []
+    try:
+        # Paragraphs and table cells, then headers, footers and notes
+        for location, block_text in get_docx_blocks(file_path):
+            if is_cancelled():
+                break
+            found = matcher.find(block_text.lower())
+            if found:
+                results.append({
+                    "File Path": file_path,
+                    "File Type": "DOCX",
+                    "Location": location,
+                    "Content": block_text.strip(),
+                    "Keywords": found
+                })
+    except Exception as e:
+        print(f"Error reading DOCX {file_path}: {e}")
+    return results
+
+def search_pdf(file_path, keyword, is_cancelled=None, workers=1, page_timeout=None):
+    """workers > 1 splits a large PDF over processes, where page_timeout applies (see pdf_reader)"""
+    is_cancelled = is_cancelled or (lambda: False)
+    matcher = Matcher(keyword)
+    results = []
+    try:
+        for page_num, page_text in enumerate(get_pdf_pages(file_path, workers, page_timeout), start=1):
+            if is_cancelled():
+                break
+            if not matcher.any_in(page_text.lower()):
+                continue
+            for line in page_text.splitlines():
+                found = matcher.find(line.lower())
+                if found:
+                    results.append({
+                        "File Path": file_path,
+                        "File Type": "PDF",
+                        "Location": f"Page {page_num}",
+                        "Content": line.strip(),
+                        "Keywords": found
+                    })
+    except Exception as e:
+        print(f"Error reading PDF {file_path}: {e}")
+    return results
+
+def _cell_hits(text, offsets, matcher, is_cancelled):
+    """Yield (index, cell text, keywords) for the cells of a workbook text with a hit.
+
+    text holds the cells one separator character apart and offsets the
+    start of each (see file_extractors.xlsx_cells_to_text). The whole
+    text is lower-cased once and scanned for the keywords; each hit is
+    mapped to its cell by a binary search on offsets, and the scan goes
+    on after that cell. A hit spanning two cells is checked against the
+    cell alone and dropped.
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # Some character lower-cases to several ("\u0130"), so the offsets are off: check every cell
+        for index, start in enumerate(offsets):
+            if is_cancelled():
+                return
+            end = offsets[index + 1] - 1 if index + 1 < len(offsets) else len(text)
+            found = matcher.find(text[start:end].lower())
+            if found:
+                yield index, text[start:end], found
+        return
+    position = matcher.search(lowered)
+    while position != -1:
+        if is_cancelled():
+            return
+        index = bisect.bisect_right(offsets, position) - 1
+        start = offsets[index]
+        end = offsets[index + 1] - 1 if index + 1 < len(offsets) else len(text)
+        found = matcher.find(lowered[start:end])
+        if found:
+            yield index, text[start:end], found
+            position = matcher.search(lowered, end + 1)
+        else:
+            position = matcher.search(lowered, position + 1)
+
+def search_xlsx(file_path, keyword, is_cancelled=None):
+    is_cancelled = is_cancelled or (lambda: False)
+    matcher = Matcher(keyword)
+    results = []
+    try:
+        # All sheets as one text with the offset and location of every non-empty cell
+        text, encoded_map = get_xlsx_mapped_text(file_path)
+        if not encoded_map or not matcher.keywords:
+            return results
+        cell_map = position_map.decode(encoded_map)
+        # bisect is several times faster on a list than on an array
+        offsets = cell_map.offsets.tolist()
+        for index, cell_text, found in _cell_hits(text, offsets, matcher, is_cancelled):
+            results.append({
+                "File Path": file_path,
+                "File Type": "XLSX",
+                "Location": cell_map.label(index),
+                "Content": cell_text,
+                "Keywords": found
+            })
+    except Exception as e:
+        print(f"Error reading XLSX {file_path}: {e}")
+    return results
+
+def search_file(file_path, keyword, is_cancelled=None):
+    """Result rows for one file of any supported type"""
+    if file_path.endswith('.txt'):
+        return search_lines(file_path, keyword, "TXT", is_cancelled)
+    if file_path.endswith('.md'):
+        return search_lines(file_path, keyword, "MD", is_cancelled)
+    if file_path.endswith('.docx'):
+        return search_docx(file_path, keyword, is_cancelled)
+    if file_path.endswith('.pdf'):
+        return search_pdf(file_path, keyword, is_cancelled)
+    if file_path.endswith('.xlsx'):
+        return search_xlsx(file_path, keyword, is_cancelled)
+    return []
+
+def split_by_query(results, queries):
+    """{query: the result rows that matched it} for rows from a search for all of queries"""
+    by_keyword = {}
+    for query in queries:
+        by_keyword.setdefault(query.lower(), []).append(query)
+    by_query = {query: [] for query in queries}
+    for row in results:
+        for keyword in row["Keywords"]:
+            for query in by_keyword.get(keyword, ()):
+                by_query[query].append(row)
+    return by_query
+
+def search_batch(roots, queries, candidates=None, **options):
+    """Run several queries in one pass over the files under roots: {query: result rows}.
+
+    Every file is read once however many queries there are. options are
+    passed on to LiveSearch; candidates should cover all of the queries.
+    """
+    results = LiveSearch(list(queries), **options).run(roots, candidates)
+    return split_by_query(results, queries)
+
+def default_workers():
+    """(threads, processes) for a live search on this machine"""
+    cpus = os.cpu_count() or 1
+    return min(32, cpus + 4), cpus
+
+class LiveSearch:
+    """A live search for a keyword, or for a list of keywords in the same pass.
+
+    Each result row has a "Keywords" entry listing the keywords it matched.
+    """
+
+    def __init__(self, keywords, on_results=None, on_progress=None, is_cancelled=None, threads=None, processes=None,
+                 batch_interval=BATCH_INTERVAL):
+        default_threads, default_processes = default_workers()
+        self.keywords = keywords
+        self.on_results = on_results or (lambda batch: None)
+        self.on_progress = on_progress or (lambda scanned, total, walking: None)
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.threads = threads or default_threads
+        self.processes = processes or default_processes
+        self.batch_interval = batch_interval
+        self.results = []
+        self.scanned = 0
+        self.total = 0
+        self.skipped = 0
+        self.cancelled = False
+        self._stop = threading.Event()
+        self._pending = []
+        self._last_flush = 0.0
+        self._in_flight = set()
+        self._thread_pool = None
+        self._process_pool = None
+
+    def cancel(self):
+        """Stop the search; run() returns as soon as it notices"""
+        self.cancelled = True
+        self._stop.set()
+
+    def _check_cancelled(self):
+        if not self.cancelled and self.is_cancelled():
+            self.cancel()
+        return self.cancelled
+
+    def _submit(self, file_path):
+        if file_path.endswith(PROCESS_EXTENSIONS):
+            if self._process_pool is None:
+                self._process_pool = SupervisedPool(self.processes, *get_extract_limits())
+            future = self._process_pool.submit(search_file, file_path, self.keywords)
+        else:
+            future = self._thread_pool.submit(search_file, file_path, self.keywords, self._stop.is_set)
+        self._in_flight.add(future)
+        self.total += 1
+
+    def _collect(self, walking, timeout):
+        """Gather finished files, waiting up to timeout for the first one"""
+        if self._in_flight:
+            done, self._in_flight = wait(self._in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                self.scanned += 1
+                try:
+                    self._pending.extend(future.result())
+                except Exception as e:
+                    print(f"Error in live search worker: {e}")
+        elif timeout:
+            time.sleep(timeout)
+        self._flush(walking)
+
+    def _flush(self, walking, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.batch_interval:
+            return
+        self._last_flush = now
+        if self._pending:
+            batch, self._pending = self._pending, []
+            self.results.extend(batch)
+            self.on_results(batch)
+        self.on_progress(self.scanned, self.total, walking)
+
+    def _iter_files(self, roots, candidates):
+        walker = DirWalker(file_filter=is_indexable)
+        for root_path in roots:
+            for root, dirs, files in walker.walk(root_path, is_cancelled=self._check_cancelled):
+                for file, size, mtime in files:
+                    file_path = os.path.join(root, file)
+                    if candidates is not None:
+                        indexed, matching = candidates
+                        if file_path not in matching and indexed.get(file_path) == (mtime, size):
+                            self.skipped += 1
+                            continue
+                    yield file_path
+
+    def run(self, roots, candidates=None):
+        """Search every supported file under roots and return all result rows.
+
+        With candidates from searchAuto.index_candidates(), indexed files
+        that are unchanged since are only searched if the index says they
+        may contain one of the keywords.
+        """
+        max_in_flight = (self.threads + self.processes) * 4
+        self._thread_pool = ThreadPoolExecutor(self.threads)
+        try:
+            for file_path in self._iter_files(roots, candidates):
+                if self._check_cancelled():
+                    break
+                self._submit(file_path)
+                # Keep the pools fed without queueing the whole tree
+                while len(self._in_flight) >= max_in_flight and not self._check_cancelled():
+                    self._collect(True, POLL_INTERVAL)
+                self._collect(True, 0)
+            while self._in_flight and not self._check_cancelled():
+                self._collect(False, POLL_INTERVAL)
+        finally:
+            self._stop.set()
+            self._thread_pool.shutdown(wait=not self.cancelled, cancel_futures=True)
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=not self.cancelled, cancel_futures=True)
+        if not self.cancelled:
+            self._flush(False, force=True)
+        return self.results
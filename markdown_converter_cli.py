@@ -10,7 +10,7 @@ import sys
 import re
 from docx import Document
 import PyPDF2
-from pdfminer.high_level import extract_text as pdfminer_extract_text
+import pdf_reader
 
 def convert_docx_to_markdown(docx_path, md_path):
     """Convert DOCX file to Markdown"""
@@ -56,16 +56,8 @@ def convert_docx_to_markdown(docx_path, md_path):
 def convert_pdf_to_markdown(pdf_path, md_path):
     """Convert PDF file to Markdown"""
     try:
-        # Try pdfminer first (better for text extraction)
-        try:
-            text = pdfminer_extract_text(pdf_path)
-        except:
-            # Fallback to PyPDF2
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+        # pdfminer first (better for text extraction), then the other backends
+        text = pdf_reader.extract_text(pdf_path, 'pdfminer')
                     
         # Clean and format text
         lines = text.split('\n')
@@ -0,0 +1,301 @@
+"""
+Page-at-a-time PDF text extraction with pluggable backends.
+
+Backends, in the default order of preference:
+
+    pdfminer    pdfminer.six, the most faithful text layout (default)
+    pypdf       pypdf, or PyPDF2 when only that is installed; much faster
+    pdftotext   the poppler command line tool, if it is on PATH; fastest
+
+SEARCHAUTO_PDF_BACKEND picks another default. iter_pages() yields
+(page number, text) one page at a time; if a backend fails on a file
+the next available one is tried.
+
+With workers > 1, PDFs of PARALLEL_MIN_PAGES pages or more are split
+into runs of PAGES_PER_JOB pages that are extracted by a process pool.
+There, with page_timeout, a run that takes longer than page_timeout
+seconds per page is abandoned (its worker is killed) and its pages come
+out empty. The pool's workers are started the way extraction_watchdog
+starts its own, never forked. Smaller PDFs are read in the calling
+process. Pass a report dict to learn which backend read the pages and
+which pages timed out.
+
+The benchmark compares the backends on local files:
+
+    python pdf_reader.py <folder or pdf> [...] [--backends pdfminer,pypdf] [--workers 4]
+"""
+
+import io
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from extraction_watchdog import _start_context
+
+DEFAULT_BACKEND = 'pdfminer'
+PARALLEL_MIN_PAGES = 40
+PAGES_PER_JOB = 8
+
+class PdfBackend:
+    name = None
+
+    def available(self):
+        raise NotImplementedError
+
+    def page_count(self, file_path):
+        raise NotImplementedError
+
+    def iter_pages(self, file_path, pages=None):
+        """Yield (page number, text) for the pages (1-based numbers, all when None)"""
+        raise NotImplementedError
+
+class PdfminerBackend(PdfBackend):
+    name = 'pdfminer'
+
+    def available(self):
+        try:
+            import pdfminer  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def page_count(self, file_path):
+        from pdfminer.pdfpage import PDFPage
+        with open(file_path, 'rb') as f:
+            return sum(1 for _ in PDFPage.get_pages(f))
+
+    def iter_pages(self, file_path, pages=None):
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+        manager = PDFResourceManager(caching=True)
+        out = io.StringIO()
+        # Same settings as pdfminer.high_level.extract_text
+        device = TextConverter(manager, out, codec='utf-8', laparams=LAParams())
+        interpreter = PDFPageInterpreter(manager, device)
+        try:
+            with open(file_path, 'rb') as f:
+                for number, page in enumerate(PDFPage.get_pages(f), start=1):
+                    if pages is not None and number not in pages:
+                        continue
+                    interpreter.process_page(page)
+                    yield number, out.getvalue().rstrip('\x0c')
+                    out.seek(0)
+                    out.truncate()
+        finally:
+            device.close()
+
+class PypdfBackend(PdfBackend):
+    name = 'pypdf'
+
+    def _module(self):
+        try:
+            import pypdf
+            return pypdf
+        except ImportError:
+            import PyPDF2
+            return PyPDF2
+
+    def available(self):
+        try:
+            self._module()
+            return True
+        except ImportError:
+            return False
+
+    def page_count(self, file_path):
+        with open(file_path, 'rb') as f:
+            return len(self._module().PdfReader(f).pages)
+
+    def iter_pages(self, file_path, pages=None):
+        with open(file_path, 'rb') as f:
+            reader = self._module().PdfReader(f)
+            for number, page in enumerate(reader.pages, start=1):
+                if pages is not None and number not in pages:
+                    continue
+                yield number, page.extract_text() or ''
+
+class PdftotextBackend(PdfBackend):
+    name = 'pdftotext'
+
+    def available(self):
+        return shutil.which('pdftotext') is not None
+
+    def page_count(self, file_path):
+        return PypdfBackend().page_count(file_path)
+
+    def iter_pages(self, file_path, pages=None):
+        command = ['pdftotext', '-enc', 'UTF-8']
+        first = min(pages) if pages else 1
+        if pages:
+            command += ['-f', str(first), '-l', str(max(pages))]
+        # Pages come out separated by form feeds, so they can be handed on
+        # while pdftotext is still working on the next ones
+        process = subprocess.Popen(command + [file_path, '-'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            reader = io.TextIOWrapper(process.stdout, encoding='utf-8', errors='ignore')
+            number = first
+            pending = ''
+            for chunk in iter(lambda: reader.read(64 * 1024), ''):
+                pending += chunk
+                *done, pending = pending.split('\x0c')
+                for text in done:
+                    if pages is None or number in pages:
+                        yield number, text
+                    number += 1
+            if process.wait() != 0:
+                raise RuntimeError(f"pdftotext failed on {file_path}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+
+BACKENDS = {backend.name: backend for backend in (PdfminerBackend(), PypdfBackend(), PdftotextBackend())}
+
+def available_backends():
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+def backend_order(backend=None):
+    """The backend to use first, then the other available ones as fallbacks"""
+    first = backend or os.getenv('SEARCHAUTO_PDF_BACKEND') or DEFAULT_BACKEND
+    if first not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend: {first}")
+    return [first] + [name for name in available_backends() if name != first]
+
+def _extract_run(file_path, backend, pages):
+    """Worker: the texts of one run of pages"""
+    return [text for _, text in BACKENDS[backend].iter_pages(file_path, set(pages))]
+
+def _iter_parallel(file_path, backend, count, workers, page_timeout, timed_out=None):
+    """Yield (page number, text) from a process pool; the numbers of pages that timed out go to timed_out"""
+    runs = [list(range(start, min(start + PAGES_PER_JOB, count + 1))) for start in range(1, count + 1, PAGES_PER_JOB)]
+    # Not forked: the caller may be running threads (see extraction_watchdog)
+    context = _start_context()
+    pool = context.Pool(min(workers, len(runs)))
+    try:
+        pending = [pool.apply_async(_extract_run, (file_path, backend, run)) for run in runs]
+        for index, run in enumerate(runs):
+            try:
+                texts = pending[index].get(page_timeout * len(run) if page_timeout else None)
+            except multiprocessing.TimeoutError:
+                print(f"PDF pages {run[0]}-{run[-1]} of {file_path} timed out with {backend}")
+                texts = [''] * len(run)
+                if timed_out is not None:
+                    timed_out.extend(run)
+                # The hung worker cannot be interrupted: replace the pool
+                # and queue the remaining runs again
+                pool.terminate()
+                pool = context.Pool(min(workers, len(runs)))
+                pending[index + 1:] = [pool.apply_async(_extract_run, (file_path, backend, r)) for r in runs[index + 1:]]
+            yield from zip(run, texts)
+    finally:
+        pool.terminate()
+
+def iter_pages(file_path, backend=None, workers=1, page_timeout=None, report=None):
+    """Yield (page number, text) for every page of a PDF.
+
+    backend picks the first backend to try (see backend_order); when it
+    fails before yielding a page, the next available one is used. workers
+    > 1 sends large PDFs to a process pool, where page_timeout applies (see
+    the module docstring). report, a dict, gets 'backend', the backend that
+    read the pages, and 'timed_out', the numbers of the pages left empty.
+    """
+    report = {} if report is None else report
+    errors = []
+    for name in backend_order(backend):
+        impl = BACKENDS[name]
+        report['backend'] = name
+        report['timed_out'] = []
+        started = False
+        try:
+            pages = impl.iter_pages(file_path)
+            if workers > 1:
+                count = impl.page_count(file_path)
+                if count >= PARALLEL_MIN_PAGES:
+                    pages = _iter_parallel(file_path, name, count, workers, page_timeout, report['timed_out'])
+            for page in pages:
+                started = True
+                yield page
+            return
+        except Exception as e:
+            if started:
+                raise
+            errors.append(f"{name}: {e}")
+    raise RuntimeError(f"No PDF backend could read {file_path} ({'; '.join(errors)})")
+
+def extract_pages(file_path, backend=None, workers=1, page_timeout=None, report=None):
+    """Return the text of every page as a list"""
+    return [text for _, text in iter_pages(file_path, backend, workers, page_timeout, report)]
+
+def extract_text(file_path, backend=None, workers=1, page_timeout=None):
+    """Return the text of a PDF, one page after the other"""
+    return '\n'.join(extract_pages(file_path, backend, workers, page_timeout))
+
+def find_pdfs(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, files in os.walk(path):
+                yield from (os.path.join(folder, f) for f in sorted(files) if f.lower().endswith('.pdf'))
+        elif path.lower().endswith('.pdf'):
+            yield path
+
+def benchmark(files, backends=None, workers=1):
+    """Return {backend: {'files', 'failed', 'pages', 'chars', 'seconds'}} for extracting files with each backend"""
+    results = {}
+    for name in backends or available_backends():
+        entry = results[name] = {'files': 0, 'failed': 0, 'pages': 0, 'chars': 0, 'seconds': 0.0}
+        for file_path in files:
+            started = time.perf_counter()
+            try:
+                # No fallback: each backend is measured on its own
+                impl = BACKENDS[name]
+                count = impl.page_count(file_path) if workers > 1 else 0
+                if count >= PARALLEL_MIN_PAGES:
+                    pages = list(_iter_parallel(file_path, name, count, workers, None))
+                else:
+                    pages = list(impl.iter_pages(file_path))
+            except Exception as e:
+                print(f"{name} failed on {file_path}: {e}")
+                entry['failed'] += 1
+                continue
+            finally:
+                entry['seconds'] += time.perf_counter() - started
+            entry['files'] += 1
+            entry['pages'] += len(pages)
+            entry['chars'] += sum(len(text.strip()) for _, text in pages)
+    return results
+
+def format_benchmark(results):
+    lines = [f"{'backend':<10} {'files':>6} {'failed':>6} {'pages':>7} {'seconds':>8} {'pages/s':>8} {'chars':>10}"]
+    for name, entry in results.items():
+        rate = entry['pages'] / entry['seconds'] if entry['seconds'] else 0
+        lines.append(f"{name:<10} {entry['files']:>6} {entry['failed']:>6} {entry['pages']:>7} "
+                     f"{entry['seconds']:>8.2f} {rate:>8.1f} {entry['chars']:>10}")
+    return '\n'.join(lines)
+
+def main():
+    """Benchmark the PDF backends on the PDFs in the given folders and files"""
+    args = sys.argv[1:]
+    backends = None
+    workers = 1
+    if '--backends' in args:
+        i = args.index('--backends')
+        backends = args[i + 1].split(',')
+        del args[i:i + 2]
+    if '--workers' in args:
+        i = args.index('--workers')
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+    if not args:
+        print("Usage: python pdf_reader.py <folder or pdf> [...] [--backends pdfminer,pypdf] [--workers 4]")
+        sys.exit(1)
+    files = list(find_pdfs(args))
+    print(f"{len(files)} PDF files, backends: {', '.join(backends or available_backends())}")
+    print(format_benchmark(benchmark(files, backends, workers)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Position maps: where each part of an indexed text came from.
+
+The text indexed for a DOCX, PDF or XLSX file is its blocks (paragraphs,
+pages, cells) joined together. Its position map lists the character
+offset at which each block starts, with a label such as "Page 12" or
+"Sheet Sales, Row 40, Column B". search_index turns the offset of a hit
+into that label without opening the file again.
+
+There are three kinds of map:
+
+    block map   [(offset, label)] for paragraphs and pages
+    cell map    one entry per spreadsheet cell, stored as arrays
+    line map    for text files: the number of the line at offset 0,
+                and of the line that follows the text
+
+A line map locates an offset as "Line N" by counting the newlines before
+it. Its second number lets an appended segment continue the count (see
+index_db.IndexWriter).
+
+Maps are stored zlib-compressed: one kind byte, then JSON for block and
+line maps, or delta-encoded arrays for cell maps, which keeps a workbook
+with a million cells to a few MB that decode in well under a second.
+"""
+
+import bisect
+import json
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+
+BLOCK_MAP = b'B'
+CELL_MAP = b'C'
+LINE_MAP = b'L'
+
+class PositionMap:
+    """A decoded block map: offsets and labels in parallel lists"""
+
+    is_line_map = False
+
+    def __init__(self, entries=()):
+        self.offsets = [offset for offset, _ in entries]
+        self.labels = [label for _, label in entries]
+
+    def __bool__(self):
+        return len(self.offsets) > 0
+
+    def label(self, index):
+        return self.labels[index]
+
+    def locate(self, offset, lines_before=0):
+        """Label of the block containing offset, or None before the first block.
+
+        lines_before, the number of newlines before offset, is only used by
+        line maps.
+        """
+        index = bisect.bisect_right(self.offsets, offset) - 1
+        return self.label(index) if index >= 0 else None
+
+class LineMap(PositionMap):
+    is_line_map = True
+
+    def __init__(self, first_line, next_line):
+        super().__init__([(0, first_line)])
+        self.first_line = first_line
+        self.next_line = next_line
+
+    def locate(self, offset, lines_before=0):
+        return f"Line {self.first_line + lines_before}"
+
+class CellMap(PositionMap):
+    """Cell locations of a workbook text; sheet and column names are stored once"""
+
+    def __init__(self):
+        self.offsets = array('q')
+        self.sheets = array('H')
+        self.rows = array('I')
+        self.columns = array('H')
+        self.names = []
+        self._name_ids = {}
+
+    def _name_id(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def add(self, offset, sheet_name, row_num, col_name):
+        self.offsets.append(offset)
+        self.sheets.append(self._name_id(sheet_name))
+        self.rows.append(row_num)
+        self.columns.append(self._name_id(col_name))
+
+    def label(self, index):
+        return f"Sheet {self.names[self.sheets[index]]}, Row {self.rows[index]}, Column {self.names[self.columns[index]]}"
+
+class MappedText:
+    """Text assembled block by block, with the block map of where each one starts"""
+
+    def __init__(self):
+        self.parts = []
+        self.entries = []
+        self.length = 0
+
+    def add(self, label, text, separator='\n'):
+        """Append a block; separator goes between it and the previous one"""
+        if self.parts:
+            self.parts.append(separator)
+            self.length += len(separator)
+        # A run of blocks with the same label ("Header") needs one entry
+        if not self.entries or self.entries[-1][1] != label:
+            self.entries.append((self.length, label))
+        self.parts.append(text)
+        self.length += len(text)
+
+    def text(self):
+        return ''.join(self.parts)
+
+def _little_endian(arr):
+    if sys.byteorder == 'big':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr
+
+def encode(entries):
+    """Encode a block map from [(offset, label)] sorted by offset; None when empty"""
+    if not entries:
+        return None
+    previous = 0
+    deltas = []
+    for offset, label in entries:
+        deltas.append((offset - previous, label))
+        previous = offset
+    return zlib.compress(BLOCK_MAP + json.dumps(deltas, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+def encode_cells(cell_map):
+    """Encode a CellMap; None when it has no cells"""
+    if not cell_map:
+        return None
+    offsets = cell_map.offsets
+    deltas = array('I', [offsets[0]])
+    deltas.extend(offsets[i] - offsets[i - 1] for i in range(1, len(offsets)))
+    names = json.dumps(cell_map.names, ensure_ascii=False).encode('utf-8')
+    parts = [CELL_MAP, struct.pack('<II', len(names), len(offsets)), names]
+    parts.extend(_little_endian(arr).tobytes() for arr in (deltas, cell_map.sheets, cell_map.rows, cell_map.columns))
+    return zlib.compress(b''.join(parts))
+
+def line_map(text, first_line=1):
+    """Encoded line map of a text whose first line is first_line"""
+    return zlib.compress(LINE_MAP + json.dumps([first_line, first_line + text.count('\n')]).encode('utf-8'))
+
+def _decode_cells(payload):
+    name_size, count = struct.unpack_from('<II', payload)
+    position = 8 + name_size
+    cell_map = CellMap()
+    cell_map.names = json.loads(payload[8:position].decode('utf-8'))
+    arrays = []
+    for typecode in ('I', 'H', 'I', 'H'):
+        arr = array(typecode)
+        size = arr.itemsize * count
+        arr.frombytes(payload[position:position + size])
+        position += size
+        arrays.append(_little_endian(arr))
+    deltas, cell_map.sheets, cell_map.rows, cell_map.columns = arrays
+    cell_map.offsets = array('q', accumulate(deltas))
+    return cell_map
+
+def decode(data):
+    """Return the PositionMap, CellMap or LineMap of an encoded map (an empty map for None)"""
+    if not data:
+        return PositionMap()
+    payload = zlib.decompress(data)
+    kind, payload = payload[:1], payload[1:]
+    if kind == LINE_MAP:
+        return LineMap(*json.loads(payload))
+    if kind == CELL_MAP:
+        return _decode_cells(payload)
+    offset = 0
+    entries = []
+    for delta, label in json.loads(payload):
+        offset += delta
+        entries.append((offset, label))
+    return PositionMap(entries)
+
+def next_line(data):
+    """Number of the line after the text of an encoded line map, or None for other maps"""
+    position_map = decode(data)
+    return position_map.next_line if position_map.is_line_map else None
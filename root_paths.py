@@ -0,0 +1,86 @@
+"""
+Canonical root folders for SearchAuto.
+
+Roots are stored canonicalized: os.path.realpath, so a relative path, a
+symlink and the folder it points to are all the same root. They are
+compared by root_key, which also folds case on filesystems that ignore
+it (Windows, and macOS by default).
+
+Roots may nest. Every file belongs to the deepest root containing it:
+the walk of an outer root skips the roots nested in it, and filtering on
+an outer root also takes in the files of its nested roots.
+"""
+
+import os
+
+_case_insensitive = {}
+
+def canonical_root(path):
+    """Absolute path of a folder with symlinks resolved"""
+    return os.path.normpath(os.path.realpath(os.path.expanduser(path)))
+
+def is_case_insensitive(root):
+    """True if the filesystem holding root treats names differing only in case as the same.
+
+    Probed once per root by looking up one of its components with the
+    case swapped.
+    """
+    if os.name == 'nt':
+        return True
+    if root not in _case_insensitive:
+        result = False
+        probe = root
+        while probe != os.path.dirname(probe):
+            name = os.path.basename(probe)
+            if name.swapcase() != name and os.path.exists(probe):
+                swapped = os.path.join(os.path.dirname(probe), name.swapcase())
+                try:
+                    result = os.path.samefile(probe, swapped)
+                except OSError:
+                    result = False
+                break
+            probe = os.path.dirname(probe)
+        _case_insensitive[root] = result
+    return _case_insensitive[root]
+
+def root_key(path, fold=None):
+    """Comparison key for a canonical path; fold defaults to probing path's filesystem"""
+    key = os.path.normcase(path)
+    if fold is None:
+        fold = is_case_insensitive(path)
+    return key.casefold() if fold else key
+
+def is_within(path, root):
+    """True if path is root or lies below it (both canonical)"""
+    fold = is_case_insensitive(root)
+    path_key, key = root_key(path, fold), root_key(root, fold)
+    return path_key == key or path_key.startswith(os.path.join(key, ''))
+
+def find_same(root, roots):
+    """Return the root in roots that is the same folder as root, or None"""
+    key = root_key(root)
+    return next((other for other in roots if root_key(other) == key), None)
+
+def nested_roots(root, roots):
+    """The roots strictly inside root"""
+    return [other for other in roots if other != root and is_within(other, root) and not find_same(other, [root])]
+
+def owner_root(path, roots):
+    """The deepest of roots containing path, or None"""
+    owners = [root for root in roots if is_within(path, root)]
+    return max(owners, key=len) if owners else None
+
+def outermost_roots(roots):
+    """roots without the ones inside another of them; walking these covers every file once"""
+    result = []
+    for root in roots:
+        if not any(other != root and is_within(root, other) for other in roots) and not find_same(root, result):
+            result.append(root)
+    return result
+
+def with_nested_roots(selected, roots):
+    """selected plus every root nested inside one of them"""
+    result = list(selected)
+    for root in selected:
+        result.extend(other for other in nested_roots(root, roots) if other not in result)
+    return result
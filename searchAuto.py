@@ -12,7 +12,18 @@ import time
 import threading
 import json
 import re
+import multiprocessing
 import numpy as np
+from file_extractors import append_start, extract_file_content
+from dir_walker import DirWalker
+from live_search import LiveSearch
+import ignore_rules
+import index_db
+from index_db import connect_index, IndexWriter
+from index_pipeline import IndexPipeline, MoveDetector
+import jobs
+from jobs import JobScheduler
+import root_paths
 # Add dotenv support
 try:
     from dotenv import load_dotenv
@@ -56,8 +67,18 @@ class ToolTip(object):
             tw.destroy()
 
 INDEX_DB = os.path.join(os.path.dirname(__file__), 'file_index.db')
-search_cancelled = False
-indexing_in_progress = False
+# Runs searches and index operations, each with its own cancellation token (see jobs)
+scheduler = JobScheduler()
+# Minutes between the background index updates
+UPDATE_INTERVAL = 30
+# Number of extraction processes used by rebuild/update (None = one per CPU core)
+INDEX_WORKERS = None
+# Slowest extractions listed after a rebuild/update
+SLOWEST_SHOWN = 3
+# Number of index search hits fetched per page ("Load more" fetches the next page)
+INDEX_PAGE_SIZE = 200
+# Saved directory listings used by incremental updates (kept next to INDEX_DB)
+WALK_STATE_NAME = 'walk_state.db'
 
 # === Helper for loading embeddings ===
 def load_embeddings(filename):
@@ -70,76 +91,112 @@ def load_embeddings(filename):
 
 # === Database Schema Migration ===
 def ensure_schema():
-    conn = sqlite3.connect(INDEX_DB, timeout=30)
-    c = conn.cursor()
-    # Check if file_index exists and has root_path column
-    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='file_index'")
-    if c.fetchone():
-        try:
-            c.execute('SELECT root_path FROM file_index LIMIT 1')
-        except sqlite3.OperationalError:
-            c.execute('DROP TABLE file_index')
-    c.execute('''CREATE TABLE IF NOT EXISTS roots (root_path TEXT PRIMARY KEY)''')
-    c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS file_index USING fts5(
-        file_path, file_type, mtime, content, root_path
-    )''')
-    conn.commit()
+    conn = connect_index(INDEX_DB)
+    index_db.ensure_schema(conn)
     conn.close()
 
 # === Multiple Roots Management ===
+_roots_normalized = set()
+
 def init_db():
     ensure_schema()
+    if INDEX_DB not in _roots_normalized:
+        _roots_normalized.add(INDEX_DB)
+        normalize_roots()
 
 def get_roots():
     init_db()
-    conn = sqlite3.connect(INDEX_DB, timeout=30)
+    conn = connect_index(INDEX_DB)
     c = conn.cursor()
     c.execute('SELECT root_path FROM roots')
     roots = [row[0] for row in c.fetchall()]
     conn.close()
     return roots
 
+def reassign_root_files(conn, roots, from_roots):
+    """Give the indexed files of from_roots to the root that owns them now.
+
+    Each file belongs to the deepest of roots containing it (see root_paths).
+    Files no root contains are dropped, and so are files the new owner
+    already has, which an outer and a nested root both indexed.
+    """
+    c = conn.cursor()
+    tables = ['indexed_files']
+    if index_db.has_shadow(conn):
+        tables.append(f'indexed_files{index_db.SHADOW_SUFFIX}')
+    for table in tables:
+        for from_root in from_roots:
+            c.execute(f'SELECT file_path FROM {table} WHERE root_path=?', (from_root,))
+            for (file_path,) in c.fetchall():
+                owner = root_paths.owner_root(file_path, roots)
+                if owner == from_root:
+                    continue
+                if owner is not None:
+                    c.execute(f'UPDATE OR IGNORE {table} SET root_path=? WHERE file_path=? AND root_path=?',
+                              (owner, file_path, from_root))
+                c.execute(f'DELETE FROM {table} WHERE file_path=? AND root_path=?', (file_path, from_root))
+
+def normalize_roots():
+    """Canonicalize the stored roots and give files under nested roots a single owner.
+
+    Roots added by older versions were stored as typed; a root reached
+    through a symlink or spelled differently is merged into its canonical
+    twin.
+    """
+    conn = connect_index(INDEX_DB)
+    c = conn.cursor()
+    c.execute('SELECT root_path FROM roots')
+    stored = [row[0] for row in c.fetchall()]
+    roots = []
+    for root_path in stored:
+        canonical = root_paths.canonical_root(root_path)
+        if not root_paths.find_same(canonical, roots):
+            roots.append(canonical)
+    outer = [r for r in roots if root_paths.nested_roots(r, roots)]
+    if roots != stored or outer:
+        c.execute('DELETE FROM roots')
+        c.executemany('INSERT INTO roots (root_path) VALUES (?)', [(r,) for r in roots])
+        reassign_root_files(conn, roots, [r for r in stored if r not in roots] + outer)
+        conn.commit()
+    conn.close()
+
 def add_root(root_path):
-    init_db()
-    conn = sqlite3.connect(INDEX_DB, timeout=30)
+    """Add a root folder and return the root as stored.
+
+    The path is canonicalized; a path naming a folder that is already a root
+    (through a symlink, or in another case on a case-insensitive disk)
+    returns that root. A root nested in an existing one takes over the
+    files the outer root had indexed below it.
+    """
+    roots = get_roots()
+    root_path = root_paths.canonical_root(root_path)
+    same = root_paths.find_same(root_path, roots)
+    if same:
+        return same
+    conn = connect_index(INDEX_DB)
     c = conn.cursor()
-    c.execute('INSERT OR IGNORE INTO roots (root_path) VALUES (?)', (root_path,))
+    c.execute('INSERT INTO roots (root_path) VALUES (?)', (root_path,))
+    outer = [r for r in roots if root_paths.is_within(root_path, r)]
+    reassign_root_files(conn, roots + [root_path], outer)
     conn.commit()
     conn.close()
+    return root_path
 
 def remove_root(root_path):
-    init_db()
-    conn = sqlite3.connect(INDEX_DB, timeout=30)
+    """Remove a root; files also under an outer root are handed to it, the rest leave the index"""
+    roots = [r for r in get_roots() if r != root_path]
+    conn = connect_index(INDEX_DB)
     c = conn.cursor()
     c.execute('DELETE FROM roots WHERE root_path=?', (root_path,))
-    c.execute('DELETE FROM file_index WHERE root_path=?', (root_path,))
+    reassign_root_files(conn, roots, [root_path])
+    c.execute('DELETE FROM index_jobs WHERE root_path=?', (root_path,))
     conn.commit()
     conn.close()
+    DirWalker(walk_state_path(), namespace='index').forget(root_path)
 
 # === Indexing Functions (now for all roots) ===
-def extract_file_content(file_path):
-    try:
-        if file_path.endswith('.txt'):
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                return f.read()
-        elif file_path.endswith('.md'):
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                return f.read()
-        elif file_path.endswith('.docx'):
-            doc = Document(file_path)
-            return '\n'.join([para.text for para in doc.paragraphs])
-        elif file_path.endswith('.pdf'):
-            return extract_text(file_path)
-        elif file_path.endswith('.xlsx') and not os.path.basename(file_path).startswith('~$'):
-            df = pd.read_excel(file_path, sheet_name=None)
-            content = []
-            for sheet_name, sheet_data in df.items():
-                for row in sheet_data.itertuples(index=False):
-                    content.append(' '.join([str(cell) for cell in row if pd.notnull(cell)]))
-            return '\n'.join(content)
-    except Exception as e:
-        print(f"Error extracting {file_path}: {e}")
-    return ''
+def walk_state_path():
+    return os.path.join(os.path.dirname(os.path.abspath(INDEX_DB)), WALK_STATE_NAME)
 
 def get_selected_roots():
     try:
@@ -153,261 +210,288 @@ def get_selected_roots():
         # If GUI elements don't exist, return all roots
         return get_roots()
 
-def build_index_all():
-    global search_cancelled, indexing_in_progress
-    if indexing_in_progress:
-        return  # Skip if another operation is in progress
-    indexing_in_progress = True
-    search_cancelled = False
-    try:
-        init_db()
-        roots = get_selected_roots()
-        conn = sqlite3.connect(INDEX_DB, timeout=30)
-        c = conn.cursor()
-        c.execute('DELETE FROM file_index')
-        conn.commit()
-        for root_path in roots:
-            for root, dirs, files in os.walk(root_path):
-                for file in files:
-                    if search_cancelled:
-                        conn.commit()
-                        conn.close()
-                        indexing_in_progress = False
-                        return
-                    file_path = os.path.join(root, file)
-                    if file.endswith(('.txt', '.md', '.docx', '.pdf', '.xlsx')) and not file.startswith('~$'):
-                        mtime = os.path.getmtime(file_path)
-                        content = extract_file_content(file_path)
-                        c.execute('INSERT INTO file_index (file_path, file_type, mtime, content, root_path) VALUES (?, ?, ?, ?, ?)',
-                                  (file_path, os.path.splitext(file)[1][1:].upper(), mtime, content, root_path))
-        conn.commit()
+def build_index_all(is_cancelled=None):
+    """Rebuild the index of the selected roots; run it as a jobs.WRITE job"""
+    init_db()
+    all_roots = get_roots()
+    # The walk of an outer root leaves its nested roots to themselves, and the
+    # swap replaces the whole index, so they are rebuilt along with it
+    roots = root_paths.with_nested_roots(get_selected_roots(), all_roots)
+    conn = connect_index(INDEX_DB)
+    c = conn.cursor()
+    index_db.drop_old_generations(conn)
+    # The rebuild fills shadow tables; searches keep using the live index
+    # until the finished shadow is swapped in
+    resume = index_db.get_index_jobs(conn)
+    if resume and set(resume) == set(roots) and index_db.has_shadow(conn):
+        # An interrupted rebuild of the same roots: keep what it already
+        # wrote and carry on from its checkpoints
+        print(f"Resuming index rebuild of {len(roots)} root(s)")
+        c.execute(f'SELECT file_path, root_path FROM indexed_files{index_db.SHADOW_SUFFIX}')
+        completed = set(c.fetchall())
+    else:
+        resume = {}
+        completed = set()
+        index_db.create_shadow(conn)
+        index_db.start_index_jobs(conn, roots)
+    conn.close()
+
+    def needs_extraction(file_path, root_path, mtime, size):
+        return None if (file_path, root_path) in completed else 'insert'
+
+    pipeline = IndexPipeline(INDEX_DB, workers=INDEX_WORKERS, is_cancelled=is_cancelled, shadow=True,
+                             walk_state=walk_state_path())
+    pipeline.run(roots, needs_extraction, resume=resume, all_roots=all_roots)
+    # A failed write lost rows: the live index stays, and the checkpoints let
+    # the next rebuild write them again
+    if not pipeline.cancelled and pipeline.error is None:
+        conn = connect_index(INDEX_DB)
+        index_db.swap_shadow(conn)
+        index_db.drop_old_generations(conn)
         conn.close()
-    finally:
-        indexing_in_progress = False
-
-def update_index_all():
-    global search_cancelled, indexing_in_progress
-    if indexing_in_progress:
-        return  # Skip if another operation is in progress
-    indexing_in_progress = True
-    search_cancelled = False
-    try:
-        init_db()
-        roots = get_selected_roots()
-        conn = sqlite3.connect(INDEX_DB, timeout=30)
-        c = conn.cursor()
-        c.execute('SELECT file_path, mtime, root_path FROM file_index')
-        indexed = {(row[0], row[2]): row[1] for row in c.fetchall()}
-        seen = set()
-        for root_path in roots:
-            for root, dirs, files in os.walk(root_path):
-                for file in files:
-                    if search_cancelled:
-                        conn.commit()
-                        conn.close()
-                        indexing_in_progress = False
-                        return
-                    file_path = os.path.join(root, file)
-                    if file.endswith(('.txt', '.md', '.docx', '.pdf', '.xlsx')) and not file.startswith('~$'):
-                        mtime = os.path.getmtime(file_path)
-                        seen.add((file_path, root_path))
-                        if (file_path, root_path) not in indexed:
-                            content = extract_file_content(file_path)
-                            c.execute('INSERT INTO file_index (file_path, file_type, mtime, content, root_path) VALUES (?, ?, ?, ?, ?)',
-                                      (file_path, os.path.splitext(file)[1][1:].upper(), mtime, content, root_path))
-                        elif float(indexed[(file_path, root_path)]) < mtime:
-                            content = extract_file_content(file_path)
-                            c.execute('UPDATE file_index SET mtime=?, content=? WHERE file_path=? AND root_path=?',
-                                      (mtime, content, file_path, root_path))
+    return dict(pipeline.stats, resumed=bool(resume), cancelled=pipeline.cancelled, error=pipeline.error,
+                deduplicated=pipeline.files_deduplicated, quarantined=pipeline.files_quarantined,
+                still_quarantined=pipeline.files_skipped_quarantined, slowest=pipeline.slowest)
+
+def update_index_all(prune_unchanged=False, is_cancelled=None):
+    """Index new and changed files and drop deleted ones; run it as a jobs.WRITE job.
+
+    With prune_unchanged, directories whose mtime has not changed since the
+    last walk are not listed again (see dir_walker). The periodic update
+    uses it; the Update button always does a full pass.
+    """
+    init_db()
+    roots = get_selected_roots()
+    conn = connect_index(INDEX_DB)
+    c = conn.cursor()
+    placeholders = ','.join('?' for _ in roots)
+    c.execute(f'''SELECT file_path, mtime, root_path, size, inode, fingerprint, indexed_bytes, prefix_hash,
+                         (SELECT COUNT(*) FROM file_segments s WHERE s.content_id = f.content_id),
+                         (SELECT COUNT(*) FROM indexed_files g WHERE g.content_id = f.content_id)
+                  FROM indexed_files f WHERE root_path IN ({placeholders})''', roots)
+    rows = c.fetchall()
+    conn.close()
+    indexed = {(row[0], row[2]): row for row in rows}
+    # New paths are checked against indexed files that disappeared, so a
+    # moved or renamed file keeps its content instead of being extracted again
+    moves = MoveDetector((row[0], row[2], row[3], row[4], row[5]) for row in rows)
+
+    def needs_extraction(file_path, root_path, mtime, size):
+        if (file_path, root_path) not in indexed:
+            return moves.find(file_path, size) or 'insert'
+        _, old_mtime, _, old_size, _, _, indexed_bytes, prefix_hash, segments, sharers = indexed[(file_path, root_path)]
+        if float(old_mtime) < mtime:
+            # A text file that only grew gets its new tail indexed as one
+            # more segment, unless its content is shared with a copy
+            start = None
+            if segments < index_db.MAX_SEGMENTS and sharers == 1:
+                start = append_start(file_path, size, old_size, indexed_bytes, prefix_hash)
+            return 'update' if start is None else ('append', start)
+        return None
+
+    pipeline = IndexPipeline(INDEX_DB, workers=INDEX_WORKERS, is_cancelled=is_cancelled,
+                             walk_state=walk_state_path(), prune_unchanged=prune_unchanged)
+    seen = pipeline.run(roots, needs_extraction, all_roots=get_roots())
+    stats = dict(pipeline.stats, cancelled=pipeline.cancelled, error=pipeline.error, moved=pipeline.files_moved,
+                 appended=pipeline.files_appended, deduplicated=pipeline.files_deduplicated,
+                 quarantined=pipeline.files_quarantined, still_quarantined=pipeline.files_skipped_quarantined,
+                 slowest=pipeline.slowest)
+    if pipeline.cancelled or pipeline.error is not None:
+        return stats
+    with IndexWriter(INDEX_DB) as writer:
         for (file_path, root_path) in indexed:
-            if (file_path, root_path) not in seen:
-                c.execute('DELETE FROM file_index WHERE file_path=? AND root_path=?', (file_path, root_path))
-        conn.commit()
-        conn.close()
+            if (file_path, root_path) not in seen and (file_path, root_path) not in moves.claimed:
+                writer.delete(file_path, root_path)
+    return stats
+
+def get_index_tokenizer():
+    init_db()
+    conn = connect_index(INDEX_DB)
+    tokenizer = index_db.get_tokenizer(conn)
+    conn.close()
+    return tokenizer
+
+def set_index_tokenizer(tokenizer):
+    """Switch file_index between the standard ('unicode61') and CJK ('trigram') tokenizer; a jobs.WRITE job"""
+    init_db()
+    conn = connect_index(INDEX_DB)
+    try:
+        return index_db.set_tokenizer(conn, tokenizer)
     finally:
-        indexing_in_progress = False
+        conn.close()
+
+def format_index_stats(stats):
+    """Format writer throughput for the rebuild/update message box"""
+    if not stats:
+        return ''
+    msg = f"\n{stats['rows']} rows written ({stats['rows_per_second']:.0f} rows/s)"
+    if stats.get('moved'):
+        msg += f"\n{stats['moved']} moved or renamed files re-pointed without extraction."
+    if stats.get('deduplicated'):
+        msg += f"\n{stats['deduplicated']} copies of already indexed documents stored without extraction."
+    if stats.get('appended'):
+        msg += f"\n{stats['appended']} growing text files updated with their new lines only."
+    if stats.get('quarantined'):
+        msg += f"\n{stats['quarantined']} files quarantined: extraction timed out, ran out of memory or crashed."
+    if stats.get('still_quarantined'):
+        msg += f"\n{stats['still_quarantined']} unchanged quarantined files skipped."
+    if stats.get('resumed'):
+        msg += "\nResumed from the previous interrupted rebuild."
+    if stats.get('slowest'):
+        msg += "\nSlowest files:"
+        for seconds, file_path in stats['slowest'][:SLOWEST_SHOWN]:
+            msg += f"\n  {seconds:.1f} s  {os.path.basename(file_path)}"
+    return msg
 
 def search_index(keyword):
+    """Return every index hit for keyword, best matches first"""
+    return search_index_page(keyword, limit=None, with_total=False)[0]
+
+def index_location(root_path, start, location=None):
+    """Location column of an index hit.
+
+    location comes from the position map of the hit's segment (page,
+    paragraph, cell or line); without one, hits in an appended segment show
+    where it starts.
+    """
+    if location:
+        return f"{location} (Indexed, {root_path})"
+    if start:
+        return f"Indexed ({root_path}, appended at byte {start})"
+    return f"Indexed ({root_path})"
+
+def search_index_page(keyword, offset=0, limit=INDEX_PAGE_SIZE, with_total=True):
+    """Return (results, total) for one page of ranked index hits.
+
+    limit=None returns all remaining hits. total is None when with_total is
+    False, which skips the extra COUNT query when loading later pages.
+    """
     # Get all roots and selected roots BEFORE opening any DB connection
     all_roots = get_roots()
     selected_roots = get_selected_roots()
     results = []
+    total = None
+    page_params = (-1 if limit is None else limit, offset)
     # Now open the DB connection
-    conn = sqlite3.connect(INDEX_DB, timeout=30)
+    conn = connect_index(INDEX_DB)
     c = conn.cursor()
-    
-    # Check if keyword contains non-Latin characters (like Chinese)
-    has_non_latin = any(ord(char) > 127 for char in keyword)
-    
-    if has_non_latin:
-        # For non-Latin characters, use LIKE search instead of FTS5
-        if selected_roots and len(selected_roots) < len(all_roots):
-            placeholders = ','.join('?' for _ in selected_roots)
-            q = f"SELECT file_path, file_type, content, root_path FROM file_index WHERE content LIKE ? AND root_path IN ({placeholders})"
-            c.execute(q, (f'%{keyword}%', *selected_roots))
-        else:
-            q = "SELECT file_path, file_type, content, root_path FROM file_index WHERE content LIKE ?"
-            c.execute(q, (f'%{keyword}%',))
-        
-        for file_path, file_type, content, root_path in c.fetchall():
-            # Find the position of the keyword in content
-            pos = content.lower().find(keyword.lower())
-            if pos >= 0:
-                # Create a snippet around the keyword
-                start = max(0, pos - 50)
-                end = min(len(content), pos + len(keyword) + 50)
-                snippet = content[start:end]
-                if start > 0:
-                    snippet = "..." + snippet
-                if end < len(content):
-                    snippet = snippet + "..."
-                
-                results.append({
-                    "File Path": file_path,
-                    "File Type": file_type,
-                    "Location": f"Indexed ({root_path})",
-                    "Content": snippet
-                })
-    else:
-        # For Latin characters, use FTS5 search
-        if selected_roots and len(selected_roots) < len(all_roots):
-            placeholders = ','.join('?' for _ in selected_roots)
-            q = f"SELECT file_path, file_type, snippet(file_index, 3, '[', ']', '...', 20), root_path FROM file_index WHERE content MATCH ? AND root_path IN ({placeholders})"
-            c.execute(q, (keyword, *selected_roots))
-        else:
-            q = f"SELECT file_path, file_type, snippet(file_index, 3, '[', ']', '...', 20), root_path FROM file_index WHERE content MATCH ?"
-            c.execute(q, (keyword,))
-        
-        for file_path, file_type, snippet_, root_path in c.fetchall():
+
+    root_filter = ''
+    root_params = ()
+    if selected_roots and len(selected_roots) < len(all_roots):
+        # Files under a root nested in a selected one are stored under the nested root
+        selected_roots = root_paths.with_nested_roots(selected_roots, all_roots)
+        placeholders = ','.join('?' for _ in selected_roots)
+        root_filter = f" AND f.root_path IN ({placeholders})"
+        root_params = tuple(selected_roots)
+
+    # Latin keywords, and CJK keywords on a trigram index, go through FTS5
+    match_query = index_db.build_match_query(keyword, index_db.get_tokenizer(conn))
+
+    if match_query is None:
+        # Fall back to a substring scan. The snippet is cut out in SQL so
+        # whole documents are never loaded into Python. instr() is used
+        # rather than LIKE, which returns no rows for short patterns on a
+        # trigram table.
+        matches = f"""SELECT f.id, f.file_path, f.file_type, f.root_path, s.start, s.id AS segment_id, file_index.content AS content,
+                             instr(lower(file_index.content), lower(?)) AS pos
+                      FROM file_index {index_db.HIT_JOIN}
+                      WHERE 1{root_filter}"""
+        if with_total:
+            c.execute(f"SELECT COUNT(*) FROM ({matches}) WHERE pos > 0", (keyword, *root_params))
+            total = c.fetchone()[0]
+        q = f"""SELECT file_path, file_type, root_path, start, pos,
+                       substr(content, max(pos - 50, 1), min(pos - 1, 50) + ? + 50), length(content), segment_id
+                FROM ({matches})
+                WHERE pos > 0 ORDER BY id, start LIMIT ? OFFSET ?"""
+        c.execute(q, (len(keyword), keyword, *root_params, *page_params))
+        rows = c.fetchall()
+        locations = index_db.locate_hits(conn, [(row[7], row[4]) for row in rows])
+
+        for (file_path, file_type, root_path, start, pos, snippet, length, _), location in zip(rows, locations):
+            if pos > 51:
+                snippet = "..." + snippet
+            if pos + len(keyword) + 49 < length:
+                snippet = snippet + "..."
             results.append({
                 "File Path": file_path,
                 "File Type": file_type,
-                "Location": f"Indexed ({root_path})",
-                "Content": snippet_
+                "Location": index_location(root_path, start, location),
+                "Content": snippet
             })
-    
-    conn.close()
-    return results
-
-# === Live Search Functions ===
-def search_txt(file_path, keyword, results):
-    global search_cancelled
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            for i, line in enumerate(f, start=1):
-                if search_cancelled:
-                    return
-                # Use case-insensitive search for both Latin and non-Latin characters
-                if keyword.lower() in line.lower():
-                    results.append({
-                        "File Path": file_path,
-                        "File Type": "TXT",
-                        "Location": f"Line {i}",
-                        "Content": line.strip()
-                    })
-    except Exception as e:
-        print(f"Error reading TXT {file_path}: {e}")
-
-def search_md(file_path, keyword, results):
-    global search_cancelled
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            for i, line in enumerate(f, start=1):
-                if search_cancelled:
-                    return
-                # Use case-insensitive search for both Latin and non-Latin characters
-                if keyword.lower() in line.lower():
-                    results.append({
-                        "File Path": file_path,
-                        "File Type": "MD",
-                        "Location": f"Line {i}",
-                        "Content": line.strip()
-                    })
-    except Exception as e:
-        print(f"Error reading MD {file_path}: {e}")
-
-def search_docx(file_path, keyword, results):
-    global search_cancelled
-    try:
-        doc = Document(file_path)
-        for i, para in enumerate(doc.paragraphs, start=1):
-            if search_cancelled:
-                return
-            # Use case-insensitive search for both Latin and non-Latin characters
-            if keyword.lower() in para.text.lower():
-                results.append({
-                    "File Path": file_path,
-                    "File Type": "DOCX",
-                    "Location": f"Paragraph {i}",
-                    "Content": para.text.strip()
-                })
-    except Exception as e:
-        print(f"Error reading DOCX {file_path}: {e}")
-
-def search_pdf(file_path, keyword, results):
-    global search_cancelled
-    try:
-        text = extract_text(file_path)
-        if search_cancelled:
-            return
-        if text and keyword.lower() in text.lower():
+    else:
+        matches = f"""FROM file_index {index_db.HIT_JOIN}
+                      WHERE file_index MATCH ?{root_filter}"""
+        if with_total:
+            c.execute(f"SELECT COUNT(*) {matches}", (match_query, *root_params))
+            total = c.fetchone()[0]
+        # "rank MATCH" sets the bm25 column weights while letting FTS5 do the
+        # ordering itself, so snippets are only built for the rows returned
+        # The offset of the first term in the text locates the hit in its
+        # position map; it is only computed for the rows returned
+        q = f"""SELECT f.file_path, f.file_type, snippet(file_index, 0, '[', ']', '...', 20), f.root_path, s.start, s.id,
+                       instr(lower(file_index.content), lower(?))
+                {matches} AND file_index.rank MATCH ? ORDER BY file_index.rank LIMIT ? OFFSET ?"""
+        c.execute(q, (index_db.hit_term(keyword), match_query, *root_params, index_db.bm25_rank_function(), *page_params))
+        rows = c.fetchall()
+        locations = index_db.locate_hits(conn, [(row[5], row[6]) for row in rows])
+
+        for (file_path, file_type, snippet_, root_path, start, _, _), location in zip(rows, locations):
             results.append({
                 "File Path": file_path,
-                "File Type": "PDF",
-                "Location": "Full Text",
-                "Content": "Match found"
+                "File Type": file_type,
+                "Location": index_location(root_path, start, location),
+                "Content": snippet_
             })
-    except Exception as e:
-        print(f"Error reading PDF {file_path}: {e}")
 
-def search_xlsx(file_path, keyword, results):
-    global search_cancelled
+    conn.close()
+    return results, total
+
+def index_candidates(keywords):
+    """Return (indexed, candidates) for an index-assisted live search, or None without an index.
+
+    indexed maps every indexed file to its (mtime, size) when it was
+    indexed; candidates are the indexed files whose text may contain the
+    keyword, or one of a list of keywords (see index_db.find_candidates).
+    """
+    if not os.path.exists(INDEX_DB):
+        return None
+    if isinstance(keywords, str):
+        keywords = [keywords]
     try:
-        df = pd.read_excel(file_path, sheet_name=None) # All sheets
-        for sheet_name, sheet_data in df.items():
-            for row_idx, row in sheet_data.iterrows():
-                if search_cancelled:
-                    return
-                for col_name, cell_value in row.items():
-                    if pd.notnull(cell_value) and keyword.lower() in str(cell_value).lower():
-                        # Convert row_idx to string first, then to int to handle various index types
-                        try:
-                            row_num = int(str(row_idx)) + 1
-                        except (ValueError, TypeError):
-                            row_num = 1  # Fallback if conversion fails
-                        results.append({
-                            "File Path": file_path,
-                            "File Type": "XLSX",
-                            "Location": f"Sheet {sheet_name}, Row {row_num}, Column {col_name}",
-                            "Content": str(cell_value)
-                        })
-    except Exception as e:
-        print(f"Error reading XLSX {file_path}: {e}")
-
-def search_folder(folder_path, keyword, results):
-    global search_cancelled
-    search_cancelled = False
-    for root, dirs, files in os.walk(folder_path):
-        for file in files:
-            if search_cancelled:
-                return
-            file_path = os.path.join(root, file)
-            if file.endswith('.txt'):
-                search_txt(file_path, keyword, results)
-            elif file.endswith('.md'):
-                search_md(file_path, keyword, results)
-            elif file.endswith('.docx'):
-                search_docx(file_path, keyword, results)
-            elif file.endswith('.pdf'):
-                search_pdf(file_path, keyword, results)
-            elif file.endswith('.xlsx'):
-                search_xlsx(file_path, keyword, results)
+        init_db()
+        conn = connect_index(INDEX_DB)
+        try:
+            candidates = set()
+            for keyword in keywords:
+                candidates |= index_db.find_candidates(conn, keyword)
+            return index_db.get_indexed_files(conn), candidates
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Index not used for live search: {e}")
+        return None
+
+def search_folder(folder_path, keyword, results, candidates=None, is_cancelled=None):
+    """Live-search every supported file under folder_path.
+
+    With candidates from index_candidates(), files that are indexed and
+    unchanged since are only opened if the index says they may contain
+    keyword; new and changed files are always searched. Returns the number
+    of files skipped that way.
+    """
+    search = LiveSearch(keyword, is_cancelled=is_cancelled)
+    results.extend(search.run([folder_path], candidates))
+    return search.skipped
 
 # === GUI Functions for Roots ===
 def add_root_gui():
     folder = filedialog.askdirectory()
     if folder:
-        add_root(folder)
+        roots = get_roots()
+        stored = add_root(folder)
+        if stored in roots:
+            messagebox.showinfo("Add Root", f"{folder} is already indexed as {stored}.")
         update_roots_listbox()
 
 def remove_root_gui():
@@ -415,11 +499,34 @@ def remove_root_gui():
     if selection:
         roots = [roots_listbox.get(i) for i in selection]
         if messagebox.askyesno("Remove Roots", f"Remove selected roots and all their files from index?\n{', '.join(roots)}"):
-            wait_win = show_wait_message("Removing root(s), please wait...")
-            for root in roots:
-                remove_root(root)
-            wait_win.destroy()
-            update_roots_listbox()
+            def remove_job(job):
+                root.after(0, lambda: status_var.set("Removing root(s)..."))
+                try:
+                    for root_path in roots:
+                        remove_root(root_path)
+                except Exception as e:
+                    report_job_error("Remove roots", e, update_roots_listbox)
+                    raise
+                root.after(0, lambda: [update_roots_listbox(), status_var.set("Ready")])
+            # A write like any other: it waits for a running rebuild or update
+            scheduler.submit("Remove roots", remove_job, jobs.WRITE, jobs.USER)
+
+def explain_ignore_rules_gui():
+    """Show the exclusion rules of the selected roots and how much each one prunes"""
+    roots = get_selected_roots()
+    if not roots:
+        return
+    status_var.set("Checking ignore rules...")
+
+    def explain_job(job):
+        try:
+            text = '\n\n'.join(ignore_rules.format_report(r) for r in roots)
+        except Exception as e:
+            report_job_error("Ignore rules check", e)
+            raise
+        root.after(0, lambda: [messagebox.showinfo("Ignore Rules", text), status_var.set("Ready")])
+    # Only walks the roots, so it runs alongside searches and index writes
+    scheduler.submit("Explain ignore rules", explain_job, jobs.READ, jobs.USER)
 
 def move_root_up():
     selection = roots_listbox.curselection()
@@ -433,7 +540,7 @@ def move_root_up():
         roots[selected_index], roots[selected_index - 1] = roots[selected_index - 1], roots[selected_index]
         
         # Update the database with new order
-        conn = sqlite3.connect(INDEX_DB, timeout=30)
+        conn = connect_index(INDEX_DB)
         c = conn.cursor()
         c.execute('DELETE FROM roots')  # Clear all roots
         for root in roots:
@@ -457,7 +564,7 @@ def move_root_down():
         roots[selected_index], roots[selected_index + 1] = roots[selected_index + 1], roots[selected_index]
         
         # Update the database with new order
-        conn = sqlite3.connect(INDEX_DB, timeout=30)
+        conn = connect_index(INDEX_DB)
         c = conn.cursor()
         c.execute('DELETE FROM roots')  # Clear all roots
         for root in roots:
@@ -475,9 +582,23 @@ def update_roots_listbox():
         roots_listbox.insert(tk.END, root)
 
 # === Threaded Indexing/Search Functions ===
+# Every operation is a job (see jobs): searches are interactive reads that
+# replace the previous search and never wait for the index; rebuild,
+# update and the tokenizer switch are writes that run one at a time.
+def report_job_error(title, error, then=None):
+    """Show the exception a job target raised and reset the status bar; then() runs first, on the Tk thread.
+
+    Targets re-raise it afterwards, so the job is still listed as failed.
+    """
+    def show():
+        status_var.set("Ready")
+        if then is not None:
+            then()
+        messagebox.showerror(title, f"{title} failed:\n{error}")
+    root.after(0, show)
+
 def build_index_all_thread():
-    thread = threading.Thread(target=build_index_all_gui)
-    thread.start()
+    scheduler.submit("Rebuild index", build_index_all_gui, jobs.WRITE, jobs.USER, key='rebuild')
 
 def show_wait_message(msg):
     wait_win = tk.Toplevel(root)
@@ -489,51 +610,117 @@ def show_wait_message(msg):
     wait_win.update()
     return wait_win
 
-def build_index_all_gui():
-    global search_cancelled
-    search_cancelled = False
-    status_var.set("Rebuilding index...")
-    wait_win = show_wait_message("Rebuilding index, please wait...")
+def build_index_all_gui(job):
+    # No wait window: searches can run while the index is rebuilt
+    root.after(0, lambda: status_var.set("Rebuilding index..."))
     t0 = time.time()
-    build_index_all()
-    wait_win.destroy()
-    root.after(0, lambda: [messagebox.showinfo("Index", f"Index rebuilt in {time.time() - t0:.1f} seconds."), status_var.set("Ready")])
+    try:
+        stats = build_index_all(job.is_cancelled)
+    except Exception as e:
+        report_job_error("Index rebuild", e)
+        raise
+    if stats.get('error'):
+        msg = f"Index rebuild failed: {stats['error']}\nThe previous index is still in use and the rebuild resumes next time."
+    elif stats.get('cancelled'):
+        msg = "Index rebuild stopped. The previous index is still in use and the rebuild resumes next time."
+    else:
+        msg = f"Index rebuilt in {time.time() - t0:.1f} seconds." + format_index_stats(stats)
+    root.after(0, lambda: [messagebox.showinfo("Index", msg), status_var.set("Ready")])
 
 def update_index_all_thread():
-    thread = threading.Thread(target=update_index_all_gui)
-    thread.start()
+    scheduler.submit("Update index", update_index_all_gui, jobs.WRITE, jobs.USER, key='update')
 
-def update_index_all_gui():
-    global search_cancelled
-    search_cancelled = False
-    status_var.set("Updating index...")
-    wait_win = show_wait_message("Updating index, please wait...")
+def update_index_all_gui(job):
+    root.after(0, lambda: status_var.set("Updating index..."))
     t0 = time.time()
-    update_index_all()
-    wait_win.destroy()
-    root.after(0, lambda: [messagebox.showinfo("Index", f"Index updated in {time.time() - t0:.1f} seconds."), status_var.set("Ready")])
+    try:
+        stats = update_index_all(is_cancelled=job.is_cancelled)
+    except Exception as e:
+        report_job_error("Index update", e)
+        raise
+    if stats.get('error'):
+        msg = f"Index update failed: {stats['error']}\nFiles written before the failure are kept."
+    elif stats.get('cancelled'):
+        msg = "Index update stopped. Files indexed so far are kept."
+    else:
+        msg = f"Index updated in {time.time() - t0:.1f} seconds." + format_index_stats(stats)
+    root.after(0, lambda: [messagebox.showinfo("Index", msg), status_var.set("Ready")])
+
+def toggle_cjk_index():
+    tokenizer = 'trigram' if cjk_index_var.get() else 'unicode61'
+    def toggle_job(job):
+        root.after(0, lambda: status_var.set("Rebuilding index tokenizer..."))
+        t0 = time.time()
+        try:
+            changed = set_index_tokenizer(tokenizer)
+        except Exception as e:
+            report_job_error("Index tokenizer switch", e, lambda: cjk_index_var.set(get_index_tokenizer() == 'trigram'))
+            raise
+        if changed:
+            msg = f"Index switched to {'CJK (trigram)' if tokenizer == 'trigram' else 'standard'} mode in {time.time() - t0:.1f} seconds."
+            root.after(0, lambda: [messagebox.showinfo("Index", msg), status_var.set("Ready")])
+        else:
+            root.after(0, lambda: [cjk_index_var.set(get_index_tokenizer() == 'trigram'), status_var.set("Ready")])
+    scheduler.submit("Switch index tokenizer", toggle_job, jobs.WRITE, jobs.USER)
 
 def update_index_periodically():
-    global search_cancelled
-    search_cancelled = False
-    threading.Thread(target=update_index_all).start()
-    root.after(30 * 60 * 1000, update_index_periodically)  # every 30 minutes
+    # Queued behind a running write instead of skipped, and cancelled by any
+    # write the user starts; a queued periodic update is not queued twice
+    scheduler.submit("Periodic index update", lambda job: update_index_all(True, job.is_cancelled),
+                     jobs.WRITE, jobs.BACKGROUND, key='periodic-update')
+    root.after(UPDATE_INTERVAL * 60 * 1000, update_index_periodically)
 
-def start_live_search_thread():
-    thread = threading.Thread(target=start_live_search)
-    thread.start()
+def submit_search(name, target):
+    """Run target(job) as the current search, cancelling the previous one"""
+    return scheduler.submit(name, target, jobs.READ, jobs.INTERACTIVE, key='search', replace=True)
 
-def start_live_search():
-    global search_cancelled
-    search_cancelled = False
-    keyword = get_keyword_for_classic()
-    if not keyword:
+def start_live_search_thread():
+    use_index = use_index_var.get()
+    submit_search("Live search", lambda job: start_live_search(use_index, job))
+
+def start_live_search(use_index=True, job=None):
+    """Search the files themselves; with use_index, the index first narrows down which ones to open.
+
+    Every line of the keyword box is a keyword, and all of them are looked
+    for in one pass over the files. Matches are added to the results table
+    in batches while the search runs, and the status bar shows how many
+    files have been scanned. The search stops when job is cancelled.
+    """
+    is_cancelled = job.is_cancelled if job is not None else (lambda: False)
+    keywords = get_keywords_for_classic()
+    if not keywords:
         root.after(0, lambda: messagebox.showwarning("Input Error", "Please enter a keyword."))
         return
     results.clear()
-    for root_path in get_selected_roots():
-        search_folder(root_path, keyword, results)
-    root.after(0, lambda: show_results(results))
+    root.after(0, clear_results)
+    candidates = index_candidates(keywords) if use_index else None
+
+    def add_batch(batch):
+        # A batch queued just before this search was replaced is dropped
+        if not is_cancelled():
+            results.extend(batch)
+            append_results(batch)
+
+    def on_results(batch):
+        if len(keywords) > 1:
+            # Say which of the keywords a row matched
+            for res in batch:
+                res["Location"] = f"{res['Location']} [{', '.join(res['Keywords'])}]"
+        root.after(0, lambda: add_batch(batch))
+
+    def on_progress(scanned, total, walking):
+        listing = " (still listing files)" if walking else ""
+        root.after(0, lambda: status_var.set(f"Live search: {scanned}/{total} files scanned{listing}"))
+
+    search = LiveSearch(keywords, on_results, on_progress, is_cancelled=is_cancelled)
+    search.run(root_paths.outermost_roots(get_selected_roots()), candidates)
+    if candidates is not None:
+        print(f"Live search: {search.skipped} unchanged indexed files skipped, {len(candidates[1])} index candidates")
+    if search.cancelled:
+        root.after(0, lambda: status_var.set(f"Live search cancelled after {search.scanned} files"))
+    else:
+        # Queued after the last batch, so the table is redrawn with every match
+        root.after(0, lambda: show_results(results))
 
 # Helper functions for context menu actions
 
@@ -552,24 +739,79 @@ def open_selected_folder(tree):
         open_folder_location(file_path)
 
 def cancel_search():
-    global search_cancelled
-    search_cancelled = True
-    root.after(0, lambda: messagebox.showinfo("Cancelled", "Operation cancelled by user."))
+    """Cancel the newest search or index operation the user started; the queue view cancels any job"""
+    job = scheduler.cancel_latest()
+    if job is None:
+        root.after(0, lambda: messagebox.showinfo("Cancel", "Nothing to cancel."))
+    else:
+        root.after(0, lambda: messagebox.showinfo("Cancelled", f"{job.name} cancelled by user."))
 
 def start_index_search():
-    global search_cancelled
-    search_cancelled = False
     keyword = get_keyword_for_classic()
     if not keyword:
         root.after(0, lambda: messagebox.showwarning("Input Error", "Please enter a keyword."))
         return
-    results.clear()
-    results.extend(search_index(keyword))
-    root.after(0, lambda: show_results(results))
+
+    def index_search_job(job):
+        page, total = search_index_page(keyword, 0, INDEX_PAGE_SIZE)
+        if job.is_cancelled():
+            return
+
+        def show_page():
+            results.clear()
+            index_search_state.update(keyword=keyword, offset=len(page), total=total)
+            results.extend(page)
+            show_results(results)
+            update_load_more_button()
+        root.after(0, show_page)
+    submit_search("Index search", index_search_job)
+
+def load_more_index_results():
+    """Fetch the next page of the current index search and append it"""
+    keyword = index_search_state['keyword']
+    offset = index_search_state['offset']
+    if not keyword or offset >= index_search_state['total']:
+        return
+    load_more_button.config(state="disabled")
+
+    def load_more_job(job):
+        try:
+            page, _ = search_index_page(keyword, offset, INDEX_PAGE_SIZE, with_total=False)
+        except Exception as e:
+            report_job_error("Load more", e, update_load_more_button)
+            raise
+        if job.is_cancelled():
+            root.after(0, update_load_more_button)
+            return
+
+        def append_page():
+            # Dropped if another search or page got there first
+            if index_search_state['keyword'] != keyword or index_search_state['offset'] != offset:
+                return
+            index_search_state['offset'] += len(page)
+            if not page:
+                index_search_state['total'] = index_search_state['offset']
+            results.extend(page)
+            show_results(results)
+            update_load_more_button()
+        root.after(0, append_page)
+    submit_search("Load more index hits", load_more_job)
+
+def reset_index_paging():
+    index_search_state.update(keyword=None, offset=0, total=0)
+    root.after(0, update_load_more_button)
+
+def update_load_more_button():
+    remaining = index_search_state['total'] - index_search_state['offset']
+    if index_search_state['keyword'] and remaining > 0:
+        load_more_button.config(state="normal", text=f"⬇ Load more ({remaining} remaining)")
+        status_var.set(f"Showing {index_search_state['offset']} of {index_search_state['total']} index hits")
+    else:
+        load_more_button.config(state="disabled", text="⬇ Load more")
+        if index_search_state['keyword']:
+            status_var.set(f"Showing all {index_search_state['offset']} index hits")
 
 def start_ai_search():
-    global search_cancelled
-    search_cancelled = False
     keyword = get_keyword_for_ai()
     if not keyword:
         root.after(0, lambda: messagebox.showwarning("Input Error", "Please enter a keyword."))
@@ -578,35 +820,35 @@ def start_ai_search():
         root.after(0, lambda: messagebox.showerror("AI Search Error", "AI search is not available. Please install dependencies:\npip install sentence-transformers chromadb torch"))
         return
     results.clear()
+    reset_index_paging()
     model_choice = ai_model_var.get()
     status_var.set("Performing AI search...")
     # Disable AI Search button while searching
     for child in search_buttons_frame.winfo_children():
         if isinstance(child, tk.Button) and getattr(child, 'cget', lambda x: None)('text') == '🤖 AI Search':
             child.configure(state='disabled')
-    def ai_search_thread():
-        global search_cancelled
+    def ai_search_job(job):
         ai_results = ai_search_dispatch(keyword, n_results=20, model_choice=model_choice)
         # Filter by selected roots
         selected_roots = get_selected_roots()
         def is_in_selected_roots(path):
-            import os
-            return any(os.path.abspath(path).startswith(os.path.abspath(root)) for root in selected_roots)
+            return any(root_paths.is_within(os.path.abspath(path), root) for root in selected_roots)
         filtered_results = []
         for r in ai_results:
-            if search_cancelled:
+            if job.is_cancelled():
                 break
             if is_in_selected_roots(r.get('file_path', '')):
                 filtered_results.append(r)
         # Convert AI results to standard format
+        ai_rows = []
         for result in filtered_results:
-            if search_cancelled:
+            if job.is_cancelled():
                 break
             content = result.get('content', '')
             content = content[:200] + "..." if len(content) > 200 else content
             if result.get('summary'):
                 content = f"📝 Summary: {result['summary']}\n\n📄 Content: {content}"
-            results.append({
+            ai_rows.append({
                 "File Path": result.get('file_path', ''),
                 "File Type": result.get('file_type', ''),
                 "Location": f"🤖 AI Match (Score: {result.get('similarity_score', 0):.2f})",
@@ -614,9 +856,9 @@ def start_ai_search():
             })
         # Re-enable AI Search button
         root.after(0, lambda: [child.configure(state='normal') for child in search_buttons_frame.winfo_children() if isinstance(child, tk.Button) and getattr(child, 'cget', lambda x: None)('text') == '🤖 AI Search'])
-        if not search_cancelled:
-            root.after(0, lambda: [show_results(results), status_var.set("Ready")])
-    threading.Thread(target=ai_search_thread, daemon=True).start()
+        if not job.is_cancelled():
+            root.after(0, lambda: [results.extend(ai_rows), show_results(results), status_var.set("Ready")])
+    submit_search("AI search", ai_search_job)
 
 def build_ai_index():
     """Build AI search index from current indexed files"""
@@ -625,10 +867,8 @@ def build_ai_index():
         return
     
     # Get all indexed files
-    conn = sqlite3.connect(INDEX_DB, timeout=30)
-    c = conn.cursor()
-    c.execute('SELECT file_path, file_type, content FROM file_index')
-    files = c.fetchall()
+    conn = connect_index(INDEX_DB)
+    files = list(index_db.iter_file_contents(conn))
     conn.close()
     
     if not files:
@@ -723,65 +963,9 @@ def open_folder_location(file_path):
 
 def clear_results():
     tree.delete(*tree.get_children())
-
-# === App Window Layout ===
-results = []
-
-root = tk.Tk()
-root.title("🔍 SearchAuto - Universal File Content Search")
-root.configure(bg="#f5f5f5")  # Light gray background
-root.minsize(1200, 700)  # Ensure both panels are visible
-root.geometry("1400x800")  # Force initial window width for both panels
-
-# Status bar
-status_var = tk.StringVar(value="Ready")
-status_bar = tk.Label(root, textvariable=status_var, bd=1, relief=tk.SUNKEN, anchor="w", font=("Arial", 9), bg="#eeeeee")
-status_bar.grid(row=99, column=0, columnspan=2, sticky="ew")
-
-# Update layout for sidebar: Index Management on right, full height; search/results on left
-
-# Index Management panel (right, now only at the top right)
-index_frame = tk.LabelFrame(root, text="⚙️ Index Management", font=("Arial", 11, "bold"), fg="navy", relief="groove", bd=2)
-index_frame.grid(row=0, column=1, padx=10, pady=5, sticky="new")  # Only row=0, not rowspan=3
-
-# Remove previous ai_summary_frame placement
-# ai_summary_frame = tk.LabelFrame(root, text="AI Summary", font=("Arial", 11, "bold"), fg="#9C27B0", relief="groove", bd=2)
-# ai_summary_frame.grid(row=1, column=1, padx=10, pady=(0,5), sticky="new")
-
-# 1. Harmonize Index Management color scheme
-# After creating the three sections, set their color scheme
-
-
-# Roots Management (top left)
-roots_frame = tk.LabelFrame(root, text="📁 Indexed Roots", font=("Arial", 11, "bold"), fg="navy", relief="groove", bd=2)
-roots_frame.grid(row=0, column=0, padx=10, pady=8, sticky="ew")
-
-# Search controls (middle left)
-search_frame = tk.LabelFrame(root, text="🔍 Search", font=("Arial", 11, "bold"), fg="navy", relief="groove", bd=2)
-search_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
-
-# Search Results (bottom left)
-results_frame = tk.LabelFrame(root, text="Search Results", font=("Arial", 12, "bold"), fg="navy", relief="groove", bd=2)
-results_frame.grid(row=2, column=0, padx=10, pady=10, sticky="nsew")
-
-# AI Summary Frame (right of results, same row)
-ai_summary_frame = tk.LabelFrame(root, text="AI Summary", font=("Arial", 11, "bold"), fg="#9C27B0", relief="groove", bd=2)
-ai_summary_frame.grid(row=2, column=1, padx=10, pady=10, sticky="nsew")
-
-# Grid configuration
-# --- Main window grid configuration ---
-root.grid_columnconfigure(0, weight=4)  # Left/main area even wider
-root.grid_columnconfigure(1, weight=1, minsize=260)  # Right panel even narrower
-root.grid_rowconfigure(2, weight=1)  # Results/summary area expands
-
-# Add bundle_by_file variable if not already present
-bundle_by_file = tk.BooleanVar(value=True)
-
-# Add the bundle checkbox above the results table
-bundle_checkbox = tk.Checkbutton(results_frame, text="Bundle by file (show only best match per file)", variable=bundle_by_file, command=lambda: show_results(results), bg="#f5f5f5")
-bundle_checkbox.pack(anchor="w", padx=5, pady=(5, 0))
-
-# Place these function definitions before embedding_section and its buttons
+    item_full_content.clear()
+    shown_files.clear()
+    reset_index_paging()
 
 def build_openai_embeddings_thread():
     """Threaded function to build OpenAI embeddings"""
@@ -794,7 +978,7 @@ def build_openai_embeddings_thread():
                 root.after(0, lambda: messagebox.showerror("OpenAI Embeddings", "Failed to build OpenAI embeddings. Check API key and indexed files."))
         except Exception as e:
             root.after(0, lambda: messagebox.showerror("OpenAI Embeddings", f"Error: {e}"))
-    
+
     threading.Thread(target=build_thread, daemon=True).start()
 
 def build_cohere_embeddings_thread():
@@ -808,123 +992,35 @@ def build_cohere_embeddings_thread():
                 root.after(0, lambda: messagebox.showerror("Cohere Embeddings", "Failed to build Cohere embeddings. Check API key and indexed files."))
         except Exception as e:
             root.after(0, lambda: messagebox.showerror("Cohere Embeddings", f"Error: {e}"))
-    
+
     threading.Thread(target=build_thread, daemon=True).start()
 
-# Roots Management Frame (top, full width)
-roots_content_frame = tk.Frame(roots_frame)
-roots_content_frame.pack(fill="x", expand=True, padx=5, pady=5)
-
-# Listbox on the left
-roots_listbox = tk.Listbox(roots_content_frame, width=80, height=8, selectmode=tk.MULTIPLE, font=("Arial", 9), relief="flat", bd=1)
-roots_listbox.pack(side="left", fill="x", expand=True, padx=(0,5))
-
-# Arrow buttons frame in the middle
-roots_arrow_frame = tk.Frame(roots_content_frame)
-roots_arrow_frame.pack(side="left", fill="y", padx=5)
-tk.Button(roots_arrow_frame, text="▲", command=move_root_up, bg="#2196F3", fg="white", font=("Arial", 12, "bold"), 
-          relief="flat", bd=0, width=3, height=1).pack(pady=2)
-tk.Button(roots_arrow_frame, text="▼", command=move_root_down, bg="#2196F3", fg="white", font=("Arial", 12, "bold"), 
-          relief="flat", bd=0, width=3, height=1).pack(pady=2)
-
-# Action buttons frame on the right
-roots_btn_frame = tk.Frame(roots_content_frame)
-roots_btn_frame.pack(side="right", fill="y")
-tk.Button(roots_btn_frame, text="➕ Add Root", command=add_root_gui, bg="#4CAF50", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(fill="x", pady=2, padx=2)
-tk.Button(roots_btn_frame, text="➖ Remove Root", command=remove_root_gui, bg="#f44336", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(fill="x", pady=2, padx=2)
-
-update_roots_listbox()
-
-# Search Controls Frame (left, below roots)
-search_inner = tk.Frame(search_frame)
-search_inner.pack(fill="x", expand=True, padx=5, pady=5)
-keyword_label = tk.Label(search_inner, text="Keyword:", font=("Arial", 10, "bold"))
-keyword_label.pack(side="left", padx=5)
-# Replace keyword_entry with a multi-line Text widget
-keyword_text = tk.Text(search_inner, width=50, height=4, font=("Arial", 10), relief="flat", bd=1, wrap="word")
-keyword_text.pack(side="left", padx=5)
-
-# Search buttons frame
-search_buttons_frame = tk.Frame(search_inner)
-search_buttons_frame.pack(side="left", padx=5)
-
-# Add AI model selection combobox
-ai_model_var = tk.StringVar(value="local")
-ai_model_options = ["local", "openai", "cohere"]
-tk.Label(search_inner, text="AI Model:", font=("Arial", 9)).pack(side="left", padx=5)
-ai_model_menu = ttk.Combobox(search_inner, textvariable=ai_model_var, values=ai_model_options, state="readonly", width=10)
-ai_model_menu.pack(side="left", padx=2)
-
-tk.Button(search_buttons_frame, text="🔍 Live Search", command=start_live_search_thread, bg="#2196F3", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(side="left", padx=2)
-tk.Button(search_buttons_frame, text="⚡ Index Search", command=start_index_search, bg="#FF9800", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(side="left", padx=2)
-tk.Button(search_buttons_frame, text="🤖 AI Search", command=start_ai_search, bg="#9C27B0", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(side="left", padx=2)
-tk.Button(search_buttons_frame, text="🗑️ Clear", command=clear_results, bg="#9E9E9E", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(side="left", padx=2)
-tk.Button(search_buttons_frame, text="❌ Cancel", command=cancel_search, bg="#E53935", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(side="left", padx=2)
-
-
-# After defining index_frame, add the three grouped sections
-
-# Regular Index Section
-regular_index_section = tk.LabelFrame(index_frame, text="Regular Index", font=("Arial", 9, "bold"))
-regular_index_section.pack(fill="x", pady=(0, 5), padx=5)
-tk.Button(regular_index_section, text="🔄 Rebuild", command=build_index_all_thread, width=16).pack(side="left", padx=2, pady=2)
-tk.Button(regular_index_section, text="🔄 Update", command=update_index_all_thread, width=16).pack(side="left", padx=2, pady=2)
-
-# AI Index Section
-ai_index_section = tk.LabelFrame(index_frame, text="AI Index", font=("Arial", 9, "bold"))
-ai_index_section.pack(fill="x", pady=(0, 5), padx=5)
-tk.Button(ai_index_section, text="🤖 Build AI", command=build_ai_index, width=16).pack(side="left", padx=2, pady=2)
-tk.Button(ai_index_section, text="🗑️ Clear AI", command=clear_ai_index_gui, width=16).pack(side="left", padx=2, pady=2)
-
-# External Embeddings Section
-embedding_section = tk.LabelFrame(index_frame, text="External Embeddings", font=("Arial", 9, "bold"))
-embedding_section.pack(fill="x", pady=(0, 5), padx=5)
-tk.Button(embedding_section, text="🔗 Build OpenAI Embeddings", command=build_openai_embeddings_thread, width=24).pack(fill="x", padx=2, pady=2)
-tk.Button(embedding_section, text="🔗 Build Cohere Embeddings", command=build_cohere_embeddings_thread, width=24).pack(fill="x", padx=2, pady=2)
-
-# After creating the three sections and their buttons, set their color scheme
-index_frame.config(bg="#f5f5f5")
-for section in [regular_index_section, ai_index_section, embedding_section]:
-    section.config(bg="#f5f5f5")
-    for child in section.winfo_children():
-        if isinstance(child, tk.Button):
-            child.config(bg="#2196F3", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0)
-
-# Define the StringVar before creating the label
-ai_summary_var = tk.StringVar()
-# AI Summary Label
-ai_summary_label = tk.Label(ai_summary_frame, textvariable=ai_summary_var, font=("Arial", 9), fg="#9C27B0", bg="#f5f5f5", anchor="w", justify="left", wraplength=250, relief="groove", bd=1)
-ai_summary_label.pack(fill="x", padx=5, pady=5)
-
-# Results Frame with Treeview for locked headers
-columns = ("File Type", "File Path", "Location", "Content")
-results_tree_font = ("Arial Unicode MS", 10)
-
-# Create a sub-frame for the Treeview and scrollbars
-# Remove previous tree.pack and scrollbar.pack calls
-
-tree_frame = tk.Frame(results_frame)
-tree_frame.pack(fill="both", expand=True)
-
-tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=20)
-for col in columns:
-    tree.heading(col, text=col)
-    tree.column(col, anchor="w", width=200 if col != "Content" else 1000, stretch=False)
-style = ttk.Style()
-style.configure("Treeview", font=results_tree_font)
-
-tree.grid(row=0, column=0, sticky="nsw")
-
-# Add vertical and horizontal scrollbars
-scrollbar_y = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
-scrollbar_x = ttk.Scrollbar(tree_frame, orient="horizontal", command=tree.xview)
-tree.configure(yscrollcommand=scrollbar_y.set, xscrollcommand=scrollbar_x.set)
-scrollbar_y.grid(row=0, column=1, sticky="ns")
-scrollbar_x.grid(row=1, column=0, sticky="ew")
-
-# Configure grid weights for proper resizing
-tree_frame.grid_rowconfigure(0, weight=1)
-tree_frame.grid_columnconfigure(0, weight=1)
+def job_state(job):
+    if job.state == jobs.RUNNING:
+        return "cancelling" if job.is_cancelled() else f"running {job.elapsed():.0f} s"
+    if job.state == jobs.QUEUED:
+        return "queued"
+    return f"{job.state} {job.elapsed():.0f} s" if job.started else job.state
+
+def refresh_job_queue():
+    selected = jobs_tree.selection()
+    jobs_tree.delete(*jobs_tree.get_children())
+    for job in scheduler.jobs():
+        jobs_tree.insert("", "end", iid=str(job.id),
+                         values=(job.name, jobs.PRIORITY_NAMES[job.priority], job_state(job)))
+    jobs_tree.selection_set([iid for iid in selected if jobs_tree.exists(iid)])
+
+def tick_job_queue():
+    # Running times move on between changes
+    if scheduler.active():
+        refresh_job_queue()
+    root.after(1000, tick_job_queue)
+
+def cancel_selected_job():
+    ids = {int(iid) for iid in jobs_tree.selection()}
+    for job in scheduler.active():
+        if job.id in ids:
+            job.cancel()
 
 # Double-click to open file or folder
 def on_tree_double_click(event):
@@ -936,9 +1032,6 @@ def on_tree_double_click(event):
             open_file(file_path)
         elif col == "#3":  # Location column
             open_folder_location(file_path)
-tree.bind("<Double-1>", on_tree_double_click)
-
-# Update show_results to truncate and clean content, and store full content for tooltip
 
 def clean_and_truncate_content(content, maxlen=200):
     if not isinstance(content, str):
@@ -948,8 +1041,21 @@ def clean_and_truncate_content(content, maxlen=200):
         return content[:maxlen] + '...'
     return content
 
-# Store mapping from tree item to full content for tooltip
-item_full_content = {}
+def insert_result(res):
+    file_path = res.get('File Path', '')
+    file_name = os.path.basename(file_path)
+    content = res.get('Content', '')
+    short_content = clean_and_truncate_content(content)
+    item_id = tree.insert("", "end", values=(res.get('File Type', ''), file_name, res.get('Location', ''), short_content), tags=(file_path,))
+    item_full_content[item_id] = content
+    shown_files.add(file_path)
+
+def append_results(batch):
+    """Add a batch of live search matches below the rows already shown"""
+    for res in batch:
+        if bundle_by_file.get() and res.get('File Path', '') in shown_files:
+            continue
+        insert_result(res)
 
 def show_results(results):
     tree.delete(*tree.get_children())
@@ -969,13 +1075,9 @@ def show_results(results):
                     file_best[file_path] = (res, score)
         display_results = [v[0] for v in file_best.values()]
     item_full_content.clear()
+    shown_files.clear()
     for res in display_results:
-        file_path = res.get('File Path', '')
-        file_name = os.path.basename(file_path)
-        content = res.get('Content', '')
-        short_content = clean_and_truncate_content(content)
-        item_id = tree.insert("", "end", values=(res.get('File Type', ''), file_name, res.get('Location', ''), short_content), tags=(file_path,))
-        item_full_content[item_id] = content
+        insert_result(res)
     # AI summary logic remains unchanged
     is_ai_results = any('AI Match' in res.get('Location', '') or 'Score:' in res.get('Location', '') for res in display_results)
     if is_ai_results and AI_AVAILABLE and len(display_results) > 1:
@@ -999,8 +1101,6 @@ def show_results(results):
         ai_summary_var.set("")
     status_var.set("Ready")
 
-# Tooltip for full content on hover
-tree_tooltip = ToolTip(tree)
 def on_tree_motion(event):
     region = tree.identify("region", event.x, event.y)
     if region == "cell":
@@ -1020,8 +1120,6 @@ def on_tree_motion(event):
             tree_tooltip.hidetip()
     else:
         tree_tooltip.hidetip()
-tree.bind("<Motion>", on_tree_motion)
-tree.bind("<Leave>", lambda e: tree_tooltip.hidetip())
 
 # === Threaded Embedding Build Functions ===
 # === Embedding Build Functions ===
@@ -1033,10 +1131,8 @@ def build_openai_embeddings():
         return False
     client = OpenAI(api_key=api_key)
     # Get all indexed files
-    conn = sqlite3.connect(INDEX_DB, timeout=30)
-    c = conn.cursor()
-    c.execute('SELECT file_path, file_type, content FROM file_index')
-    files = c.fetchall()
+    conn = connect_index(INDEX_DB)
+    files = list(index_db.iter_file_contents(conn))
     conn.close()
     if not files:
         print("[No files found in index]")
@@ -1065,10 +1161,8 @@ def build_cohere_embeddings():
         return False
     co = cohere.Client(api_key)
     # Get all indexed files
-    conn = sqlite3.connect(INDEX_DB, timeout=30)
-    c = conn.cursor()
-    c.execute('SELECT file_path, file_type, content FROM file_index')
-    files = c.fetchall()
+    conn = connect_index(INDEX_DB)
+    files = list(index_db.iter_file_contents(conn))
     conn.close()
     if not files:
         print("[No files found in index]")
@@ -1179,14 +1273,12 @@ def openai_ai_search(keyword, n_results):
         scored.append((file_path, sim))
     scored.sort(key=lambda x: x[1], reverse=True)
     # Get file info for top-N
-    conn = sqlite3.connect(INDEX_DB, timeout=30)
-    c = conn.cursor()
+    conn = connect_index(INDEX_DB)
     results = []
     for file_path, sim in scored[:n_results]:
-        c.execute('SELECT file_type, content FROM file_index WHERE file_path=?', (file_path,))
-        row = c.fetchone()
+        row = next(index_db.iter_file_contents(conn, file_path), None)
         if row:
-            file_type, content = row
+            _, file_type, content = row
             results.append({
                 'file_path': file_path,
                 'file_type': file_type,
@@ -1223,14 +1315,12 @@ def cohere_ai_search(keyword, n_results):
         scored.append((file_path, sim))
     scored.sort(key=lambda x: x[1], reverse=True)
     # Get file info for top-N
-    conn = sqlite3.connect(INDEX_DB, timeout=30)
-    c = conn.cursor()
+    conn = connect_index(INDEX_DB)
     results = []
     for file_path, sim in scored[:n_results]:
-        c.execute('SELECT file_type, content FROM file_index WHERE file_path=?', (file_path,))
-        row = c.fetchone()
+        row = next(index_db.iter_file_contents(conn, file_path), None)
         if row:
-            file_type, content = row
+            _, file_type, content = row
             results.append({
                 'file_path': file_path,
                 'file_type': file_type,
@@ -1245,7 +1335,236 @@ def get_keyword_for_classic():
     text = keyword_text.get("1.0", "end").strip()
     return text.split("\n", 1)[0] if text else ""
 
+def get_keywords_for_classic():
+    """Every non-empty line of the keyword box, for a multi-keyword live search"""
+    lines = (line.strip() for line in keyword_text.get("1.0", "end").splitlines())
+    return list(dict.fromkeys(line for line in lines if line))
+
 def get_keyword_for_ai():
     return keyword_text.get("1.0", "end").strip()
 
-root.mainloop()
\ No newline at end of file
+# === App Window Layout ===
+# Only build the GUI when run as a script: the indexing worker processes
+# re-import this module on Windows and must not open a window.
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+    results = []
+    # Paging state for the current index search
+    index_search_state = {'keyword': None, 'offset': 0, 'total': 0}
+
+    root = tk.Tk()
+    root.title("🔍 SearchAuto - Universal File Content Search")
+    root.configure(bg="#f5f5f5")  # Light gray background
+    root.minsize(1200, 700)  # Ensure both panels are visible
+    root.geometry("1400x800")  # Force initial window width for both panels
+
+    # Status bar
+    status_var = tk.StringVar(value="Ready")
+    status_bar = tk.Label(root, textvariable=status_var, bd=1, relief=tk.SUNKEN, anchor="w", font=("Arial", 9), bg="#eeeeee")
+    status_bar.grid(row=99, column=0, columnspan=2, sticky="ew")
+
+    # Update layout for sidebar: Index Management on right, full height; search/results on left
+
+    # Index Management panel (right, now only at the top right)
+    index_frame = tk.LabelFrame(root, text="⚙️ Index Management", font=("Arial", 11, "bold"), fg="navy", relief="groove", bd=2)
+    index_frame.grid(row=0, column=1, padx=10, pady=5, sticky="new")  # Only row=0, not rowspan=3
+
+    # Remove previous ai_summary_frame placement
+    # ai_summary_frame = tk.LabelFrame(root, text="AI Summary", font=("Arial", 11, "bold"), fg="#9C27B0", relief="groove", bd=2)
+    # ai_summary_frame.grid(row=1, column=1, padx=10, pady=(0,5), sticky="new")
+
+    # 1. Harmonize Index Management color scheme
+    # After creating the three sections, set their color scheme
+
+
+    # Roots Management (top left)
+    roots_frame = tk.LabelFrame(root, text="📁 Indexed Roots", font=("Arial", 11, "bold"), fg="navy", relief="groove", bd=2)
+    roots_frame.grid(row=0, column=0, padx=10, pady=8, sticky="ew")
+
+    # Search controls (middle left)
+    search_frame = tk.LabelFrame(root, text="🔍 Search", font=("Arial", 11, "bold"), fg="navy", relief="groove", bd=2)
+    search_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
+
+    # Search Results (bottom left)
+    results_frame = tk.LabelFrame(root, text="Search Results", font=("Arial", 12, "bold"), fg="navy", relief="groove", bd=2)
+    results_frame.grid(row=2, column=0, padx=10, pady=10, sticky="nsew")
+
+    # AI Summary Frame (right of results, same row)
+    ai_summary_frame = tk.LabelFrame(root, text="AI Summary", font=("Arial", 11, "bold"), fg="#9C27B0", relief="groove", bd=2)
+    ai_summary_frame.grid(row=2, column=1, padx=10, pady=10, sticky="nsew")
+
+    # Grid configuration
+    # --- Main window grid configuration ---
+    root.grid_columnconfigure(0, weight=4)  # Left/main area even wider
+    root.grid_columnconfigure(1, weight=1, minsize=260)  # Right panel even narrower
+    root.grid_rowconfigure(2, weight=1)  # Results/summary area expands
+
+    # Add bundle_by_file variable if not already present
+    bundle_by_file = tk.BooleanVar(value=True)
+
+    # Add the bundle checkbox above the results table
+    bundle_checkbox = tk.Checkbutton(results_frame, text="Bundle by file (show only best match per file)", variable=bundle_by_file, command=lambda: show_results(results), bg="#f5f5f5")
+    bundle_checkbox.pack(anchor="w", padx=5, pady=(5, 0))
+
+
+
+    # Roots Management Frame (top, full width)
+    roots_content_frame = tk.Frame(roots_frame)
+    roots_content_frame.pack(fill="x", expand=True, padx=5, pady=5)
+
+    # Listbox on the left
+    roots_listbox = tk.Listbox(roots_content_frame, width=80, height=8, selectmode=tk.MULTIPLE, font=("Arial", 9), relief="flat", bd=1)
+    roots_listbox.pack(side="left", fill="x", expand=True, padx=(0,5))
+
+    # Arrow buttons frame in the middle
+    roots_arrow_frame = tk.Frame(roots_content_frame)
+    roots_arrow_frame.pack(side="left", fill="y", padx=5)
+    tk.Button(roots_arrow_frame, text="▲", command=move_root_up, bg="#2196F3", fg="white", font=("Arial", 12, "bold"), 
+              relief="flat", bd=0, width=3, height=1).pack(pady=2)
+    tk.Button(roots_arrow_frame, text="▼", command=move_root_down, bg="#2196F3", fg="white", font=("Arial", 12, "bold"), 
+              relief="flat", bd=0, width=3, height=1).pack(pady=2)
+
+    # Action buttons frame on the right
+    roots_btn_frame = tk.Frame(roots_content_frame)
+    roots_btn_frame.pack(side="right", fill="y")
+    tk.Button(roots_btn_frame, text="➕ Add Root", command=add_root_gui, bg="#4CAF50", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(fill="x", pady=2, padx=2)
+    tk.Button(roots_btn_frame, text="➖ Remove Root", command=remove_root_gui, bg="#f44336", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(fill="x", pady=2, padx=2)
+    tk.Button(roots_btn_frame, text="🚫 Ignore Rules", command=explain_ignore_rules_gui, bg="#607D8B", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(fill="x", pady=2, padx=2)
+
+    update_roots_listbox()
+
+    # Search Controls Frame (left, below roots)
+    search_inner = tk.Frame(search_frame)
+    search_inner.pack(fill="x", expand=True, padx=5, pady=5)
+    keyword_label = tk.Label(search_inner, text="Keyword:", font=("Arial", 10, "bold"))
+    keyword_label.pack(side="left", padx=5)
+    # Replace keyword_entry with a multi-line Text widget
+    keyword_text = tk.Text(search_inner, width=50, height=4, font=("Arial", 10), relief="flat", bd=1, wrap="word")
+    keyword_text.pack(side="left", padx=5)
+
+    # Search buttons frame
+    search_buttons_frame = tk.Frame(search_inner)
+    search_buttons_frame.pack(side="left", padx=5)
+
+    # Add AI model selection combobox
+    ai_model_var = tk.StringVar(value="local")
+    ai_model_options = ["local", "openai", "cohere"]
+    tk.Label(search_inner, text="AI Model:", font=("Arial", 9)).pack(side="left", padx=5)
+    ai_model_menu = ttk.Combobox(search_inner, textvariable=ai_model_var, values=ai_model_options, state="readonly", width=10)
+    ai_model_menu.pack(side="left", padx=2)
+
+    tk.Button(search_buttons_frame, text="🔍 Live Search", command=start_live_search_thread, bg="#2196F3", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(side="left", padx=2)
+    # Live search only opens files the index cannot rule out
+    use_index_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(search_buttons_frame, text="Use index", variable=use_index_var).pack(side="left", padx=2)
+    tk.Button(search_buttons_frame, text="⚡ Index Search", command=start_index_search, bg="#FF9800", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(side="left", padx=2)
+    tk.Button(search_buttons_frame, text="🤖 AI Search", command=start_ai_search, bg="#9C27B0", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(side="left", padx=2)
+    tk.Button(search_buttons_frame, text="🗑️ Clear", command=clear_results, bg="#9E9E9E", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(side="left", padx=2)
+    tk.Button(search_buttons_frame, text="❌ Cancel", command=cancel_search, bg="#E53935", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0).pack(side="left", padx=2)
+
+
+    # After defining index_frame, add the three grouped sections
+
+    # Regular Index Section
+    regular_index_section = tk.LabelFrame(index_frame, text="Regular Index", font=("Arial", 9, "bold"))
+    regular_index_section.pack(fill="x", pady=(0, 5), padx=5)
+    tk.Button(regular_index_section, text="🔄 Rebuild", command=build_index_all_thread, width=16).pack(side="left", padx=2, pady=2)
+    tk.Button(regular_index_section, text="🔄 Update", command=update_index_all_thread, width=16).pack(side="left", padx=2, pady=2)
+    cjk_index_var = tk.BooleanVar(value=get_index_tokenizer() == 'trigram')
+    tk.Checkbutton(regular_index_section, text="CJK mode", variable=cjk_index_var, command=toggle_cjk_index, bg="#f5f5f5").pack(side="left", padx=2, pady=2)
+
+    # AI Index Section
+    ai_index_section = tk.LabelFrame(index_frame, text="AI Index", font=("Arial", 9, "bold"))
+    ai_index_section.pack(fill="x", pady=(0, 5), padx=5)
+    tk.Button(ai_index_section, text="🤖 Build AI", command=build_ai_index, width=16).pack(side="left", padx=2, pady=2)
+    tk.Button(ai_index_section, text="🗑️ Clear AI", command=clear_ai_index_gui, width=16).pack(side="left", padx=2, pady=2)
+
+    # External Embeddings Section
+    embedding_section = tk.LabelFrame(index_frame, text="External Embeddings", font=("Arial", 9, "bold"))
+    embedding_section.pack(fill="x", pady=(0, 5), padx=5)
+    tk.Button(embedding_section, text="🔗 Build OpenAI Embeddings", command=build_openai_embeddings_thread, width=24).pack(fill="x", padx=2, pady=2)
+    tk.Button(embedding_section, text="🔗 Build Cohere Embeddings", command=build_cohere_embeddings_thread, width=24).pack(fill="x", padx=2, pady=2)
+
+    # After creating the three sections and their buttons, set their color scheme
+    index_frame.config(bg="#f5f5f5")
+    for section in [regular_index_section, ai_index_section, embedding_section]:
+        section.config(bg="#f5f5f5")
+        for child in section.winfo_children():
+            if isinstance(child, tk.Button):
+                child.config(bg="#2196F3", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0)
+
+    # Job queue (right of the search controls): running, queued and recent jobs
+    jobs_frame = tk.LabelFrame(root, text="📋 Jobs", font=("Arial", 11, "bold"), fg="navy", relief="groove", bd=2, bg="#f5f5f5")
+    jobs_frame.grid(row=1, column=1, padx=10, pady=5, sticky="nsew")
+    jobs_tree = ttk.Treeview(jobs_frame, columns=("Job", "Priority", "State"), show="headings", height=4)
+    for col, width in (("Job", 140), ("Priority", 70), ("State", 80)):
+        jobs_tree.heading(col, text=col)
+        jobs_tree.column(col, anchor="w", width=width, stretch=col == "Job")
+    jobs_tree.pack(fill="both", expand=True, padx=5, pady=(5, 0))
+
+
+    tk.Button(jobs_frame, text="❌ Cancel job", command=cancel_selected_job, bg="#E53935", fg="white",
+              font=("Arial", 9, "bold"), relief="flat", bd=0).pack(anchor="e", padx=5, pady=5)
+    scheduler.on_change = lambda: root.after(0, refresh_job_queue)
+    tick_job_queue()
+    root.after(UPDATE_INTERVAL * 60 * 1000, update_index_periodically)
+
+    # Define the StringVar before creating the label
+    ai_summary_var = tk.StringVar()
+    # AI Summary Label
+    ai_summary_label = tk.Label(ai_summary_frame, textvariable=ai_summary_var, font=("Arial", 9), fg="#9C27B0", bg="#f5f5f5", anchor="w", justify="left", wraplength=250, relief="groove", bd=1)
+    ai_summary_label.pack(fill="x", padx=5, pady=5)
+
+    # Results Frame with Treeview for locked headers
+    columns = ("File Type", "File Path", "Location", "Content")
+    results_tree_font = ("Arial Unicode MS", 10)
+
+    # Create a sub-frame for the Treeview and scrollbars
+    # Remove previous tree.pack and scrollbar.pack calls
+
+    # "Load more" fetches the next page of index search hits
+    load_more_button = tk.Button(results_frame, text="⬇ Load more", command=load_more_index_results, state="disabled",
+                                 bg="#FF9800", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0)
+    load_more_button.pack(side="bottom", anchor="e", padx=5, pady=(0, 5))
+
+    tree_frame = tk.Frame(results_frame)
+    tree_frame.pack(fill="both", expand=True)
+
+    tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=20)
+    for col in columns:
+        tree.heading(col, text=col)
+        tree.column(col, anchor="w", width=200 if col != "Content" else 1000, stretch=False)
+    style = ttk.Style()
+    style.configure("Treeview", font=results_tree_font)
+
+    tree.grid(row=0, column=0, sticky="nsw")
+
+    # Add vertical and horizontal scrollbars
+    scrollbar_y = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+    scrollbar_x = ttk.Scrollbar(tree_frame, orient="horizontal", command=tree.xview)
+    tree.configure(yscrollcommand=scrollbar_y.set, xscrollcommand=scrollbar_x.set)
+    scrollbar_y.grid(row=0, column=1, sticky="ns")
+    scrollbar_x.grid(row=1, column=0, sticky="ew")
+
+    # Configure grid weights for proper resizing
+    tree_frame.grid_rowconfigure(0, weight=1)
+    tree_frame.grid_columnconfigure(0, weight=1)
+
+    tree.bind("<Double-1>", on_tree_double_click)
+
+
+
+    # Store mapping from tree item to full content for tooltip
+    item_full_content = {}
+    # Files with a row in the table, so streamed batches keep one match per file when bundling
+    shown_files = set()
+
+
+    # Tooltip for full content on hover
+    tree_tooltip = ToolTip(tree)
+    tree.bind("<Motion>", on_tree_motion)
+    tree.bind("<Leave>", lambda e: tree_tooltip.hidetip())
+
+
+    root.mainloop()
\ No newline at end of file
@@ -26,10 +26,10 @@ def test_chinese_search():
             
             if has_non_latin:
                 # Use LIKE search for non-Latin characters
-                c.execute("SELECT file_path, file_type, content, root_path FROM file_index WHERE content LIKE ?", (f'%{keyword}%',))
+                c.execute("SELECT f.file_path, f.file_type, file_index.content, f.root_path FROM file_index JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id WHERE file_index.content LIKE ?", (f'%{keyword}%',))
             else:
                 # Use FTS5 search for Latin characters
-                c.execute("SELECT file_path, file_type, snippet(file_index, 3, '[', ']', '...', 20), root_path FROM file_index WHERE content MATCH ?", (keyword,))
+                c.execute("SELECT f.file_path, f.file_type, snippet(file_index, 0, '[', ']', '...', 20), f.root_path FROM file_index JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id WHERE file_index MATCH ?", (keyword,))
             
             results = c.fetchall()
             print(f"  Results found: {len(results)}")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared scandir-based directory walker
+"""
+
+import os
+import tempfile
+import time
+
+from dir_walker import DirWalker
+
+def create_tree(folder):
+    """docs/a/x.txt, docs/a/deep/y.md, docs/b/z.txt, docs/b/skip.png, docs/top.txt"""
+    for rel in ("a/x.txt", "a/deep/y.md", "b/z.txt", "b/skip.png", "top.txt"):
+        path = os.path.join(folder, *rel.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(rel)
+
+def age_tree(folder, seconds=60):
+    """Move every mtime into the past so saved listings are trusted"""
+    past = time.time() - seconds
+    for root, dirs, files in os.walk(folder, topdown=False):
+        for name in files + dirs:
+            os.utime(os.path.join(root, name), (past, past))
+    os.utime(folder, (past, past))
+
+def test_walk_order_and_filter():
+    """Directories come back in sorted top-down order with size/mtime"""
+    print("🧪 Testing walk order and file filter...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_tree(docs)
+        walker = DirWalker(file_filter=lambda name: not name.endswith('.png'), threads=4)
+        walked = [(os.path.relpath(root, docs), [f[0] for f in files]) for root, dirs, files in walker.walk(docs)]
+        assert walked == [('.', ['top.txt']), ('a', ['x.txt']), (os.path.join('a', 'deep'), ['y.md']), ('b', ['z.txt'])]
+
+        root, dirs, files = next(DirWalker().walk(docs))
+        assert dirs == ['a', 'b']
+        name, size, mtime = files[0]
+        assert size == os.path.getsize(os.path.join(docs, name))
+        assert mtime == os.path.getmtime(os.path.join(docs, name))
+        print("✓ Sorted top-down walk with cached stat results")
+
+def test_walk_prune_dirnames():
+    """Removing a name from dirnames skips that subtree"""
+    print("🧪 Testing subtree pruning...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_tree(docs)
+        visited = []
+        for root, dirs, files in DirWalker().walk(docs):
+            visited.append(os.path.relpath(root, docs))
+            if 'a' in dirs:
+                dirs.remove('a')
+        assert visited == ['.', 'b']
+        print("✓ Pruned subtree was not listed")
+
+def test_walk_reuses_unchanged_dirs():
+    """Incremental passes reuse the listing of directories whose mtime did not change"""
+    print("🧪 Testing directory-mtime pruning...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        state = os.path.join(temp_dir, "walk_state.db")
+        create_tree(docs)
+        age_tree(docs)
+
+        first = DirWalker(state)
+        list(first.walk(docs))
+        assert first.dirs_scanned == 4
+
+        # A new file changes its directory's mtime; the other directories are reused
+        with open(os.path.join(docs, "b", "new.txt"), 'w') as f:
+            f.write("new")
+        second = DirWalker(state)
+        files = {name for root, dirs, entries in second.walk(docs, prune_unchanged=True) for name, size, mtime in entries}
+        assert 'new.txt' in files and 'x.txt' in files
+        assert second.dirs_scanned == 1
+        assert second.dirs_reused == 3
+
+        # A full pass lists everything again
+        third = DirWalker(state)
+        list(third.walk(docs))
+        assert third.dirs_scanned == 4
+
+        first.forget(docs)
+        fourth = DirWalker(state)
+        list(fourth.walk(docs, prune_unchanged=True))
+        assert fourth.dirs_reused == 0
+        print("✓ Unchanged directories skipped, changed directory rescanned")
+
+if __name__ == "__main__":
+    print("=== Directory Walker Test Suite ===\n")
+    test_walk_order_and_filter()
+    test_walk_prune_dirnames()
+    test_walk_reuses_unchanged_dirs()
+    print("\n✅ Directory walker tests passed!")
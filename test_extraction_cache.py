@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent extraction cache
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+import extraction_cache
+from extraction_cache import ExtractionCache, hash_file
+
+class CountingExtractor:
+    """Reads a text file and counts how often it was actually called"""
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().split('\n')
+
+def write(path, text, mtime=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+def test_cache_hit_and_invalidation():
+    """Unchanged files hit the cache, edited files are extracted again"""
+    print("🧪 Testing cache hits and invalidation...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ExtractionCache(os.path.join(temp_dir, "cache"), max_bytes=10 * 1024 * 1024)
+        doc = os.path.join(temp_dir, "doc.txt")
+        write(doc, "first line\n第二行", mtime=1000)
+        extractor = CountingExtractor()
+
+        assert cache.get(doc, 'lines', extractor) == ["first line", "第二行"]
+        assert cache.get(doc, 'lines', extractor) == ["first line", "第二行"]
+        assert extractor.calls == 1
+
+        # Touched but identical bytes: reuse the blob without extracting
+        os.utime(doc, (2000, 2000))
+        assert cache.get(doc, 'lines', extractor) == ["first line", "第二行"]
+        assert extractor.calls == 1
+
+        write(doc, "changed", mtime=3000)
+        assert cache.get(doc, 'lines', extractor) == ["changed"]
+        assert extractor.calls == 2
+
+        # A different kind is cached separately
+        assert cache.get(doc, 'upper', lambda p: "CHANGED") == "CHANGED"
+        assert cache.stats()['entries'] == 2
+        print("✓ Hits, touch reuse and invalidation work")
+
+def test_cache_shared_between_copies():
+    """A copy of a file reuses the blob of the original"""
+    print("🧪 Testing cache reuse for copied files...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = os.path.join(temp_dir, "cache")
+        a = os.path.join(temp_dir, "a.txt")
+        b = os.path.join(temp_dir, "b.txt")
+        write(a, "same content")
+        write(b, "same content")
+        extractor = CountingExtractor()
+
+        ExtractionCache(cache_dir).get(a, 'lines', extractor)
+        # A second instance reads the same persistent cache
+        assert ExtractionCache(cache_dir).get(b, 'lines', extractor) == ["same content"]
+        assert extractor.calls == 1
+        print("✓ Copied file served from the existing blob")
+
+def test_cache_reuses_given_hash():
+    """A miss with the caller's content_hash does not hash the file again"""
+    print("🧪 Testing a miss with a known content hash...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = os.path.join(temp_dir, "cache")
+        a = os.path.join(temp_dir, "a.txt")
+        b = os.path.join(temp_dir, "b.txt")
+        write(a, "hashed once")
+        write(b, "hashed once")
+        content_hash = hash_file(a)
+        extractor = CountingExtractor()
+        hashed = []
+        real_hash_file = extraction_cache.hash_file
+        extraction_cache.hash_file = lambda path: hashed.append(path) or real_hash_file(path)
+        try:
+            cache = ExtractionCache(cache_dir)
+            assert cache.get(a, 'lines', extractor, content_hash) == ["hashed once"]
+            assert hashed == []
+            # The blob is filed under the same hash hash_file gives
+            assert cache.get(b, 'lines', extractor) == ["hashed once"]
+            assert hashed == [b] and extractor.calls == 1
+        finally:
+            extraction_cache.hash_file = real_hash_file
+        print("✓ Given hash used as is, and it matches hash_file")
+
+def test_cache_eviction_and_errors():
+    """The cache stays under its budget and does not store failures"""
+    print("🧪 Testing cache eviction and errors...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ExtractionCache(os.path.join(temp_dir, "cache"), max_bytes=4096)
+        for i in range(20):
+            path = os.path.join(temp_dir, f"file{i}.txt")
+            write(path, os.urandom(600).hex())
+            cache.get(path, 'lines', CountingExtractor())
+        stats = cache.stats()
+        assert stats['bytes'] <= 4096
+        assert 0 < stats['blobs'] < 20
+
+        def failing(path):
+            raise ValueError("broken file")
+        bad = os.path.join(temp_dir, "bad.txt")
+        write(bad, "bad")
+        try:
+            cache.get(bad, 'lines', failing)
+            assert False, "extractor error was swallowed"
+        except ValueError:
+            pass
+        assert cache.lookup(bad, 'lines') is None
+        print(f"✓ Evicted down to {stats['blobs']} blobs ({stats['bytes']} bytes)")
+
+def test_cache_disabled():
+    """A zero budget turns the cache off"""
+    print("🧪 Testing disabled cache...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = os.path.join(temp_dir, "cache")
+        cache = ExtractionCache(cache_dir, max_bytes=0)
+        doc = os.path.join(temp_dir, "doc.txt")
+        write(doc, "text")
+        extractor = CountingExtractor()
+        cache.get(doc, 'lines', extractor)
+        cache.get(doc, 'lines', extractor)
+        assert extractor.calls == 2
+        assert not os.path.exists(cache_dir)
+        print("✓ Every call extracts when the cache is disabled")
+
+def read_in_child(cache, doc, conn):
+    conn.send((cache.get(doc, 'lines', CountingExtractor()), id(cache._conn())))
+
+def test_cache_after_fork():
+    """A forked worker opens its own connection instead of the parent's"""
+    print("🧪 Testing cache use after fork...")
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        print("✓ Skipped: no fork start method here")
+        return
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ExtractionCache(os.path.join(temp_dir, "cache"), max_bytes=10 * 1024 * 1024)
+        doc = os.path.join(temp_dir, "doc.txt")
+        write(doc, "parent line")
+        assert cache.get(doc, 'lines', CountingExtractor()) == ["parent line"]
+        parent_conn_id = id(cache._conn())
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        child = multiprocessing.get_context('fork').Process(target=read_in_child, args=(cache, doc, sender))
+        child.start()
+        assert receiver.poll(30), "child did not answer"
+        lines, child_conn_id = receiver.recv()
+        child.join(10)
+        assert lines == ["parent line"]
+        assert child_conn_id != parent_conn_id
+        assert cache.get(doc, 'lines', CountingExtractor()) == ["parent line"]
+        print("✓ Child process read the cache on a connection of its own")
+
+if __name__ == "__main__":
+    print("=== Extraction Cache Test Suite ===\n")
+    test_cache_hit_and_invalidation()
+    test_cache_shared_between_copies()
+    test_cache_reuses_given_hash()
+    test_cache_eviction_and_errors()
+    test_cache_disabled()
+    test_cache_after_fork()
+    print("\n✅ Extraction cache tests passed!")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for the supervised extraction workers and the quarantine
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+from extraction_watchdog import ExtractionAborted, SupervisedPool, process_rss
+from index_db import IndexWriter, connect_index, ensure_schema, get_quarantine
+from index_pipeline import IndexPipeline
+
+def double(value):
+    return value * 2
+
+def sleep_for(seconds):
+    time.sleep(seconds)
+    return seconds
+
+def crash():
+    os._exit(3)
+
+def allocate(megabytes):
+    block = bytearray(megabytes * 1024 * 1024)
+    time.sleep(2)
+    return len(block)
+
+def fail():
+    raise ValueError("broken file")
+
+def aborted_reason(future):
+    try:
+        future.result()
+    except ExtractionAborted as e:
+        return e.reason
+    raise AssertionError("expected ExtractionAborted")
+
+def test_pool_timeout_and_crash():
+    """A hung or crashed task fails alone and its worker is replaced"""
+    print("🧪 Testing supervised pool...")
+    with SupervisedPool(1, timeout=0.5) as pool:
+        hung = pool.submit(sleep_for, 30)
+        after = pool.submit(double, 21)
+        assert aborted_reason(hung) == 'timeout'
+        assert after.result(timeout=10) == 42
+        assert pool.elapsed(hung) >= 0.5
+
+        crashed = pool.submit(crash)
+        assert aborted_reason(crashed) == 'crashed'
+        assert pool.submit(double, 4).result(timeout=10) == 8
+
+        failed = pool.submit(fail)
+        try:
+            failed.result()
+            assert False, "expected an error"
+        except RuntimeError as e:
+            assert "ValueError: broken file" in str(e)
+        assert pool.aborted == 2
+    print("✓ Timeout and crash reported, pool kept working")
+
+def test_pool_memory_cap():
+    """A worker that grows past max_rss_mb is killed"""
+    print("🧪 Testing memory cap...")
+    if process_rss(os.getpid()) is None:
+        print("✓ Skipped: process memory cannot be read here")
+        return
+    with SupervisedPool(1, max_rss_mb=100) as pool:
+        assert aborted_reason(pool.submit(allocate, 300)) == 'memory'
+        assert pool.submit(allocate, 1).result(timeout=10) == 1024 * 1024
+    print("✓ Worker over the memory cap killed")
+
+def test_shutdown_without_wait():
+    """shutdown(wait=False) does not wait for a running task"""
+    print("🧪 Testing shutdown...")
+    pool = SupervisedPool(1)
+    running = pool.submit(sleep_for, 30)
+    queued = pool.submit(double, 1)
+    time.sleep(0.2)
+    started = time.monotonic()
+    pool.shutdown(wait=False, cancel_futures=True)
+    assert time.monotonic() - started < 5
+    assert queued.cancelled()
+    assert aborted_reason(running) == 'cancelled'
+    print("✓ Running task cancelled, queued task dropped")
+
+def test_pipeline_skips_quarantined_files():
+    """A quarantined file is skipped until it changes, then indexed and released"""
+    print("🧪 Testing quarantine in the pipeline...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        os.makedirs(docs)
+        hung = os.path.join(docs, "hung.txt")
+        with open(hung, 'w', encoding='utf-8') as f:
+            f.write("quarantined words\n")
+        with open(os.path.join(docs, "fine.txt"), 'w', encoding='utf-8') as f:
+            f.write("ordinary words\n")
+        db_path = os.path.join(temp_dir, "index.db")
+        conn = connect_index(db_path)
+        ensure_schema(conn)
+        conn.close()
+        stat = os.stat(hung)
+        with IndexWriter(db_path) as writer:
+            writer.quarantine(hung, stat.st_size, stat.st_mtime, "timeout: still running after 300 s", 300.0)
+
+        pipeline = IndexPipeline(db_path, workers=1)
+        seen = pipeline.run([docs])
+        conn = sqlite3.connect(db_path)
+        indexed = [row[0] for row in conn.execute('SELECT file_path FROM indexed_files')]
+        conn.close()
+        assert len(seen) == 2
+        assert indexed == [os.path.join(docs, "fine.txt")]
+        assert pipeline.files_skipped_quarantined == 1
+        assert [path for _, path in pipeline.slowest] == [os.path.join(docs, "fine.txt")]
+
+        with open(hung, 'a', encoding='utf-8') as f:
+            f.write("edited\n")
+        os.utime(hung, (stat.st_atime, stat.st_mtime + 10))
+        pipeline = IndexPipeline(db_path, workers=1)
+        pipeline.run([docs], lambda path, root, mtime, size: 'insert' if path == hung else None)
+        conn = connect_index(db_path)
+        indexed = [row[0] for row in conn.execute('SELECT file_path FROM indexed_files')]
+        quarantine = get_quarantine(conn)
+        conn.close()
+        assert hung in indexed
+        assert quarantine == {}
+        print("✓ Unchanged quarantined file skipped, edited one indexed again")
+
+if __name__ == "__main__":
+    print("=== Extraction Watchdog Test Suite ===\n")
+    test_pool_timeout_and_crash()
+    test_pool_memory_cap()
+    test_shutdown_without_wait()
+    test_pipeline_skips_quarantined_files()
+    print("\n✅ Extraction watchdog tests passed!")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test script for index-assisted live search
+"""
+
+import os
+import tempfile
+import time
+
+from docx import Document
+
+import index_db
+import searchAuto
+from index_db import connect_index, ensure_schema
+from index_pipeline import IndexPipeline
+
+KEYWORDS = ["contract", "ONTRAC", "signed contract", "e", "zebra-7", "动物园", "café", "nowhere to be found"]
+
+def create_corpus(docs):
+    os.makedirs(os.path.join(docs, "sub"))
+    with open(os.path.join(docs, "notes.txt"), 'w', encoding='utf-8') as f:
+        f.write("The signed contract is filed.\nCafé opening hours\n")
+    with open(os.path.join(docs, "sub", "zoo.md"), 'w', encoding='utf-8') as f:
+        f.write("# 我们的小动物园很大\nzebra-7 lives here\n")
+    for i in range(20):
+        with open(os.path.join(docs, "sub", f"filler{i}.txt"), 'w', encoding='utf-8') as f:
+            f.write(f"unrelated filler text number {i}\n")
+    doc = Document()
+    doc.add_paragraph("Subcontractors must sign")
+    doc.save(os.path.join(docs, "terms.docx"))
+
+def live_results(keyword, use_index):
+    results = []
+    candidates = searchAuto.index_candidates(keyword) if use_index else None
+    skipped = 0
+    for root_path in searchAuto.get_selected_roots():
+        skipped += searchAuto.search_folder(root_path, keyword, results, candidates)
+    return sorted((r["File Path"], r["Location"], r["Content"]) for r in results), skipped
+
+def check_keywords():
+    skipped_total = 0
+    for keyword in KEYWORDS:
+        full, _ = live_results(keyword, False)
+        hybrid, skipped = live_results(keyword, True)
+        assert hybrid == full, (keyword, hybrid, full)
+        skipped_total += skipped
+    return skipped_total
+
+def test_hybrid_matches_full_scan():
+    """Index-assisted live search finds exactly what a full scan finds"""
+    print("🧪 Testing index-assisted live search...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_corpus(docs)
+        old_db = searchAuto.INDEX_DB
+        searchAuto.INDEX_DB = os.path.join(temp_dir, "index.db")
+        try:
+            conn = connect_index(searchAuto.INDEX_DB)
+            ensure_schema(conn)
+            conn.execute("INSERT INTO roots (root_path) VALUES (?)", (docs,))
+            conn.commit()
+            conn.close()
+            IndexPipeline(searchAuto.INDEX_DB, workers=1).run([docs])
+
+            # Changed and new files are searched even though the index does not know them yet
+            filler = os.path.join(docs, "sub", "filler3.txt")
+            with open(filler, 'a', encoding='utf-8') as f:
+                f.write("a late contract appendix\n")
+            stat = os.stat(filler)
+            os.utime(filler, (stat.st_atime, stat.st_mtime + 5))
+            with open(os.path.join(docs, "new.txt"), 'w', encoding='utf-8') as f:
+                f.write("fresh contract draft\n")
+
+            skipped = check_keywords()
+            assert skipped > 0
+            _, skipped = live_results("contract", True)
+            assert skipped == 20  # 23 indexed files minus two candidates and the changed filler
+
+            conn = connect_index(searchAuto.INDEX_DB)
+            index_db.set_tokenizer(conn, 'trigram')
+            conn.close()
+            check_keywords()
+        finally:
+            searchAuto.INDEX_DB = old_db
+        print(f"✓ {len(KEYWORDS)} keywords give the same hits with and without the index, on both tokenizers")
+
+def test_candidates_narrow_down():
+    """Candidates come from the index terms, not from a scan of every text"""
+    print("🧪 Testing index candidates...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_corpus(docs)
+        db_path = os.path.join(temp_dir, "index.db")
+        conn = connect_index(db_path)
+        ensure_schema(conn)
+        conn.close()
+        IndexPipeline(db_path, workers=1).run([docs])
+        conn = connect_index(db_path)
+        started = time.perf_counter()
+        names = {kw: {os.path.basename(p) for p in index_db.find_candidates(conn, kw)} for kw in KEYWORDS}
+        elapsed = time.perf_counter() - started
+        # A part found in too many terms falls back to scanning the stored text
+        old_limit = index_db.MAX_CANDIDATE_TERMS
+        index_db.MAX_CANDIDATE_TERMS = 2
+        try:
+            scanned = {os.path.basename(p) for p in index_db.find_candidates(conn, "e")}
+        finally:
+            index_db.MAX_CANDIDATE_TERMS = old_limit
+        conn.close()
+        assert scanned == names["e"]
+        assert names["contract"] == {"notes.txt", "terms.docx"}
+        assert names["signed contract"] == {"notes.txt"}
+        assert names["zebra-7"] == {"zoo.md"}
+        assert names["café"] == {"notes.txt"}
+        assert names["nowhere to be found"] == set()
+        assert "terms.docx" not in names["e"] and len(names["e"]) == 22
+        print(f"✓ Candidates for {len(KEYWORDS)} keywords in {elapsed * 1000:.0f} ms")
+
+def test_candidates_scan_fallback():
+    """The fallback scan runs in SQL for ASCII keywords and still finds what str.lower() would"""
+    print("🧪 Testing the candidate scan fallback...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        os.makedirs(docs)
+        texts = {"kelvin.txt": "300 \u212aelvin\n", "dotted.txt": "\u0130STANBUL\n",
+                 "plain.txt": "Kelvin and Istanbul\n", "other.txt": "nothing here\n", "cafe.txt": "CAFÉ\n"}
+        for name, text in texts.items():
+            with open(os.path.join(docs, name), 'w', encoding='utf-8') as f:
+                f.write(text)
+        db_path = os.path.join(temp_dir, "index.db")
+        conn = connect_index(db_path)
+        ensure_schema(conn)
+        conn.close()
+        IndexPipeline(db_path, workers=1).run([docs])
+        conn = connect_index(db_path)
+        statements = []
+        conn.set_trace_callback(statements.append)
+        old_limit = index_db.MAX_CANDIDATE_TERMS
+        # No part narrows anything down, so every keyword is scanned for
+        index_db.MAX_CANDIDATE_TERMS = 0
+        try:
+            names = {kw: {os.path.basename(p) for p in index_db.find_candidates(conn, kw)}
+                     for kw in ["kelvin", "ISTANBUL", "i", "café"]}
+        finally:
+            index_db.MAX_CANDIDATE_TERMS = old_limit
+        conn.close()
+        for keyword, found in names.items():
+            exact = {name for name, text in texts.items() if keyword.lower() in text.lower()}
+            # The files with a Kelvin sign or dotted I may come on top: candidates, not hits
+            assert exact <= found and found - exact <= {"kelvin.txt", "dotted.txt"}, (keyword, found)
+        assert names["kelvin"] >= {"kelvin.txt", "plain.txt"} and "other.txt" not in names["kelvin"]
+        assert names["café"] == {"cafe.txt"}
+        # Only the non-ASCII keyword needed the Python function
+        assert sum('contains_keyword' in sql for sql in statements) == 1
+        print("✓ ASCII keywords scanned by SQLite, Kelvin sign and dotted I kept as candidates")
+
+if __name__ == "__main__":
+    print("=== Hybrid Live Search Test Suite ===\n")
+    test_hybrid_matches_full_scan()
+    test_candidates_narrow_down()
+    test_candidates_scan_fallback()
+    print("\n✅ Hybrid live search tests passed!")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the .searchautoignore exclusion rules
+"""
+
+import os
+import tempfile
+
+from dir_walker import DirWalker
+from ignore_rules import IgnoreRules, parse_rule_lines, report, DEFAULT_GLOBAL_RULES
+
+NO_GLOBAL_RULES = {'patterns': []}
+
+def write(path, text="x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def test_glob_rules():
+    """gitignore-style globs, anchoring, folder-only rules and negation"""
+    print("🧪 Testing glob rules...")
+    rules = IgnoreRules('/root', parse_rule_lines([
+        '# comment', '', '*.tmp', '/build', 'docs/*.bak', 'cache/', '**/dumps/**', '!keep.tmp',
+    ], 'test'))
+    assert rules.skip_file('a/b/x.tmp').text == '*.tmp'
+    assert rules.skip_file('a/keep.tmp') is None
+    assert rules.skip_dir('build').text == '/build'
+    assert rules.skip_dir('src/build') is None
+    assert rules.skip_file('docs/old.bak').text == 'docs/*.bak'
+    assert rules.skip_file('other/docs/old.bak') is None
+    assert rules.skip_dir('x/cache').text == 'cache/'
+    assert rules.skip_file('x/cache') is None  # folder-only rule
+    assert rules.skip_file('a/dumps/big.txt').text == '**/dumps/**'
+    assert rules.skip_file('notes.txt') is None
+    print("✓ Glob rules match like .gitignore")
+
+def test_limit_rules():
+    """max-size, max-depth and regex rules"""
+    print("🧪 Testing size, depth and regex rules...")
+    rules = IgnoreRules('/root', parse_rule_lines(['max-size: 1KB', 'max-depth: 2', r'regex: \.bak\d*$'], 'test'))
+    assert rules.skip_file('a.txt', 2048).kind == 'max-size'
+    assert rules.skip_file('a.txt', 100) is None
+    assert rules.skip_dir('a/b') is None
+    assert rules.skip_dir('a/b/c').kind == 'max-depth'
+    assert rules.skip_file('x/report.bak2').kind == 'regex'
+    assert parse_rule_lines(['max-size: lots'], 'test') == []
+    print("✓ Limits and regexes applied")
+
+def test_walker_prunes_before_listing():
+    """Excluded folders are never listed and the counts are kept per rule"""
+    print("🧪 Testing walker pruning with .searchautoignore...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        write(os.path.join(docs, "a.txt"))
+        write(os.path.join(docs, "node_modules", "pkg", "readme.md"))
+        write(os.path.join(docs, "backup", "old.txt"))
+        write(os.path.join(docs, "backup", "older.txt"))
+        write(os.path.join(docs, "notes", "draft.tmp"))
+        write(os.path.join(docs, ".searchautoignore"), "backup/\n*.tmp\n")
+
+        walker = DirWalker()
+        walked = {os.path.relpath(root, docs): [f[0] for f in files] for root, dirs, files in walker.walk(docs)}
+        assert set(walked) == {'.', 'notes'}
+        assert walked['notes'] == []
+        assert walker.dirs_scanned == 2
+        counts = {rule.text: entry for rule, entry in walker.rules.counts.items()}
+        assert counts['node_modules/'] == {'dirs': 1, 'files': 0}
+        assert counts['backup/'] == {'dirs': 1, 'files': 0}
+        assert counts['*.tmp'] == {'dirs': 0, 'files': 1}
+
+        rules = IgnoreRules.load(docs, DEFAULT_GLOBAL_RULES)
+        rule, excluded = rules.explain(os.path.join(docs, "backup", "old.txt"))
+        assert rule.text == 'backup/' and excluded == os.path.join(docs, "backup")
+        assert rule.source.endswith('.searchautoignore:1')
+        assert rules.explain(os.path.join(docs, "a.txt")) is None
+
+        # The report also counts the files inside pruned folders
+        totals = {rule.text: entry for rule, entry in report(docs, DEFAULT_GLOBAL_RULES).items()}
+        assert totals['backup/'] == {'dirs': 1, 'files': 2}
+        assert totals['node_modules/'] == {'dirs': 1, 'files': 1}
+
+        walked = [root for root, dirs, files in DirWalker(ignore_rules=False).walk(docs)]
+        assert len(walked) == 5
+        assert IgnoreRules.load(docs, NO_GLOBAL_RULES).skip_dir('node_modules') is None
+        print("✓ Excluded folders skipped before listing")
+
+if __name__ == "__main__":
+    print("=== Ignore Rules Test Suite ===\n")
+    test_glob_rules()
+    test_limit_rules()
+    test_walker_prunes_before_listing()
+    print("\n✅ Ignore rules tests passed!")
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Test script for the index database helpers
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from index_db import (connect_index, ensure_schema, get_tokenizer, set_tokenizer, build_match_query, IndexWriter,
+                      create_shadow, has_shadow, swap_shadow, drop_old_generations, start_index_jobs, get_index_jobs,
+                      HIT_JOIN)
+
+def create_index_db(db_path):
+    conn = connect_index(db_path)
+    ensure_schema(conn)
+    conn.close()
+
+def test_connect_index_uses_wal():
+    """Index connections run in WAL mode with the tuned pragmas"""
+    print("🧪 Testing index connection pragmas...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        conn = connect_index(os.path.join(temp_dir, "index.db"))
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+        assert conn.execute('PRAGMA temp_store').fetchone()[0] == 2  # MEMORY
+        conn.close()
+        print("✓ WAL mode and pragmas applied")
+
+def test_writer_batches_rows():
+    """Rows are written in size-bounded transactions"""
+    print("🧪 Testing batched index writer...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+        with IndexWriter(db_path, max_rows=10) as writer:
+            for i in range(35):
+                writer.insert(f"/docs/file{i}.txt", "TXT", 1.0, f"writer content{i}", "/docs")
+            writer.update("/docs/file3.txt", 2.0, "changed text", "/docs")
+            writer.delete("/docs/file4.txt", "/docs")
+        stats = writer.stats()
+        assert stats['rows'] == 37
+        assert stats['transactions'] == 4
+        assert stats['rows_per_second'] > 0
+
+        conn = sqlite3.connect(db_path)
+        assert conn.execute('SELECT COUNT(*) FROM indexed_files').fetchone()[0] == 34
+        assert conn.execute('SELECT COUNT(*) FROM file_index').fetchone()[0] == 34
+        assert conn.execute("SELECT f.mtime FROM file_index JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id "
+                            "WHERE file_index MATCH 'changed'").fetchone()[0] == 2.0
+        conn.close()
+        print(f"✓ {stats['rows']} rows in {stats['transactions']} transactions")
+
+def test_writer_flushes_on_bytes():
+    """A large row flushes the batch before the row limit is reached"""
+    print("🧪 Testing byte-bounded batches...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+        writer = IndexWriter(db_path, max_rows=1000, max_bytes=100)
+        writer.insert("/docs/big.txt", "TXT", 1.0, "x" * 200, "/docs")
+        assert writer.rows_written == 1
+        writer.close()
+        print("✓ Oversized batch flushed immediately")
+
+def test_writer_stops_after_failed_batch():
+    """A failed batch is kept in error, and no later batch or checkpoint is committed"""
+    print("🧪 Testing a failed index batch...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+        conn = connect_index(db_path)
+        start_index_jobs(conn, ["/docs"])
+        conn.close()
+        writer = IndexWriter(db_path, max_rows=5)
+        write_file = writer._write_file
+
+        def failing_write(row):
+            if row[1] == "/docs/file7.txt":
+                raise sqlite3.OperationalError("disk I/O error")
+            write_file(row)
+
+        writer._write_file = failing_write
+        for i in range(20):
+            writer.insert(f"/docs/file{i}.txt", "TXT", 1.0, f"batch content{i}", "/docs")
+            if i % 5 == 4:
+                writer.checkpoint("/docs", f"dir{i}")
+        writer.close()
+        assert isinstance(writer.error, sqlite3.OperationalError)
+        assert writer.rows_written == 5
+
+        conn = connect_index(db_path)
+        assert conn.execute('SELECT COUNT(*) FROM indexed_files').fetchone()[0] == 5
+        assert get_index_jobs(conn) == {"/docs": None}
+        conn.close()
+        print("✓ Failed batch rolled back; later checkpoints not committed")
+
+def test_reads_during_write():
+    """Readers see committed rows while a write transaction is open"""
+    print("🧪 Testing reads during a write...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+        with IndexWriter(db_path) as writer:
+            writer.insert("/docs/a.txt", "TXT", 1.0, "committed text", "/docs")
+        writer = connect_index(db_path)
+        writer.execute('BEGIN IMMEDIATE')
+        writer.execute("INSERT INTO file_index (content) VALUES ('pending text')")
+        reader = connect_index(db_path, timeout=0.1)
+        assert reader.execute("SELECT COUNT(*) FROM file_index WHERE content MATCH 'text'").fetchone()[0] == 1
+        writer.rollback()
+        reader.close()
+        writer.close()
+        print("✓ Search did not wait on the writer")
+
+def test_migrate_flat_layout():
+    """The old all-FTS layout is migrated into indexed_files + file_index"""
+    print("🧪 Testing schema migration...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "index.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE roots (root_path TEXT PRIMARY KEY)')
+        conn.execute('''CREATE VIRTUAL TABLE file_index USING fts5(
+            file_path, file_type, mtime, content, root_path
+        )''')
+        conn.executemany('INSERT INTO file_index VALUES (?, ?, ?, ?, ?)', [
+            ('/a/one.txt', 'TXT', '10.5', 'alpha legacy text', '/a'),
+            ('/a/two.md', 'MD', '11.0', 'beta legacy text', '/a'),
+            ('/b/three.txt', 'TXT', '12.0', 'gamma legacy text', '/b'),
+        ])
+        conn.commit()
+        conn.close()
+
+        conn = connect_index(db_path)
+        ensure_schema(conn)
+        files = conn.execute('SELECT file_path, root_path, mtime FROM indexed_files ORDER BY id').fetchall()
+        hit = conn.execute("SELECT f.file_path FROM file_index JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id "
+                           "WHERE file_index MATCH 'beta'").fetchall()
+        assert files[0] == ('/a/one.txt', '/a', 10.5)
+        assert len(files) == 3
+        assert hit == [('/a/two.md',)]
+
+        conn.execute("DELETE FROM indexed_files WHERE root_path='/a'")
+        conn.commit()
+        assert conn.execute('SELECT COUNT(*) FROM file_index').fetchone()[0] == 1
+        plan = ' '.join(str(row) for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM indexed_files WHERE root_path='/b'"))
+        assert 'idx_indexed_files_root' in plan
+        conn.close()
+        print("✓ Legacy rows migrated, root delete uses the root index")
+
+def test_migrate_to_segments():
+    """Content rows keyed by file id become segment 0 of their file"""
+    print("🧪 Testing segment migration...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "index.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE roots (root_path TEXT PRIMARY KEY)')
+        conn.execute('''CREATE TABLE indexed_files (id INTEGER PRIMARY KEY, file_path TEXT NOT NULL, root_path TEXT NOT NULL,
+                        file_type TEXT, mtime REAL, size INTEGER, inode INTEGER, fingerprint TEXT,
+                        UNIQUE (file_path, root_path))''')
+        conn.execute('CREATE INDEX idx_indexed_files_root ON indexed_files (root_path)')
+        conn.execute('CREATE VIRTUAL TABLE file_index USING fts5(content)')
+        conn.execute('''CREATE TRIGGER indexed_files_ad AFTER DELETE ON indexed_files BEGIN
+                        DELETE FROM file_index WHERE rowid = old.id; END''')
+        conn.executemany('INSERT INTO indexed_files (id, file_path, root_path) VALUES (?, ?, ?)',
+                         [(7, '/a/one.txt', '/a'), (9, '/a/two.txt', '/a')])
+        conn.executemany('INSERT INTO file_index (rowid, content) VALUES (?, ?)', [(7, 'alpha text'), (9, 'beta text')])
+        conn.execute('PRAGMA user_version=3')
+        conn.commit()
+        conn.close()
+
+        conn = connect_index(db_path)
+        ensure_schema(conn)
+        assert conn.execute('SELECT id, content_id, start FROM file_segments ORDER BY id').fetchall() == [(7, 7, 0), (9, 9, 0)]
+        hit = conn.execute(f"SELECT f.file_path FROM file_index {HIT_JOIN} WHERE file_index MATCH 'beta'").fetchall()
+        assert hit == [('/a/two.txt',)]
+
+        with IndexWriter(db_path) as writer:
+            writer.append('/a/two.txt', '/a', 10, 'gamma tail', 5.0, 20, indexed_bytes=20, prefix_hash='x')
+        assert conn.execute(f"SELECT f.file_path, s.start FROM file_index {HIT_JOIN} WHERE file_index MATCH 'gamma'").fetchall() == [('/a/two.txt', 10)]
+        conn.execute("DELETE FROM indexed_files WHERE file_path='/a/two.txt'")
+        conn.commit()
+        assert conn.execute('SELECT COUNT(*) FROM file_index').fetchone()[0] == 1
+        assert conn.execute('SELECT COUNT(*) FROM file_segments').fetchone()[0] == 1
+        conn.close()
+        print("✓ Existing content kept its rowid, deletes remove every segment")
+
+def test_trigram_tokenizer():
+    """Switching to trigram mode lets Chinese text use MATCH"""
+    print("🧪 Testing CJK trigram tokenizer...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+        with IndexWriter(db_path) as writer:
+            writer.insert("/docs/zoo.txt", "TXT", 1.0, "我们的小动物园很大", "/docs")
+            writer.insert("/docs/en.txt", "TXT", 1.0, "Plain English text", "/docs")
+
+        conn = connect_index(db_path)
+        assert get_tokenizer(conn) == 'unicode61'
+        assert build_match_query('小动物', 'unicode61') is None
+        assert set_tokenizer(conn, 'trigram')
+        assert not set_tokenizer(conn, 'trigram')
+        assert get_tokenizer(conn) == 'trigram'
+
+        query = build_match_query('小动物', 'trigram')
+        rows = conn.execute("SELECT f.file_path, snippet(file_index, 0, '[', ']', '...', 20) FROM file_index "
+                            "JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id WHERE file_index MATCH ? ORDER BY rank",
+                            (query,)).fetchall()
+        assert rows == [('/docs/zoo.txt', '我们的[小动物]园很大')]
+        assert build_match_query('动物', 'trigram') is None
+        assert conn.execute("SELECT COUNT(*) FROM file_index WHERE file_index MATCH 'english'").fetchone()[0] == 1
+
+        # The delete trigger survives the rebuild
+        conn.execute("DELETE FROM indexed_files WHERE file_path='/docs/zoo.txt'")
+        conn.commit()
+        assert conn.execute('SELECT COUNT(*) FROM file_index').fetchone()[0] == 1
+        conn.close()
+        print("✓ Chinese keyword matched through the trigram index")
+
+def test_shadow_rebuild_swap():
+    """A rebuild in shadow tables leaves the live index untouched until the swap"""
+    print("🧪 Testing shadow rebuild and swap...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+        with IndexWriter(db_path) as writer:
+            writer.insert("/docs/old.txt", "TXT", 1.0, "old generation", "/docs")
+
+        for generation in ("first", "second"):
+            conn = connect_index(db_path)
+            create_shadow(conn)
+            start_index_jobs(conn, ["/docs"])
+            with IndexWriter(db_path, shadow=True) as writer:
+                writer.insert(f"/docs/{generation}.txt", "TXT", 2.0, f"{generation} generation", "/docs")
+                writer.insert("/docs/zoo.txt", "TXT", 2.0, "animals", "/docs")
+            assert has_shadow(conn)
+            # Live index still answers with the previous generation
+            assert conn.execute("SELECT COUNT(*) FROM file_index WHERE file_index MATCH ?", (generation,)).fetchone()[0] == 0
+            assert conn.execute("SELECT COUNT(*) FROM indexed_files").fetchone()[0] >= 1
+
+            swap_shadow(conn)
+            drop_old_generations(conn)
+            assert not has_shadow(conn)
+            assert get_index_jobs(conn) == {}
+            rows = conn.execute("SELECT f.file_path FROM file_index JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id "
+                                "WHERE file_index MATCH 'generation'").fetchall()
+            assert rows == [(f"/docs/{generation}.txt",)]
+            tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+            assert not any(t.endswith(('_old', '_shadow')) for t in tables)
+            plan = ' '.join(str(r) for r in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM indexed_files WHERE root_path='/docs'"))
+            assert 'idx_indexed_files' in plan
+            conn.close()
+
+        # The delete trigger follows the swapped-in tables
+        conn = connect_index(db_path)
+        conn.execute("DELETE FROM indexed_files WHERE file_path='/docs/zoo.txt'")
+        conn.commit()
+        assert conn.execute('SELECT COUNT(*) FROM file_index').fetchone()[0] == 1
+        conn.close()
+        print("✓ Two generations swapped in, old tables removed")
+
+def test_tokenizer_change_converts_shadow():
+    """Changing the tokenizer mid-rebuild also converts the shadow tables"""
+    print("🧪 Testing tokenizer change during a rebuild...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+        conn = connect_index(db_path)
+        create_shadow(conn)
+        with IndexWriter(db_path, shadow=True) as writer:
+            writer.insert("/docs/zoo.txt", "TXT", 1.0, "我们的小动物园很大", "/docs")
+        set_tokenizer(conn, 'trigram')
+        swap_shadow(conn)
+        assert get_tokenizer(conn) == 'trigram'
+        assert conn.execute("SELECT COUNT(*) FROM file_index WHERE file_index MATCH '\"小动物\"'").fetchone()[0] == 1
+        conn.close()
+        print("✓ Shadow rebuilt with the trigram tokenizer")
+
+if __name__ == "__main__":
+    print("=== Index DB Test Suite ===\n")
+    test_connect_index_uses_wal()
+    test_writer_batches_rows()
+    test_writer_flushes_on_bytes()
+    test_writer_stops_after_failed_batch()
+    test_reads_during_write()
+    test_migrate_flat_layout()
+    test_migrate_to_segments()
+    test_trigram_tokenizer()
+    test_shadow_rebuild_swap()
+    test_tokenizer_change_converts_shadow()
+    print("\n✅ Index DB tests passed!")
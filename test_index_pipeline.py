@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Test script for the parallel indexing pipeline
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from docx import Document
+
+from file_extractors import append_start
+from index_db import (connect_index, ensure_schema, get_index_jobs, iter_file_contents, start_index_jobs,
+                      HIT_JOIN, IndexWriter)
+from index_pipeline import IndexPipeline, MoveDetector
+
+def create_index_db(db_path):
+    conn = connect_index(db_path)
+    ensure_schema(conn)
+    conn.close()
+
+def create_files(folder, count):
+    for i in range(count):
+        sub = os.path.join(folder, f"sub{i % 3}")
+        os.makedirs(sub, exist_ok=True)
+        with open(os.path.join(sub, f"note{i}.txt"), 'w', encoding='utf-8') as f:
+            f.write(f"pipeline document number{i}\n")
+    with open(os.path.join(folder, "~$lock.txt"), 'w') as f:
+        f.write("office lock file")
+    with open(os.path.join(folder, "image.png"), 'w') as f:
+        f.write("not indexed")
+
+def test_pipeline_indexes_all_files():
+    """Every supported file ends up in file_index exactly once"""
+    print("🧪 Testing pipeline rebuild...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_files(docs, 25)
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+
+        pipeline = IndexPipeline(db_path, workers=2)
+        seen = pipeline.run([docs])
+
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute('SELECT file_path, file_type, root_path, size FROM indexed_files').fetchall()
+        hits = conn.execute("SELECT COUNT(*) FROM file_index WHERE content MATCH 'number7'").fetchone()[0]
+        conn.close()
+        assert len(seen) == 25
+        assert len(rows) == 25
+        assert all(r[1] == 'TXT' and r[2] == docs and r[3] > 0 for r in rows)
+        assert hits == 1
+        print(f"✓ Indexed {len(rows)} files with {pipeline.workers} workers")
+
+def test_pipeline_update_only_changed():
+    """needs_extraction decides which files are written"""
+    print("🧪 Testing pipeline incremental update...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_files(docs, 10)
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+
+        def only_first(file_path, root_path, mtime, size):
+            return 'insert' if os.path.basename(file_path) == 'note0.txt' else None
+
+        pipeline = IndexPipeline(db_path, workers=1)
+        seen = pipeline.run([docs], only_first)
+        conn = sqlite3.connect(db_path)
+        count = conn.execute('SELECT COUNT(*) FROM indexed_files').fetchone()[0]
+        conn.close()
+        assert len(seen) == 10
+        assert count == 1
+        assert pipeline.files_extracted == 1
+        print("✓ Only the requested file was extracted")
+
+def test_pipeline_cancel():
+    """A cancelled run stops early and reports it"""
+    print("🧪 Testing pipeline cancellation...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_files(docs, 50)
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+
+        pipeline = IndexPipeline(db_path, workers=1, is_cancelled=lambda: True)
+        pipeline.run([docs])
+        assert pipeline.cancelled
+        assert pipeline.files_seen == 0
+        print("✓ Cancelled before walking any file")
+
+def test_write_failure_keeps_live_index():
+    """A rebuild whose writer fails reports the error and is not swapped in"""
+    print("🧪 Testing a rebuild with a failed write...")
+    import searchAuto
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_files(docs, 12)
+        old_db = searchAuto.INDEX_DB
+        searchAuto.INDEX_DB = os.path.join(temp_dir, "index.db")
+        write_file = IndexWriter._write_file
+
+        def failing_write(writer, row):
+            if os.path.basename(row[1]) == "note7.txt":
+                raise sqlite3.OperationalError("database or disk is full")
+            write_file(writer, row)
+
+        try:
+            create_index_db(searchAuto.INDEX_DB)
+            conn = connect_index(searchAuto.INDEX_DB)
+            conn.execute("INSERT INTO roots (root_path) VALUES (?)", (docs,))
+            conn.commit()
+            conn.close()
+            IndexPipeline(searchAuto.INDEX_DB, workers=1).run([docs])
+
+            IndexWriter._write_file = failing_write
+            stats = searchAuto.build_index_all()
+            assert isinstance(stats['error'], sqlite3.OperationalError)
+            IndexWriter._write_file = write_file
+
+            conn = connect_index(searchAuto.INDEX_DB)
+            assert conn.execute('SELECT COUNT(*) FROM indexed_files').fetchone()[0] == 12
+            assert set(get_index_jobs(conn)) == {docs}
+            conn.close()
+            stats = searchAuto.update_index_all()
+            assert stats['error'] is None and not stats['cancelled']
+        finally:
+            IndexWriter._write_file = write_file
+            searchAuto.INDEX_DB = old_db
+        print("✓ Failed rebuild left the live index in place, to be resumed")
+
+def test_pipeline_checkpoint_and_resume():
+    """An interrupted rebuild resumes from its checkpoint without duplicates"""
+    print("🧪 Testing checkpointed rebuild resume...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_files(docs, 30)
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+        conn = connect_index(db_path)
+        start_index_jobs(conn, [docs])
+        conn.close()
+
+        # Stop part-way through the walk
+        first = IndexPipeline(db_path, workers=1, is_cancelled=lambda: first.files_seen >= 15)
+        first.run([docs])
+        assert first.cancelled
+
+        conn = connect_index(db_path)
+        resume = get_index_jobs(conn)
+        completed = set(conn.execute('SELECT file_path, root_path FROM indexed_files').fetchall())
+        conn.close()
+        assert set(resume) == {docs}
+
+        second = IndexPipeline(db_path, workers=2)
+        second.run([docs], lambda f, r, m, s: None if (f, r) in completed else 'insert', resume=resume)
+
+        conn = connect_index(db_path)
+        count, distinct = conn.execute('SELECT COUNT(*), COUNT(DISTINCT file_path) FROM indexed_files').fetchone()
+        cursor = get_index_jobs(conn)[docs]
+        conn.close()
+        assert count == distinct == 30
+        assert cursor == 'sub2'
+        print(f"✓ Resumed after {len(completed)} files, {second.files_seen} files walked again")
+
+def test_pipeline_skips_checkpointed_dirs():
+    """Directories up to the cursor are not walked again"""
+    print("🧪 Testing resume cursor...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_files(docs, 30)
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+
+        pipeline = IndexPipeline(db_path, workers=1)
+        seen = pipeline.run([docs], resume={docs: 'sub1'})
+        assert pipeline.files_seen == 10
+        assert all(os.path.basename(os.path.dirname(f)) == 'sub2' for f, r in seen)
+        print("✓ Only directories after the cursor were walked")
+
+def test_pipeline_detects_moves():
+    """Moved and renamed files are re-pointed instead of extracted again"""
+    print("🧪 Testing move/rename detection...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_files(docs, 12)
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+        IndexPipeline(db_path, workers=1).run([docs])
+
+        # Reorganise: rename a folder, rename one file, and edit a moved file
+        os.rename(os.path.join(docs, "sub1"), os.path.join(docs, "archive"))
+        os.rename(os.path.join(docs, "sub0", "note0.txt"), os.path.join(docs, "sub0", "renamed.txt"))
+        with open(os.path.join(docs, "archive", "note1.txt"), 'a', encoding='utf-8') as f:
+            f.write("edited after the move\n")
+
+        conn = connect_index(db_path)
+        rows = conn.execute('SELECT file_path, mtime, root_path, size, inode, fingerprint FROM indexed_files').fetchall()
+        conn.close()
+        assert all(row[5] for row in rows)
+        indexed = {(row[0], row[2]) for row in rows}
+        moves = MoveDetector((row[0], row[2], row[3], row[4], row[5]) for row in rows)
+
+        def needs_extraction(file_path, root_path, mtime, size):
+            if (file_path, root_path) not in indexed:
+                return moves.find(file_path, size) or 'insert'
+            return None
+
+        pipeline = IndexPipeline(db_path, workers=1)
+        pipeline.run([docs], needs_extraction)
+        # sub1 held 4 files; one of them was edited and needs extracting
+        assert pipeline.files_moved == 4
+        assert pipeline.files_extracted == 1
+
+        conn = connect_index(db_path)
+        hit = conn.execute("SELECT f.file_path FROM file_index JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id "
+                           "WHERE file_index MATCH 'number4'").fetchall()
+        renamed = conn.execute("SELECT COUNT(*) FROM file_index JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id "
+                               "WHERE file_index MATCH 'number0' AND f.file_path LIKE '%renamed.txt'").fetchone()[0]
+        conn.close()
+        assert hit == [(os.path.join(docs, "archive", "note4.txt"),)]
+        assert renamed == 1
+        print(f"✓ {pipeline.files_moved} files re-pointed, {pipeline.files_extracted} extracted")
+
+def test_pipeline_appends_growing_text():
+    """A text file that only grew gets its new tail indexed as another segment"""
+    print("🧪 Testing append-only updates...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        os.makedirs(docs)
+        log = os.path.join(docs, "server.log.txt")
+        with open(log, 'w', encoding='utf-8') as f:
+            f.writelines(f"request {i} served\n" for i in range(20000))
+            f.write("partial line still being writ")
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+        IndexPipeline(db_path, workers=1).run([docs])
+
+        def run_update():
+            conn = connect_index(db_path)
+            rows = {(r[0], r[1]): r[2:] for r in conn.execute(
+                'SELECT file_path, root_path, mtime, size, indexed_bytes, prefix_hash FROM indexed_files')}
+            conn.close()
+
+            def needs_extraction(file_path, root_path, mtime, size):
+                old_mtime, old_size, indexed_bytes, prefix_hash = rows[(file_path, root_path)]
+                start = append_start(file_path, size, old_size, indexed_bytes, prefix_hash)
+                return 'update' if start is None else ('append', start)
+
+            pipeline = IndexPipeline(db_path, workers=1)
+            pipeline.run([docs], needs_extraction)
+            return pipeline
+
+        with open(log, 'a', encoding='utf-8') as f:
+            f.write("ten\nnewest entry zebracorn\n")
+        pipeline = run_update()
+        assert pipeline.files_appended == 1
+
+        conn = connect_index(db_path)
+        segments = conn.execute('SELECT start FROM file_segments ORDER BY start').fetchall()
+        size, indexed_bytes = conn.execute('SELECT size, indexed_bytes FROM indexed_files').fetchone()
+        hits = {term: conn.execute("SELECT s.start FROM file_index JOIN file_segments s ON s.id = file_index.rowid "
+                                   "WHERE file_index MATCH ?", (term,)).fetchall()
+                for term in ('zebracorn', 'written', '19999')}
+        content = next(iter_file_contents(conn))[2]
+        conn.close()
+        # The new segment starts at the unfinished line, so it is indexed whole
+        assert len(segments) == 2 and segments[0] == (0,)
+        assert size == indexed_bytes == os.path.getsize(log)
+        assert hits['zebracorn'] == hits['written'] == [segments[1]]
+        assert hits['19999'] == [(0,)]
+        assert content.endswith("being written\nnewest entry zebracorn\n")
+
+        # Rewriting the indexed part falls back to a full update with one segment
+        with open(log, 'w', encoding='utf-8') as f:
+            f.write("rewritten from scratch with more text than before\n" * 20000)
+        pipeline = run_update()
+        assert pipeline.files_appended == 0
+        conn = connect_index(db_path)
+        assert conn.execute('SELECT start FROM file_segments').fetchall() == [(0,)]
+        assert conn.execute("SELECT COUNT(*) FROM file_index WHERE file_index MATCH 'zebracorn'").fetchone()[0] == 0
+        conn.close()
+        print("✓ Only the appended tail was extracted")
+
+def write_docx(path, text):
+    doc = Document()
+    doc.add_paragraph(text)
+    doc.save(path)
+
+def test_pipeline_deduplicates_copies():
+    """Copies of a document are extracted and stored once, and every path is found"""
+    print("🧪 Testing content deduplication...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs, backup = os.path.join(temp_dir, "docs"), os.path.join(temp_dir, "backup")
+        os.makedirs(docs)
+        write_docx(os.path.join(docs, "final.docx"), "quarterly report kangaroo")
+        write_docx(os.path.join(docs, "other.docx"), "unrelated memo")
+        shutil.copy(os.path.join(docs, "final.docx"), os.path.join(docs, "final (1).docx"))
+        for name in ("a.txt", "b.txt"):
+            with open(os.path.join(docs, name), 'w', encoding='utf-8') as f:
+                f.write("same plain text wombat\n")
+        shutil.copytree(docs, backup)
+        db_path = os.path.join(temp_dir, "index.db")
+        create_index_db(db_path)
+
+        pipeline = IndexPipeline(db_path, workers=2)
+        pipeline.run([docs, backup])
+        # Two distinct documents are extracted; the other four DOCX files are copies
+        assert pipeline.files_deduplicated == 4
+        assert pipeline.files_extracted == 2 + 4
+
+        conn = connect_index(db_path)
+        assert conn.execute('SELECT COUNT(*) FROM indexed_files').fetchone()[0] == 10
+        assert conn.execute('SELECT COUNT(*) FROM file_contents').fetchone()[0] == 3
+        assert conn.execute('SELECT COUNT(*) FROM file_index').fetchone()[0] == 3
+        hits = conn.execute(f"SELECT f.file_path FROM file_index {HIT_JOIN} WHERE file_index MATCH 'kangaroo'").fetchall()
+        assert len(hits) == 4
+        assert len(conn.execute(f"SELECT f.file_path FROM file_index {HIT_JOIN} WHERE file_index MATCH 'wombat'").fetchall()) == 4
+        conn.close()
+
+        # Editing one copy gives it its own content; the others keep theirs
+        write_docx(os.path.join(docs, "final.docx"), "revised report platypus")
+        edited = os.path.join(docs, "final.docx")
+        pipeline = IndexPipeline(db_path, workers=1)
+        pipeline.run([docs], lambda file_path, root_path, mtime, size: 'update' if file_path == edited else None)
+        conn = connect_index(db_path)
+        assert conn.execute(f"SELECT f.file_path FROM file_index {HIT_JOIN} WHERE file_index MATCH 'platypus'").fetchall() == [(edited,)]
+        assert len(conn.execute(f"SELECT f.file_path FROM file_index {HIT_JOIN} WHERE file_index MATCH 'kangaroo'").fetchall()) == 3
+        conn.close()
+
+        # Content is dropped with the last file using it
+        with IndexWriter(db_path) as writer:
+            writer.delete(os.path.join(docs, "final (1).docx"), docs)
+            writer.delete(os.path.join(backup, "final.docx"), backup)
+        conn = connect_index(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM file_index WHERE file_index MATCH 'kangaroo'").fetchone()[0] == 1
+        conn.execute("DELETE FROM indexed_files WHERE root_path=?", (backup,))
+        conn.commit()
+        assert conn.execute("SELECT COUNT(*) FROM file_index WHERE file_index MATCH 'kangaroo'").fetchone()[0] == 0
+        assert conn.execute('SELECT COUNT(*) FROM file_contents').fetchone()[0] == 3
+        conn.close()
+        print("✓ Copies shared one content row and were all found")
+
+if __name__ == "__main__":
+    print("=== Index Pipeline Test Suite ===\n")
+    test_pipeline_indexes_all_files()
+    test_pipeline_update_only_changed()
+    test_pipeline_cancel()
+    test_write_failure_keeps_live_index()
+    test_pipeline_checkpoint_and_resume()
+    test_pipeline_skips_checkpointed_dirs()
+    test_pipeline_detects_moves()
+    test_pipeline_appends_growing_text()
+    test_pipeline_deduplicates_copies()
+    print("\n✅ Index pipeline tests passed!")
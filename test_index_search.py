@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for ranked, paginated index search
+"""
+
+import os
+import tempfile
+
+import searchAuto
+from index_db import connect_index, ensure_schema, IndexWriter
+
+def create_search_db(db_path, count):
+    conn = connect_index(db_path)
+    ensure_schema(conn)
+    conn.execute("INSERT INTO roots (root_path) VALUES ('/docs')")
+    conn.commit()
+    conn.close()
+    with IndexWriter(db_path) as writer:
+        for i in range(count):
+            # file0 mentions the keyword most often and should rank first
+            repeats = 10 if i == 0 else 1
+            writer.insert(f"/docs/file{i}.txt", "TXT", 1.0, "ranked " * repeats + "filler text " * 30, "/docs")
+
+def test_search_index_pages():
+    """Pages are ranked by bm25, bounded by the page size and report a total"""
+    print("🧪 Testing paginated index search...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        old_db = searchAuto.INDEX_DB
+        searchAuto.INDEX_DB = os.path.join(temp_dir, "index.db")
+        try:
+            create_search_db(searchAuto.INDEX_DB, 45)
+            first, total = searchAuto.search_index_page('ranked', 0, 20)
+            second, _ = searchAuto.search_index_page('ranked', 20, 20, with_total=False)
+            last, _ = searchAuto.search_index_page('ranked', 40, 20, with_total=False)
+            everything = searchAuto.search_index('ranked')
+        finally:
+            searchAuto.INDEX_DB = old_db
+        assert total == 45
+        assert len(first) == 20 and len(second) == 20 and len(last) == 5
+        assert first[0]['File Path'] == '/docs/file0.txt'
+        paged = [r['File Path'] for r in first + second + last]
+        assert len(set(paged)) == 45
+        assert paged == [r['File Path'] for r in everything]
+        print(f"✓ {total} hits returned in pages of 20, best match first")
+
+def test_search_index_scan_pages():
+    """The substring fallback pages the same way"""
+    print("🧪 Testing paginated substring fallback...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        old_db = searchAuto.INDEX_DB
+        searchAuto.INDEX_DB = os.path.join(temp_dir, "index.db")
+        try:
+            create_search_db(searchAuto.INDEX_DB, 0)
+            with IndexWriter(searchAuto.INDEX_DB) as writer:
+                for i in range(12):
+                    writer.insert(f"/docs/cn{i}.txt", "TXT", 1.0, "这是动物的文件", "/docs")
+            first, total = searchAuto.search_index_page('动物', 0, 5)
+            rest, _ = searchAuto.search_index_page('动物', 5, None, with_total=False)
+        finally:
+            searchAuto.INDEX_DB = old_db
+        assert total == 12
+        assert len(first) == 5 and len(rest) == 7
+        assert first[0]['Content'] == "这是动物的文件"
+        print("✓ Substring hits paged with a total count")
+
+if __name__ == "__main__":
+    print("=== Index Search Test Suite ===\n")
+    test_search_index_pages()
+    test_search_index_scan_pages()
+    print("\n✅ Index search tests passed!")
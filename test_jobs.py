@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Test script for the job scheduler
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+import jobs
+import searchAuto
+from index_db import connect_index, ensure_schema
+from jobs import JobScheduler, READ, WRITE, INTERACTIVE, USER, BACKGROUND
+
+def blocking(started, release, log=None, name=None):
+    """A job target that runs until release is set or the job is cancelled"""
+    def target(job):
+        if log is not None:
+            log.append(name)
+        started.set()
+        while not release.is_set() and not job.is_cancelled():
+            time.sleep(0.01)
+        return name
+    return target
+
+def test_tokens_are_per_job():
+    """Cancelling one job leaves the others running"""
+    print("🧪 Testing per-job cancellation...")
+    scheduler = JobScheduler()
+    release = threading.Event()
+    first_started, second_started = threading.Event(), threading.Event()
+    first = scheduler.submit("first", blocking(first_started, release, name="first"))
+    second = scheduler.submit("second", blocking(second_started, release, name="second"))
+    assert first_started.wait(2) and second_started.wait(2)
+    first.cancel()
+    assert first.wait(2)
+    assert first.state == jobs.CANCELLED and not second.done
+    assert not second.is_cancelled()
+    release.set()
+    assert second.wait(2)
+    assert second.state == jobs.DONE and second.result == "second"
+    print("✓ One job cancelled, the other finished")
+
+def test_reads_run_during_writes():
+    """Searches start at once while writes wait for each other"""
+    print("🧪 Testing the concurrency matrix...")
+    scheduler = JobScheduler()
+    release = threading.Event()
+    write_started = threading.Event()
+    write = scheduler.submit("update", blocking(write_started, release), WRITE, BACKGROUND)
+    assert write_started.wait(2)
+    second_write = scheduler.submit("rebuild", blocking(threading.Event(), release), WRITE, BACKGROUND)
+    started = time.monotonic()
+    search = scheduler.submit("search", lambda job: "hits", READ, INTERACTIVE)
+    assert search.wait(2)
+    assert search.result == "hits"
+    assert time.monotonic() - started < 1
+    assert second_write.state == jobs.QUEUED and write.state == jobs.RUNNING
+    release.set()
+    assert scheduler.wait_all(5)
+    assert second_write.state == jobs.DONE
+    assert second_write.started >= write.ended
+    print("✓ Search ran during a write; the second write waited for the first")
+
+def test_priorities_and_preemption():
+    """Queued writes start by priority, and a user write cancels a background one"""
+    print("🧪 Testing priorities...")
+    scheduler = JobScheduler()
+    release = threading.Event()
+    log = []
+    running_started = threading.Event()
+    running = scheduler.submit("tokenizer", blocking(running_started, release, log, "tokenizer"), WRITE, USER)
+    assert running_started.wait(2)
+    background = scheduler.submit("periodic", blocking(threading.Event(), release, log, "periodic"), WRITE, BACKGROUND)
+    user = scheduler.submit("update", blocking(threading.Event(), release, log, "update"), WRITE, USER)
+    assert [job.name for job in scheduler.jobs()] == ["tokenizer", "update", "periodic"]
+    release.set()
+    assert scheduler.wait_all(5)
+    assert log == ["tokenizer", "update", "periodic"]
+
+    # A background write gives way to a user write
+    release.clear()
+    background_started = threading.Event()
+    background = scheduler.submit("periodic", blocking(background_started, release), WRITE, BACKGROUND)
+    assert background_started.wait(2)
+    user = scheduler.submit("rebuild", lambda job: "rebuilt", WRITE, USER)
+    assert user.wait(2)
+    assert background.state == jobs.CANCELLED and user.result == "rebuilt"
+    assert user.started >= background.ended
+    print("✓ Higher priority first; the periodic update was cancelled for the rebuild")
+
+def test_keys_merge_and_replace():
+    """A queued job absorbs one with its key; replace cancels the previous job"""
+    print("🧪 Testing job keys...")
+    scheduler = JobScheduler()
+    release = threading.Event()
+    started = threading.Event()
+    scheduler.submit("rebuild", blocking(started, release), WRITE, USER)
+    assert started.wait(2)
+    queued = scheduler.submit("periodic", lambda job: None, WRITE, BACKGROUND, key='periodic')
+    again = scheduler.submit("periodic", lambda job: None, WRITE, BACKGROUND, key='periodic')
+    assert again is queued
+    assert len(scheduler.active()) == 2
+    queued.cancel()
+    assert queued.state == jobs.CANCELLED and queued.wait(0)
+    assert len(scheduler.active()) == 1
+
+    search_started = threading.Event()
+    old_search = scheduler.submit("search 1", blocking(search_started, threading.Event()), key='search', replace=True)
+    assert search_started.wait(2)
+    new_search = scheduler.submit("search 2", lambda job: "new", key='search', replace=True)
+    assert old_search.wait(2) and new_search.wait(2)
+    assert old_search.state == jobs.CANCELLED and new_search.result == "new"
+    release.set()
+    assert scheduler.wait_all(5)
+    print("✓ Duplicate periodic update merged, old search replaced")
+
+def test_failures_and_notifications():
+    """A failing job is recorded; on_change hears of every change; cancel_latest picks the newest"""
+    print("🧪 Testing failures and notifications...")
+    changes = []
+    scheduler = JobScheduler(on_change=lambda: changes.append(len(scheduler.active())))
+
+    def fail(job):
+        raise ValueError("broken file")
+
+    failed = scheduler.submit("broken", fail)
+    assert failed.wait(2)
+    assert failed.state == jobs.FAILED and isinstance(failed.error, ValueError)
+    assert len(changes) == 2
+
+    # cancel_latest picks the newest job the user started, never a background one
+    release = threading.Event()
+    search_started = threading.Event()
+    background = scheduler.submit("periodic", blocking(threading.Event(), release), WRITE, BACKGROUND)
+    older = scheduler.submit("older search", blocking(threading.Event(), release))
+    search = scheduler.submit("search", blocking(search_started, release))
+    assert search_started.wait(2)
+    assert scheduler.cancel_latest() is search
+    assert scheduler.cancel_latest() is older
+    assert scheduler.cancel_latest() is None
+    assert not background.is_cancelled()
+    release.set()
+    assert scheduler.wait_all(5)
+    assert search.state == older.state == jobs.CANCELLED and background.state == jobs.DONE
+    print(f"✓ Failure recorded, {len(changes)} change notifications")
+
+def test_search_during_index_update():
+    """A live search job runs to the end while an index update job is running"""
+    print("🧪 Testing a search during an index update...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        os.makedirs(docs)
+        for i in range(300):
+            with open(os.path.join(docs, f"note{i}.txt"), 'w', encoding='utf-8') as f:
+                f.write(f"note {i}\n" + ("the harbour report\n" if i % 10 == 0 else ""))
+        old_db = searchAuto.INDEX_DB
+        searchAuto.INDEX_DB = os.path.join(temp_dir, "index.db")
+        try:
+            conn = connect_index(searchAuto.INDEX_DB)
+            ensure_schema(conn)
+            conn.execute("INSERT INTO roots (root_path) VALUES (?)", (docs,))
+            conn.commit()
+            conn.close()
+            scheduler = JobScheduler()
+            update = scheduler.submit("Update index", lambda job: searchAuto.update_index_all(is_cancelled=job.is_cancelled),
+                                      WRITE, USER)
+            results = []
+            search = scheduler.submit("Live search", lambda job: searchAuto.search_folder(
+                docs, "harbour", results, is_cancelled=job.is_cancelled))
+            assert search.state == jobs.RUNNING
+            assert scheduler.wait_all(60)
+            assert update.state == search.state == jobs.DONE
+            assert len(results) == 30
+            assert search.started < update.ended
+            assert not update.result['cancelled']
+            conn = connect_index(searchAuto.INDEX_DB)
+            assert conn.execute("SELECT COUNT(*) FROM indexed_files").fetchone()[0] == 300
+            conn.close()
+        finally:
+            searchAuto.INDEX_DB = old_db
+        print(f"✓ Search finished in {search.elapsed():.2f} s alongside a {update.elapsed():.2f} s update")
+
+class FakeTk:
+    """Stands in for the window and its widgets: after() runs the callback at once"""
+    def __init__(self):
+        self.status = []
+        self.errors = []
+
+    def after(self, ms, callback):
+        callback()
+
+    def set(self, text):
+        self.status.append(text)
+
+    def showerror(self, title, text):
+        self.errors.append((title, text))
+
+def test_gui_job_errors_reported():
+    """A GUI job that raises shows the error, resets the status bar and is listed as failed"""
+    print("🧪 Testing GUI job errors...")
+    fake = FakeTk()
+    names = ('root', 'status_var', 'messagebox', 'build_index_all')
+    saved = {name: getattr(searchAuto, name) for name in names if hasattr(searchAuto, name)}
+
+    def broken_rebuild(is_cancelled=None):
+        raise OSError("index folder is read-only")
+
+    searchAuto.root = searchAuto.status_var = searchAuto.messagebox = fake
+    searchAuto.build_index_all = broken_rebuild
+    try:
+        job = JobScheduler().submit("Rebuild index", searchAuto.build_index_all_gui, WRITE, USER)
+        assert job.wait(5)
+    finally:
+        for name in names:
+            if name in saved:
+                setattr(searchAuto, name, saved[name])
+            else:
+                delattr(searchAuto, name)
+    assert job.state == jobs.FAILED and isinstance(job.error, OSError)
+    assert fake.status == ["Rebuilding index...", "Ready"]
+    assert fake.errors == [("Index rebuild", "Index rebuild failed:\nindex folder is read-only")]
+    print("✓ Error shown and status reset")
+
+if __name__ == "__main__":
+    print("=== Job Scheduler Test Suite ===\n")
+    test_tokens_are_per_job()
+    test_reads_run_during_writes()
+    test_priorities_and_preemption()
+    test_keys_merge_and_replace()
+    test_failures_and_notifications()
+    test_search_during_index_update()
+    test_gui_job_errors_reported()
+    print("\n✅ Job scheduler tests passed!")
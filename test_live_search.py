@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Test script for the parallel live search
+"""
+
+import os
+import tempfile
+import time
+
+import openpyxl
+from docx import Document
+
+import live_search
+from file_extractors import get_xlsx_cells
+from live_search import LiveSearch
+
+def reference_lines(file_path, keywords):
+    """The line-by-line search that search_lines has to agree with"""
+    rows = []
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for i, line in enumerate(f, start=1):
+            found = [keyword.lower() for keyword in keywords if keyword.lower() in line.lower()]
+            if found:
+                rows.append((f"Line {i}", line.strip(), found))
+    return rows
+
+def create_corpus(docs, text_files=40):
+    os.makedirs(os.path.join(docs, "sub"))
+    for i in range(text_files):
+        ext = "md" if i % 4 == 0 else "txt"
+        with open(os.path.join(docs, "sub", f"note{i}.{ext}"), 'w', encoding='utf-8') as f:
+            f.write(f"plain line {i}\n")
+            if i % 3 == 0:
+                f.write(f"the harbour report {i}\n")
+    for i in range(3):
+        doc = Document()
+        doc.add_paragraph("Introduction")
+        doc.add_paragraph(f"Harbour fees for berth {i}")
+        doc.save(os.path.join(docs, f"fees{i}.docx"))
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Ports"
+    sheet["A1"], sheet["B3"] = "Name", "North harbour"
+    workbook.save(os.path.join(docs, "ports.xlsx"))
+
+def rows(results):
+    return sorted((r["File Path"], r["File Type"], r["Location"], r["Content"]) for r in results)
+
+def sequential(docs, keyword):
+    results = []
+    for folder, _, files in os.walk(docs):
+        for name in files:
+            results.extend(live_search.search_file(os.path.join(folder, name), keyword))
+    return results
+
+def test_parallel_matches_sequential():
+    """Threads and worker processes find the same rows as a file-by-file search"""
+    print("🧪 Testing parallel live search...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_corpus(docs)
+        expected = rows(sequential(docs, "harbour"))
+        search = LiveSearch("HARBOUR", threads=4, processes=2)
+        found = rows(search.run([docs]))
+        assert found == expected
+        assert len(found) == 14 + 3 + 1
+        assert search.scanned == search.total == 44
+        assert not search.cancelled
+        print(f"✓ {len(found)} matches from {search.total} files")
+
+def test_batches_and_progress():
+    """Matches arrive in several batches and progress ends at the file count"""
+    print("🧪 Testing streamed batches...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_corpus(docs)
+        batches = []
+        progress = []
+        search = LiveSearch("harbour", batches.append, lambda *args: progress.append(args),
+                            threads=2, processes=1, batch_interval=0)
+        results = search.run([docs])
+        assert len(batches) > 1
+        assert rows(sum(batches, [])) == rows(results)
+        assert progress[-1] == (44, 44, False)
+        assert all(scanned <= total for scanned, total, _ in progress)
+        print(f"✓ {len(batches)} batches, {len(progress)} progress updates")
+
+def test_text_fast_path():
+    """Mapped, block and line-by-line text search report the same lines"""
+    print("🧪 Testing text search paths...")
+    samples = {
+        "plain.txt": "alpha\nBeta CONTRACT beta contract\n\ncontract at the end",
+        "crlf.txt": "one\r\ntwo Contract\r\nthree\r\n",
+        "lone_cr.txt": "one\rtwo contract\rthree\n",
+        "kelvin.txt": "temperature 300 \u212a\nplain k\n",
+        "dotted.txt": "\u0130stanbul\nistanbul\n",
+        "unicode.md": "\ufeffÜber CAFÉ\n我们的小动物园很大\nstraße\n",
+        # Mapped up to the chunk with the special characters, decoded after it
+        "late_special.txt": "".join(f"row {i} contract k\n" for i in range(40)) + "\u212a \u0130 one\rtwo contract\r\n"
+                            + "".join(f"row {i} contract i\n" for i in range(40, 80)),
+        "dense.txt": "".join(f"row {i} contract\n" if i % 3 else f"row {i}\n" for i in range(500)),
+        "empty.txt": "",
+    }
+    keywords = [["contract"], ["k"], ["i"], ["istanbul"], ["café"], ["动物"], ["STRASSE"], ["row 1"], ["123"],
+                ["contract", "row 1"], ["beta", "alpha", "end"], ["k", "two"], ["小动物", "straße", "über"],
+                # More keywords than SCAN_EACH_MAX are found with one regex
+                [f"row {i}7" for i in range(30)] + ["contract", "contr", "three"],
+                [f"missing {i}" for i in range(30)] + ["café", "动物园"]]
+    old_chunk = live_search.SCAN_CHUNK
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, text in samples.items():
+            with open(os.path.join(temp_dir, name), 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+        try:
+            # Small chunks put hits and line ends on chunk boundaries
+            for chunk_size in (old_chunk, 7, 64):
+                live_search.SCAN_CHUNK = chunk_size
+                for name in samples:
+                    file_path = os.path.join(temp_dir, name)
+                    for keyword in keywords:
+                        found = [(r["Location"], r["Content"], r["Keywords"])
+                                 for r in live_search.search_lines(file_path, keyword, "TXT")]
+                        assert found == reference_lines(file_path, keyword), (name, keyword, chunk_size, found)
+        finally:
+            live_search.SCAN_CHUNK = old_chunk
+        print(f"✓ {len(samples)} files x {len(keywords)} keyword lists agree with a line-by-line search")
+
+def reference_cells(file_path, keywords):
+    """The cell-by-cell search that search_xlsx has to agree with"""
+    rows = []
+    for sheet_name, row_num, col_name, cell_text in get_xlsx_cells(file_path):
+        found = [keyword.lower() for keyword in keywords if keyword.lower() in cell_text.lower()]
+        if found:
+            rows.append((f"Sheet {sheet_name}, Row {row_num}, Column {col_name}", cell_text, found))
+    return rows
+
+def test_xlsx_cells():
+    """search_xlsx finds the cells a cell-by-cell search finds, never a hit across two cells"""
+    print("🧪 Testing workbook search...")
+    keywords = [["north harbour"], ["harbour"], ["r"], ["e 2"], ["1\nnorth"], ["\u0130stanbul"], ["istanbul"],
+                ["fees", "north", "7"], [f"row {i}" for i in range(30)] + ["harbour"], ["missing"]]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = "Ports"
+        for row in range(1, 200):
+            sheet.append([f"row {row}", "north", "harbour fees" if row % 7 else "Harbour HARBOUR", row])
+        sheet["F5"] = "line 1\nnorth harbour"
+        other = workbook.create_sheet("Notes")
+        other["B2"], other["C2"] = "the north", "harbour"
+        plain = os.path.join(temp_dir, "plain.xlsx")
+        workbook.save(plain)
+        # A cell whose lower case is longer than itself moves every offset after it
+        other["A9"] = "\u0130stanbul office"
+        other["Z9"] = "Istanbul harbour"
+        dotted = os.path.join(temp_dir, "dotted.xlsx")
+        workbook.save(dotted)
+        for file_path in (plain, dotted):
+            for keyword in keywords:
+                found = [(r["Location"], r["Content"], r["Keywords"]) for r in live_search.search_xlsx(file_path, keyword)]
+                assert found == reference_cells(file_path, keyword), (file_path, keyword, found)
+        cells = [r["Location"] for r in live_search.search_xlsx(plain, "north harbour")]
+        assert cells == ["Sheet Ports, Row 5, Column F"]
+        assert live_search.search_xlsx(plain, "harbour", is_cancelled=lambda: True) == []
+
+        large = openpyxl.Workbook(write_only=True)
+        sheet = large.create_sheet("Large")
+        for row in range(20000):
+            sheet.append([f"item {row}", row * 3, "zebra-7" if row == 15000 else "filler", "east"])
+        large_path = os.path.join(temp_dir, "large.xlsx")
+        large.save(large_path)
+        live_search.search_xlsx(large_path, "warm the cache")
+        started = time.perf_counter()
+        found = live_search.search_xlsx(large_path, ["Zebra-7", "item 12345"])
+        elapsed = time.perf_counter() - started
+        assert [r["Location"] for r in found] == ["Sheet Large, Row 12346, Column A", "Sheet Large, Row 15001, Column C"]
+        print(f"✓ {len(keywords)} keyword lists agree with a cell-by-cell search; 80000 cells searched in {elapsed * 1000:.0f} ms")
+
+def test_batch_queries():
+    """One pass for several queries gives each query its own results"""
+    print("🧪 Testing batch queries...")
+    matcher = live_search.Matcher(["Harbour", "report", "harbour", ""])
+    assert matcher.keywords == ["harbour", "report"]
+    assert matcher.find("the harbour report") == ["harbour", "report"]
+    assert matcher.find("nothing here") == []
+    assert matcher.encoded('ascii').find(b"a report") == ["report"]
+    many = live_search.Matcher([f"term{i}" for i in range(40)] + ["term", "ter", "report"])
+    assert not many.scan_each
+    assert many.any_in("a long report") and not many.any_in("te rm")
+    assert many.search("xx term12 yy") == 3
+    assert many.find("term12 and report") == ["term1", "term12", "term", "ter", "report"]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_corpus(docs)
+        queries = ["harbour", "Berth", "plain line 1", "north", "Report", "missing"]
+        batch = live_search.search_batch([docs], queries, threads=2, processes=1)
+        assert list(batch) == queries
+        for query in queries:
+            single = LiveSearch(query, threads=2, processes=1).run([docs])
+            assert rows(batch[query]) == rows(single), query
+        assert batch["missing"] == []
+        assert len(batch["plain line 1"]) == 11  # 1 and 10-19
+        # A line matching several queries is one row listing all of them
+        both = [r for r in batch["harbour"] if r["Keywords"] == ["harbour", "report"]]
+        assert len(both) == 14
+        print(f"✓ {len(queries)} queries answered by one pass over the files")
+
+def test_cancel_is_prompt():
+    """Cancelling stops the walk, drops queued files and kills the workers"""
+    print("🧪 Testing cancellation...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        create_corpus(docs, text_files=2000)
+        cancelled_at = []
+
+        def on_progress(scanned, total, walking):
+            if scanned and not cancelled_at:
+                cancelled_at.append(time.monotonic())
+
+        search = LiveSearch("harbour", on_progress=on_progress, is_cancelled=lambda: bool(cancelled_at),
+                            threads=2, processes=1, batch_interval=0)
+        search.run([docs])
+        stopped = time.monotonic() - cancelled_at[0]
+        assert search.cancelled
+        assert search.scanned < 2004
+        assert stopped < 1, stopped
+        print(f"✓ Stopped {stopped * 1000:.0f} ms after cancelling, {search.scanned} files scanned")
+
+if __name__ == "__main__":
+    print("=== Live Search Test Suite ===\n")
+    test_parallel_matches_sequential()
+    test_batches_and_progress()
+    test_text_fast_path()
+    test_xlsx_cells()
+    test_batch_queries()
+    test_cancel_is_prompt()
+    print("\n✅ Live search tests passed!")
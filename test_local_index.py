@@ -31,17 +31,17 @@ def test_local_index():
         print(f"✓ Indexed roots: {roots}")
         
         # Check indexed files
-        c.execute('SELECT COUNT(*) FROM file_index')
+        c.execute('SELECT COUNT(*) FROM indexed_files')
         file_count = c.fetchone()[0]
         print(f"✓ Files in index: {file_count}")
         
         # Check file types
-        c.execute('SELECT file_type, COUNT(*) FROM file_index GROUP BY file_type')
+        c.execute('SELECT file_type, COUNT(*) FROM indexed_files GROUP BY file_type')
         file_types = c.fetchall()
         print(f"✓ File types: {file_types}")
         
         # Test a simple search
-        c.execute("SELECT file_path, snippet(file_index, 3, '[', ']', '...', 20) FROM file_index WHERE content MATCH 'test' LIMIT 3")
+        c.execute("SELECT f.file_path, snippet(file_index, 0, '[', ']', '...', 20) FROM file_index JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id WHERE file_index MATCH 'test' LIMIT 3")
         search_results = c.fetchall()
         print(f"✓ Search results for 'test': {len(search_results)}")
         
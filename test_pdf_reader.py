@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test script for the PDF backends
+"""
+
+import os
+import tempfile
+
+import extraction_cache
+import pdf_reader
+from file_extractors import get_pdf_pages
+
+def write_pdf(path, page_texts):
+    """Write a minimal PDF with one line of Helvetica text per page"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+    data += ''.join(f"{offset:010d} 00000 n \n" for offset in offsets).encode('latin-1')
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def test_backends_read_pages():
+    """Every available backend yields the pages in order"""
+    print("🧪 Testing PDF backends...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "report.pdf")
+        write_pdf(path, ["Quarterly revenue", "Signed contract", "Appendix"])
+        for name in pdf_reader.available_backends():
+            pages = list(pdf_reader.BACKENDS[name].iter_pages(path))
+            assert [number for number, _ in pages] == [1, 2, 3], name
+            assert "Signed contract" in pages[1][1], (name, pages)
+            assert list(pdf_reader.BACKENDS[name].iter_pages(path, {3})) == pages[2:3]
+            assert pdf_reader.BACKENDS[name].page_count(path) == 3
+        print(f"✓ Pages read by {', '.join(pdf_reader.available_backends())}")
+
+def test_parallel_pages_and_fallback():
+    """Large PDFs go through the pool in order; a broken file falls through every backend"""
+    print("🧪 Testing parallel page extraction...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "long.pdf")
+        count = pdf_reader.PARALLEL_MIN_PAGES + 3
+        write_pdf(path, [f"Page marker {i}" for i in range(1, count + 1)])
+        pages = pdf_reader.extract_pages(path, 'pypdf', workers=2)
+        assert len(pages) == count
+        assert all(f"Page marker {i}" in text for i, text in enumerate(pages, start=1))
+        assert pdf_reader.extract_pages(path, 'pypdf') == pages
+
+        broken = os.path.join(temp_dir, "broken.pdf")
+        with open(broken, 'wb') as f:
+            f.write(b"not a pdf")
+        try:
+            pdf_reader.extract_text(broken)
+            assert False, "expected an error"
+        except RuntimeError as e:
+            assert 'pdfminer' in str(e) and 'pypdf' in str(e)
+        results = pdf_reader.benchmark([path, broken], ['pypdf'])
+        assert results['pypdf']['files'] == 1 and results['pypdf']['failed'] == 1
+        assert results['pypdf']['pages'] == count
+        print(f"✓ {count} pages extracted in parallel, broken file reported")
+
+def test_cached_pages():
+    """Pages that timed out are not cached; fallback pages are cached under their backend and found again"""
+    print("🧪 Testing cached PDF pages...")
+    cache = extraction_cache.get_cache()
+    backend = pdf_reader.backend_order()[0]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "slow.pdf")
+        count = pdf_reader.PARALLEL_MIN_PAGES + 3
+        # The cache shares results between files with the same contents
+        tag = os.path.basename(temp_dir)
+        write_pdf(path, [f"Slow page {i} {tag}" for i in range(1, count + 1)])
+        report = {}
+        pages = pdf_reader.extract_pages(path, 'pypdf', workers=2, page_timeout=1e-6, report=report)
+        assert report['backend'] == 'pypdf' and report['timed_out'] == list(range(1, count + 1))
+        assert pages == [''] * count
+
+        pages = get_pdf_pages(path, workers=2, page_timeout=1e-6)
+        assert len(pages) == count and not any(pages)
+        assert cache.lookup(path, f'{backend}-pages') is None
+        pages = get_pdf_pages(path)
+        assert all(f"Slow page {i} {tag}" in text for i, text in enumerate(pages, start=1))
+        assert cache.lookup(path, f'{backend}-pages') == pages
+
+        # The preferred backend fails on this file and the next one reads it
+        path = os.path.join(temp_dir, "fallback.pdf")
+        write_pdf(path, [f"Fallback text {tag}"])
+        other = pdf_reader.backend_order()[1]
+        calls = {backend: 0, other: 0}
+        preferred_impl, other_impl = pdf_reader.BACKENDS[backend], pdf_reader.BACKENDS[other]
+
+        def broken(file_path, pages=None):
+            calls[backend] += 1
+            raise ValueError("unreadable for this backend")
+            yield
+
+        def counted(file_path, pages=None):
+            calls[other] += 1
+            yield from type(other_impl).iter_pages(other_impl, file_path, pages)
+
+        preferred_impl.iter_pages, other_impl.iter_pages = broken, counted
+        try:
+            for _ in range(3):
+                pages = get_pdf_pages(path)
+                assert len(pages) == 1 and f"Fallback text {tag}" in pages[0]
+        finally:
+            del preferred_impl.iter_pages, other_impl.iter_pages
+        assert calls == {backend: 1, other: 1}, calls
+        assert cache.lookup(path, f'{backend}-pages') is None
+        assert cache.lookup(path, f'{other}-pages') == pages
+        assert cache.lookup(path, f'{backend}-fallback') == other
+        print(f"✓ Timed-out pages read again, fallback pages cached as {other}")
+
+if __name__ == "__main__":
+    print("=== PDF Reader Test Suite ===\n")
+    test_backends_read_pages()
+    test_parallel_pages_and_fallback()
+    test_cached_pages()
+    print("\n✅ PDF reader tests passed!")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for position maps and located index hits
+"""
+
+import os
+import tempfile
+
+import openpyxl
+from docx import Document
+
+import position_map
+import searchAuto
+from file_extractors import append_start, extract_file_content, extract_index_content
+from index_db import connect_index, ensure_schema
+from index_pipeline import IndexPipeline
+
+def test_encode_decode():
+    """Block, cell and line maps survive encoding and locate offsets"""
+    print("🧪 Testing position map encoding...")
+    mapped = position_map.MappedText()
+    mapped.add("Page 1", "first page")
+    mapped.add("Page 2", "second page")
+    mapped.add("Header", "a")
+    mapped.add("Header", "b")
+    text = mapped.text()
+    blocks = position_map.decode(position_map.encode(mapped.entries))
+    assert blocks.locate(text.index("second")) == "Page 2"
+    assert blocks.locate(text.index("page")) == "Page 1"
+    assert blocks.locate(len(text) - 1) == "Header"
+    assert len(blocks.offsets) == 3
+
+    cells = position_map.CellMap()
+    cells.add(0, "Sales", 1, "A")
+    cells.add(6, "Sales", 1, "B")
+    cells.add(12, "Costs", 40, "AA")
+    decoded = position_map.decode(position_map.encode_cells(cells))
+    assert decoded.locate(7) == "Sheet Sales, Row 1, Column B"
+    assert decoded.locate(100) == "Sheet Costs, Row 40, Column AA"
+
+    lines = position_map.line_map("one\ntwo\nthree", first_line=10)
+    assert position_map.decode(lines).locate(5, lines_before=1) == "Line 11"
+    assert position_map.next_line(lines) == 12
+    assert position_map.decode(None).locate(0) is None
+    print("✓ Maps round-trip and locate offsets")
+
+def create_documents(folder):
+    doc = Document()
+    doc.add_paragraph("Opening remarks")
+    doc.add_paragraph("The penguin contract is signed")
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 1).text = "walrus clause"
+    doc.save(os.path.join(folder, "contract.docx"))
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Stock"
+    sheet["A1"], sheet["B1"] = "Item", "Count"
+    sheet["A7"], sheet["C7"] = "narwhal feed", 12
+    workbook.save(os.path.join(folder, "stock.xlsx"))
+
+    with open(os.path.join(folder, "notes.txt"), 'w', encoding='utf-8') as f:
+        f.write("line one\nline two\nthe otter line\n")
+
+def locations(keyword):
+    return {os.path.basename(r["File Path"]): r["Location"] for r in searchAuto.search_index(keyword)}
+
+def test_index_hits_report_locations():
+    """search_index reports paragraphs, cells and lines from the stored maps"""
+    print("🧪 Testing located index hits...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        os.makedirs(docs)
+        create_documents(docs)
+        for name in os.listdir(docs):
+            text, _ = extract_index_content(os.path.join(docs, name))
+            assert text == extract_file_content(os.path.join(docs, name))
+
+        old_db = searchAuto.INDEX_DB
+        searchAuto.INDEX_DB = os.path.join(temp_dir, "index.db")
+        try:
+            conn = connect_index(searchAuto.INDEX_DB)
+            ensure_schema(conn)
+            conn.execute("INSERT INTO roots (root_path) VALUES (?)", (docs,))
+            conn.commit()
+            conn.close()
+            IndexPipeline(searchAuto.INDEX_DB, workers=1).run([docs])
+            assert locations("penguin") == {"contract.docx": f"Paragraph 2 (Indexed, {docs})"}
+            assert locations("walrus") == {"contract.docx": f"Table 1, Row 1, Column 2 (Indexed, {docs})"}
+            assert locations("narwhal") == {"stock.xlsx": f"Sheet Stock, Row 7, Column A (Indexed, {docs})"}
+            assert locations("otter") == {"notes.txt": f"Line 3 (Indexed, {docs})"}
+
+            # An appended segment keeps counting lines
+            notes = os.path.join(docs, "notes.txt")
+            conn = connect_index(searchAuto.INDEX_DB)
+            old_size, indexed_bytes, prefix_hash = conn.execute(
+                "SELECT size, indexed_bytes, prefix_hash FROM indexed_files WHERE file_path=?", (notes,)).fetchone()
+            conn.close()
+            with open(notes, 'a', encoding='utf-8') as f:
+                f.write("line four\nthe beaver line\n")
+            start = append_start(notes, os.path.getsize(notes), old_size, indexed_bytes, prefix_hash)
+            assert start == indexed_bytes
+            IndexPipeline(searchAuto.INDEX_DB, workers=1).run(
+                [docs], lambda path, root, mtime, size: ('append', start) if path == notes else None)
+            assert locations("beaver") == {"notes.txt": f"Line 5 (Indexed, {docs})"}
+            assert locations("otter") == {"notes.txt": f"Line 3 (Indexed, {docs})"}
+        finally:
+            searchAuto.INDEX_DB = old_db
+        print("✓ Paragraph, cell and line locations reported without opening the files")
+
+if __name__ == "__main__":
+    print("=== Position Map Test Suite ===\n")
+    test_encode_decode()
+    test_index_hits_report_locations()
+    print("\n✅ Position map tests passed!")
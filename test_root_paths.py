@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script for canonical and nested root folders
+"""
+
+import os
+import tempfile
+
+import searchAuto
+import root_paths
+from index_db import connect_index
+from index_pipeline import IndexPipeline
+
+def write(path, text="x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def test_root_nesting():
+    """Owner, nested and outermost roots"""
+    print("🧪 Testing root nesting...")
+    roots = ['/data/projects', '/data/projects/client', '/data/projects-old']
+    assert root_paths.is_within('/data/projects/client/a.txt', '/data/projects')
+    assert not root_paths.is_within('/data/projects-old/a.txt', '/data/projects')
+    assert root_paths.nested_roots('/data/projects', roots) == ['/data/projects/client']
+    assert root_paths.owner_root('/data/projects/client/a.txt', roots) == '/data/projects/client'
+    assert root_paths.owner_root('/data/projects/b.txt', roots) == '/data/projects'
+    assert root_paths.owner_root('/elsewhere/b.txt', roots) is None
+    assert root_paths.outermost_roots(roots) == ['/data/projects', '/data/projects-old']
+    assert root_paths.with_nested_roots(['/data/projects'], roots) == ['/data/projects', '/data/projects/client']
+    print("✓ Every path has one owner root")
+
+def test_add_root_canonical():
+    """Symlinked and nested roots do not index files twice"""
+    print("🧪 Testing canonical root registration...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        projects = os.path.join(temp_dir, "Projects")
+        client = os.path.join(projects, "ClientA")
+        write(os.path.join(projects, "plan.txt"), "outer plan")
+        write(os.path.join(client, "notes.txt"), "client notes")
+        link = os.path.join(temp_dir, "shortcut")
+        os.symlink(projects, link)
+
+        old_db = searchAuto.INDEX_DB
+        searchAuto.INDEX_DB = os.path.join(temp_dir, "index.db")
+        try:
+            outer = searchAuto.add_root(projects + os.sep)
+            assert outer == root_paths.canonical_root(projects)
+            assert searchAuto.add_root(link) == outer
+            assert searchAuto.get_roots() == [outer]
+
+            # Index the outer root alone, then add the nested one
+            IndexPipeline(searchAuto.INDEX_DB, workers=1).run([outer])
+            nested = searchAuto.add_root(client)
+            conn = connect_index(searchAuto.INDEX_DB)
+            rows = sorted(conn.execute('SELECT file_path, root_path FROM indexed_files').fetchall())
+            conn.close()
+            assert rows == [(os.path.join(client, "notes.txt"), nested), (os.path.join(projects, "plan.txt"), outer)]
+
+            # A full pass over both walks ClientA once
+            pipeline = IndexPipeline(searchAuto.INDEX_DB, workers=1)
+            seen = pipeline.run([outer, nested])
+            assert sorted(seen) == rows
+            searchAuto.remove_root(nested)
+            conn = connect_index(searchAuto.INDEX_DB)
+            roots = {root for (root,) in conn.execute('SELECT root_path FROM indexed_files')}
+            conn.close()
+            assert roots == {outer}
+        finally:
+            searchAuto.INDEX_DB = old_db
+        print("✓ Symlinked duplicate merged and nested files owned once")
+
+def test_rebuild_outer_root_keeps_nested():
+    """Rebuilding only the outer root rebuilds its nested roots too"""
+    print("🧪 Testing a rebuild of an outer root...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        projects = os.path.join(temp_dir, "Projects")
+        client = os.path.join(projects, "ClientA")
+        write(os.path.join(projects, "plan.txt"), "outer plan")
+        write(os.path.join(client, "notes.txt"), "client lighthouse notes")
+
+        old_db = searchAuto.INDEX_DB
+        old_selected = searchAuto.get_selected_roots
+        searchAuto.INDEX_DB = os.path.join(temp_dir, "index.db")
+        try:
+            outer = searchAuto.add_root(projects)
+            nested = searchAuto.add_root(client)
+            searchAuto.build_index_all()
+            assert len(searchAuto.search_index("lighthouse")) == 1
+
+            # Only the outer root selected: the swap must not lose ClientA
+            searchAuto.get_selected_roots = lambda: [outer]
+            stats = searchAuto.build_index_all()
+            assert not stats['cancelled'] and stats['error'] is None
+            hits = searchAuto.search_index("lighthouse")
+            assert [hit["File Path"] for hit in hits] == [os.path.join(client, "notes.txt")]
+            assert nested in hits[0]["Location"]
+        finally:
+            searchAuto.get_selected_roots = old_selected
+            searchAuto.INDEX_DB = old_db
+        print("✓ Nested root rebuilt with the outer one")
+
+if __name__ == "__main__":
+    print("=== Root Paths Test Suite ===\n")
+    test_root_nesting()
+    test_add_root_canonical()
+    test_rebuild_outer_root_keeps_nested()
+    print("\n✅ Root paths tests passed!")
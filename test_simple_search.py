@@ -15,12 +15,12 @@ def test_direct_search():
         c = conn.cursor()
         
         # Test search for 'test'
-        c.execute("SELECT file_path, file_type, snippet(file_index, 3, '[', ']', '...', 20), root_path FROM file_index WHERE content MATCH 'test'")
+        c.execute("SELECT f.file_path, f.file_type, snippet(file_index, 0, '[', ']', '...', 20), f.root_path FROM file_index JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id WHERE file_index MATCH 'test'")
         results = c.fetchall()
         print(f"✓ Direct search for 'test': {len(results)} results")
         
         # Test search for 'email'
-        c.execute("SELECT file_path, file_type, snippet(file_index, 3, '[', ']', '...', 20), root_path FROM file_index WHERE content MATCH 'email'")
+        c.execute("SELECT f.file_path, f.file_type, snippet(file_index, 0, '[', ']', '...', 20), f.root_path FROM file_index JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id WHERE file_index MATCH 'email'")
         results = c.fetchall()
         print(f"✓ Direct search for 'email': {len(results)} results")
         
@@ -56,7 +56,7 @@ def test_search_without_gui():
             all_roots = [row[0] for row in c.fetchall()]
             
             # Search in all roots (no GUI selection)
-            q = "SELECT file_path, file_type, snippet(file_index, 3, '[', ']', '...', 20), root_path FROM file_index WHERE content MATCH ?"
+            q = "SELECT f.file_path, f.file_type, snippet(file_index, 0, '[', ']', '...', 20), f.root_path FROM file_index JOIN file_segments s ON s.id = file_index.rowid JOIN indexed_files f ON f.content_id = s.content_id WHERE file_index MATCH ?"
             c.execute(q, (keyword,))
             
             results = []
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming XLSX reader
+"""
+
+import datetime
+import os
+import tempfile
+
+from openpyxl import Workbook
+
+import xlsx_reader
+from file_extractors import extract_xlsx_cells, extract_xlsx_text
+
+def create_workbook(path):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Orders"
+    ws.append(["Customer", "Qty", "Price", "Shipped", "Paid"])
+    ws.append(["Acme Corp", 3, 2.5, datetime.datetime(2024, 3, 1, 9, 30), True])
+    ws.append(["Globex", 10, 4.0, datetime.datetime(2024, 3, 2), False])
+    notes = wb.create_sheet("Notes")
+    notes["C40"] = "lonely cell"
+    notes["AA2"] = "far right"
+    wb.save(path)
+
+def test_column_letters():
+    """Column numbers and letters convert both ways"""
+    print("🧪 Testing column letters...")
+    for index, letters in [(1, 'A'), (26, 'Z'), (27, 'AA'), (702, 'ZZ'), (703, 'AAA')]:
+        assert xlsx_reader.column_letter(index) == letters
+        assert xlsx_reader.column_index(letters) == index
+    assert xlsx_reader.is_date_format('yyyy-mm-dd')
+    assert not xlsx_reader.is_date_format('0.00"days"')
+    assert not xlsx_reader.is_date_format('[Red]#,##0')
+    print("✓ Column letters round-trip")
+
+def test_iter_cells():
+    """Cells come out with Excel coordinates and readable values"""
+    print("🧪 Testing streamed cells...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "orders.xlsx")
+        create_workbook(path)
+        cells = list(xlsx_reader.iter_cells(path))
+        assert cells[:5] == [('Orders', 1, 'A', 'Customer'), ('Orders', 1, 'B', 'Qty'), ('Orders', 1, 'C', 'Price'),
+                             ('Orders', 1, 'D', 'Shipped'), ('Orders', 1, 'E', 'Paid')]
+        assert ('Orders', 2, 'C', '2.5') in cells
+        assert ('Orders', 3, 'C', '4') in cells
+        assert ('Orders', 2, 'D', '2024-03-01 09:30:00') in cells
+        assert ('Orders', 2, 'E', 'True') in cells
+        assert cells[-2:] == [('Notes', 2, 'AA', 'far right'), ('Notes', 40, 'C', 'lonely cell')]
+        assert extract_xlsx_cells(path)[0] == ['Orders', 1, 'A', 'Customer']
+        text = extract_xlsx_text(path)
+        assert text.splitlines()[1] == "Acme Corp 3 2.5 2024-03-01 09:30:00 True"
+        assert text.splitlines()[-1] == "lonely cell"
+        print(f"✓ {len(cells)} cells streamed with sheet/row/column")
+
+if __name__ == "__main__":
+    print("=== XLSX Reader Test Suite ===\n")
+    test_column_letters()
+    test_iter_cells()
+    print("\n✅ XLSX reader tests passed!")
@@ -173,6 +173,8 @@ from tkinter import filedialog, messagebox, ttk
 from pathlib import Path
 from docx import Document
 import PyPDF2
+from extraction_cache import cached_extract
+import pdf_reader
 import logging
 import json
 import time
@@ -381,21 +383,19 @@ def update_translation_history(file_path, output_path, engine, history):
 
 # Extraction functions
 
-def extract_text_from_docx(file_path):
+def _docx_paragraphs(file_path):
     doc = Document(file_path)
-    return '\n'.join([para.text for para in doc.paragraphs])
+    return [para.text for para in doc.paragraphs]
+
+def extract_text_from_docx(file_path):
+    return '\n'.join(cached_extract(file_path, 'docx-paragraphs', _docx_paragraphs))
 
 def extract_text_from_txt(file_path):
     with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
         return f.read()
 
 def extract_text_from_pdf(file_path):
-    text = []
-    with open(file_path, 'rb') as f:
-        reader = PyPDF2.PdfReader(f)
-        for page in reader.pages:
-            text.append(page.extract_text() or "")
-    return '\n'.join(text)
+    return cached_extract(file_path, 'pypdf-text', lambda path: pdf_reader.extract_text(path, 'pypdf'))
 
 def extract_text_from_md(file_path):
     with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
@@ -16,7 +16,7 @@ import subprocess
 import shutil
 from docx import Document
 import PyPDF2
-from pdfminer.high_level import extract_text as pdfminer_extract_text
+import pdf_reader
 
 class UnifiedConverter:
     def __init__(self):
@@ -442,16 +442,8 @@ class UnifiedConverter:
     def convert_pdf_to_markdown(self, pdf_path, md_path):
         """Convert PDF file to Markdown"""
         try:
-            # Try pdfminer first (better for text extraction)
-            try:
-                text = pdfminer_extract_text(pdf_path)
-            except:
-                # Fallback to PyPDF2
-                with open(pdf_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    text = ""
-                    for page in pdf_reader.pages:
-                        text += page.extract_text() + "\n"
+            # pdfminer first (better for text extraction), then the other backends
+            text = pdf_reader.extract_text(pdf_path, 'pdfminer')
                         
             # Clean and format text
             lines = text.split('\n')
@@ -0,0 +1,201 @@
+"""
+Streaming XLSX cell reader.
+
+An .xlsx file is a zip of XML parts. iter_cells() parses the sheet parts
+with iterparse and clears every row once it has been read, so memory
+stays flat however many rows a sheet has; only the shared string table
+is held in memory. No DataFrames are built.
+
+Cells come out as (sheet name, row number, column letter, text), with
+the row and column as shown by Excel:
+
+    for sheet, row, column, text in iter_cells(path):
+        print(f"{sheet}!{column}{row}: {text}")
+
+Numbers are written without a trailing '.0', booleans as True/False and
+date-formatted numbers as 'YYYY-MM-DD HH:MM:SS'. Formula cells give their
+cached result.
+"""
+
+import posixpath
+import re
+import zipfile
+from datetime import datetime, timedelta
+from xml.etree.ElementTree import XMLPullParser, iterparse
+
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+STRICT_REL_NS = 'http://purl.oclc.org/ooxml/officeDocument/relationships'
+# Built-in number formats that display a date or time
+DATE_FORMAT_IDS = set(range(14, 23)) | set(range(27, 37)) | set(range(45, 48)) | set(range(50, 59))
+READ_SIZE = 256 * 1024
+_CELL_REF = re.compile(r'([A-Z]+)(\d+)')
+# Quoted text, escaped characters and [Red]/[$-409] sections of a number format
+_FORMAT_LITERALS = re.compile(r'"[^"]*"|\\.|\[[^\]]*\]')
+
+def _local(tag):
+    """Tag name without its namespace; transitional and strict files use different ones"""
+    return tag.rpartition('}')[2]
+
+def column_letter(index):
+    """1 -> 'A', 27 -> 'AA'"""
+    letters = ''
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+def column_index(letters):
+    """'A' -> 1, 'AA' -> 27"""
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - 64
+    return index
+
+def is_date_format(code):
+    """True if a custom number format code displays a date or time"""
+    code = _FORMAT_LITERALS.sub('', code).lower()
+    return any(char in code for char in 'dmyhs')
+
+def _iter_elements(archive, name, tag):
+    """Yield every completed element named tag in a zip part.
+
+    Each one is dropped from its parent afterwards, so the parsed tree
+    never grows past the element being read.
+    """
+    parser = XMLPullParser(events=('start', 'end'))
+    parents = []
+    wanted = None
+    with archive.open(name) as f:
+        for chunk in iter(lambda: f.read(READ_SIZE), b''):
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    if wanted is None:
+                        # A part uses the namespace of its root element throughout
+                        wanted = elem.tag[:elem.tag.find('}') + 1] + tag
+                    parents.append(elem)
+                    continue
+                parents.pop()
+                if elem.tag == wanted:
+                    yield elem
+                    elem.clear()
+                    if parents:
+                        parents[-1].remove(elem)
+    parser.close()
+
+def _read_sheets(archive):
+    """Return ([(sheet name, part name)], uses the 1904 date system)"""
+    targets = {}
+    if 'xl/_rels/workbook.xml.rels' in archive.namelist():
+        for rel in _iter_elements(archive, 'xl/_rels/workbook.xml.rels', 'Relationship'):
+            target = rel.get('Target', '')
+            # Targets are relative to xl/ unless they start at the package root
+            targets[rel.get('Id')] = target.lstrip('/') if target.startswith('/') else posixpath.normpath('xl/' + target)
+    sheets = []
+    date1904 = False
+    with archive.open('xl/workbook.xml') as f:
+        for _, elem in iterparse(f):
+            name = _local(elem.tag)
+            if name == 'sheet':
+                rel_id = elem.get(f'{{{REL_NS}}}id') or elem.get(f'{{{STRICT_REL_NS}}}id')
+                if rel_id in targets:
+                    sheets.append((elem.get('name'), targets[rel_id]))
+            elif name == 'workbookPr':
+                date1904 = elem.get('date1904') in ('1', 'true')
+    return sheets, date1904
+
+def _read_shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    strings = []
+    for si in _iter_elements(archive, 'xl/sharedStrings.xml', 'si'):
+        strings.append(_inline_text(si))
+    return strings
+
+def _inline_text(elem):
+    """Text of an <si> or <is> element: its <t> runs, without phonetic (rPh) runs"""
+    parts = []
+    for child in elem:
+        name = _local(child.tag)
+        if name == 't':
+            parts.append(child.text or '')
+        elif name == 'r':
+            parts.extend(t.text or '' for t in child if _local(t.tag) == 't')
+    return ''.join(parts)
+
+def _read_date_styles(archive):
+    """Return the set of cell style indexes (the s attribute) that display dates"""
+    if 'xl/styles.xml' not in archive.namelist():
+        return set()
+    custom_dates = set()
+    styles = []
+    with archive.open('xl/styles.xml') as f:
+        in_cell_xfs = False
+        for event, elem in iterparse(f, events=('start', 'end')):
+            name = _local(elem.tag)
+            if name == 'cellXfs':
+                in_cell_xfs = event == 'start'
+            elif event == 'end' and name == 'numFmt':
+                if is_date_format(elem.get('formatCode', '')):
+                    custom_dates.add(int(elem.get('numFmtId', -1)))
+            elif event == 'end' and name == 'xf' and in_cell_xfs:
+                styles.append(int(elem.get('numFmtId', 0)))
+    date_ids = DATE_FORMAT_IDS | custom_dates
+    return {index for index, fmt_id in enumerate(styles) if fmt_id in date_ids}
+
+def format_number(value, is_date=False, date1904=False):
+    """Render a numeric cell value as text"""
+    number = float(value)
+    if is_date:
+        epoch = datetime(1904, 1, 1) if date1904 else datetime(1899, 12, 30)
+        try:
+            return str(epoch + timedelta(seconds=round(number * 86400)))
+        except OverflowError:
+            pass
+    if number.is_integer() and abs(number) < 1e15:
+        return str(int(number))
+    return repr(number)
+
+def _cell_text(cell, ns, shared, date_styles, date1904):
+    kind = cell.get('t', 'n')
+    if kind == 'inlineStr':
+        inline = cell.find(ns + 'is')
+        return '' if inline is None else _inline_text(inline)
+    value = cell.findtext(ns + 'v')
+    if value is None:
+        return ''
+    if kind == 's':
+        return shared[int(value)]
+    if kind == 'b':
+        return 'True' if value == '1' else 'False'
+    if kind == 'n':
+        try:
+            return format_number(value, int(cell.get('s', 0)) in date_styles, date1904)
+        except ValueError:
+            return value
+    # 'str' (formula result), 'e' (error) and 'd' (ISO date) are stored as text
+    return value
+
+def iter_cells(file_path):
+    """Yield (sheet name, row number, column letter, text) for every non-empty cell"""
+    with zipfile.ZipFile(file_path) as archive:
+        sheets, date1904 = _read_sheets(archive)
+        shared = _read_shared_strings(archive)
+        date_styles = _read_date_styles(archive)
+        letters = {}
+        for sheet_name, part in sheets:
+            if part not in archive.namelist():
+                continue
+            row_num = 0
+            for row in _iter_elements(archive, part, 'row'):
+                ns = row.tag[:-3]
+                row_num = int(row.get('r', row_num + 1))
+                col = 0
+                for cell in row.iterfind(ns + 'c'):
+                    match = _CELL_REF.match(cell.get('r', ''))
+                    col = column_index(match.group(1)) if match else col + 1
+                    text = _cell_text(cell, ns, shared, date_styles, date1904)
+                    if text.strip():
+                        if col not in letters:
+                            letters[col] = column_letter(col)
+                        yield sheet_name, row_num, letters[col], text